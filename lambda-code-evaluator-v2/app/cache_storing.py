@@ -1,7 +1,11 @@
+import asyncio
 import json
+import os
 from glide import (
     ClosingError,
     ConnectionError,
+    ExpirySet,
+    ExpiryType,
     GlideClient,
     GlideClientConfiguration,
     Logger,
@@ -11,45 +15,147 @@ from glide import (
     TimeoutError,
 )
 
+from job_trace import mark
+from result_format import COMPRESSED_PREFIX, encode_job_result
+from structured_log import get_logger
+
+log = get_logger("code-evaluator")
+
 VALKEY_HOST = "main-cache-mutbnm.serverless.eun1.cache.amazonaws.com"  # os.getenv("VALKEY_HOST")
 VALKEY_PORT = 6379  # os.getenv("VALKEY_PORT")
 
+# How long job:{job_id} results live in the cache
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "300"))
+# Channel main-api listens on for finished jobs (see main-api/job_notifier.py)
+JOB_RESULTS_CHANNEL = "job-results"
+# Per-case progress while a job runs (see main-api/job_notifier.py)
+JOB_PROGRESS_CHANNEL = "job-progress"
+JOB_PROGRESS_ENABLED = os.getenv("JOB_PROGRESS_ENABLED", "1") == "1"
+# Read each result back after writing it (debugging aid, costs a round trip)
+VERIFY_VALKEY_WRITES = os.getenv("VERIFY_VALKEY_WRITES", "0") == "1"
+
+Logger.set_logger_config(LogLevel.INFO)
+
+# Reused across warm invocations; must stay on the loop it was created on.
+valkey_client = None
+_client_lock = None
+
+
+async def get_valkey_client():
+    """Returns the shared Valkey client, connecting on first use."""
+    global valkey_client, _client_lock
+    if _client_lock is None:
+        _client_lock = asyncio.Lock()
+
+    async with _client_lock:
+        if valkey_client is None:
+            addresses = [NodeAddress(VALKEY_HOST, VALKEY_PORT)]
+            config = GlideClientConfiguration(
+                addresses=addresses, use_tls=True
+            )
+            valkey_client = await GlideClient.create(config)
+            log.info("valkey_connected", host=VALKEY_HOST)
+    return valkey_client
+
+
+async def reset_valkey_client():
+    """Drops the shared client so the next call reconnects."""
+    global valkey_client
+    client, valkey_client = valkey_client, None
+    if client:
+        try:
+            await client.close()
+        except ClosingError as e:
+            log.warning("valkey_close_failed", error=str(e))
+
 
 # ------------------------------
 # Async function to store job result in Valkey
 # ------------------------------
-async def store_result_in_valkey(job_id, results):
-    print("Entering store_result_in_valkey()...")
-    # Optional: set up logging
-    Logger.set_logger_config(LogLevel.INFO)
+async def store_result_in_valkey(
+    job_id, results, verify=None, ttl=JOB_RESULT_TTL_SECONDS
+):
+    """
+    Stores the job result under job:{job_id} with a TTL, then publishes it on
+    JOB_RESULTS_CHANNEL for waiting WebSockets. Reconnects once if the shared
+    connection was lost. Returns True if the result was stored.
+    """
+    if verify is None:
+        verify = VERIFY_VALKEY_WRITES
+
+    if isinstance(results, dict):
+        mark(results.get("trace"), "stored")
+    # Convert results to JSON string (compressed if RESULT_COMPRESSION is on)
+    job_result = {"status": "completed", "output": results}
+    results_json = encode_job_result(job_result)
+    key = f"job:{job_id}"
+
+    for attempt in range(2):
+        try:
+            client = await get_valkey_client()
+            with log.timed(
+                "job_result_stored", key=key, bytes=len(results_json)
+            ):
+                await client.set(
+                    key, results_json, expiry=ExpirySet(ExpiryType.SEC, ttl)
+                )
+            if verify:
+                retrieved_data = await client.get(key)
+                log.debug("job_result_verified", key=key, data=retrieved_data)
+            break
+
+        except (ClosingError, ConnectionError) as e:
+            log.warning(
+                "valkey_connection_lost", attempt=attempt + 1, error=str(e)
+            )
+            await reset_valkey_client()
+        except (TimeoutError, RequestError) as e:
+            log.error("valkey_error", key=key, error=str(e))
+            return False
+    else:
+        return False
+
+    # Waiters that miss the message still find the stored result.
+    if results_json.startswith(COMPRESSED_PREFIX):
+        await publish_job_result(client, job_id, results_json)
+    else:
+        await publish_job_result(client, job_id, job_result)
+    return True
+
+
+async def publish_job_result(client, job_id, job_result):
+    """
+    Notifies main-api's subscriber; a failed publish is only logged. A
+    compressed result is sent as its stored string.
+    """
+    message = json.dumps({"job_id": job_id, "result": job_result})
+    try:
+        receivers = await client.publish(message, JOB_RESULTS_CHANNEL)
+        log.info("job_result_published", job_id=job_id, receivers=receivers)
+    except (ClosingError, ConnectionError, TimeoutError, RequestError) as e:
+        log.warning("job_result_publish_failed", job_id=job_id, error=str(e))
+
+
+def job_progress_key(job_id) -> str:
+    """Stream of the job's progress events, replayed by late WebSockets."""
+    return f"job_progress:{job_id}"
 
-    # Configure the Glide Cluster Client
-    addresses = [NodeAddress(VALKEY_HOST, VALKEY_PORT)]
-    config = GlideClientConfiguration(addresses=addresses, use_tls=True)
-    client = None
 
+async def publish_job_progress(job_id, event, ttl=JOB_RESULT_TTL_SECONDS):
+    """
+    Appends one progress event to the job's stream and publishes it on
+    JOB_PROGRESS_CHANNEL. Progress is best effort: failures are only logged.
+    Every append refreshes the stream's TTL, so one failed call cannot leave
+    it without one.
+    """
+    key = job_progress_key(job_id)
     try:
-        # Connect to Valkey
-        client = await GlideClient.create(config)
-        print("Connected to Valkey.")
-
-        # Convert results to JSON string
-        results_json = json.dumps({"status": "completed", "output": results})
-
-        # Store with a TTL (e.g., 300 seconds)
-        key = f"job:{job_id}"
-        print(f"Sending data to valkey at {key}")
-        await client.set(key, results_json)
-        print("Sent data to Valkey.")
-        print("Testing getting data back...")
-        retrieved_data = await client.get(key)
-        print(f"Retrieved data: {retrieved_data}")
-
-    except (TimeoutError, RequestError, ConnectionError, ClosingError) as e:
-        print(f"Valkey error: {e}")
-    finally:
-        if client:
-            try:
-                await client.close()
-            except ClosingError as e:
-                print(f"Error closing Valkey client: {e}")
+        client = await get_valkey_client()
+        await client.xadd(key, [("event", json.dumps(event))])
+        message = json.dumps({"job_id": job_id, "progress": event})
+        await asyncio.gather(
+            client.expire(key, ttl),
+            client.publish(message, JOB_PROGRESS_CHANNEL),
+        )
+    except (ClosingError, ConnectionError, TimeoutError, RequestError) as e:
+        log.warning("job_progress_publish_failed", job_id=job_id, error=str(e))
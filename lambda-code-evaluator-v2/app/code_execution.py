@@ -3,32 +3,27 @@ import json
 import tempfile
 import os
 import resource
+import sys
+import threading
+import time
 
+from sandbox_pool import (
+    PROGRESS_PREFIX,
+    SandboxPoolError,
+    get_sandbox_pool,
+    parse_progress_line,
+)
+from structured_log import get_logger
 
-def limit_resources():
-    # Limit the address space to 256MB
-    resource.setrlimit(
-        resource.RLIMIT_AS, (256 * 1024 * 1024, 256 * 1024 * 1024)
-    )
-    # Limit CPU time to 5 seconds (this is in addition to the timeout)
-    resource.setrlimit(resource.RLIMIT_CPU, (5, 5))
-
-
-def execute_user_code_subprocess(user_code: str, test_cases: dict):
-    print("Entering execute_user_code_subprocess()...")
-    """Executes user code inside a subprocess efficiently by processing all test cases in one run."""
-    input_cases = test_cases["inputs"]
+log = get_logger("code-evaluator")
 
-    # Write user code to a temporary script file
-    with tempfile.NamedTemporaryFile(
-        delete=False, suffix=".py", mode="w"
-    ) as temp_script:
-        temp_script_name = temp_script.name
+EXECUTION_TIMEOUT_SECONDS = 5
+SANDBOX_POOL_ENABLED = os.getenv("SANDBOX_POOL_ENABLED", "1") == "1"
 
-        # Write imports needed for user code before writing user code
-        temp_script.write(
-            """
-import json                          
+# Imports made available to user code. Warm sandbox workers import these once
+# at startup, so in a forked child they are already in sys.modules.
+PRELUDE = """
+import json
 import math
 import collections
 import heapq
@@ -45,86 +40,370 @@ import typing
 from typing import List, Tuple, Dict, Set, Optional
 from collections import defaultdict, deque, Counter
 """
-        )
-        # THEN write user code
-        temp_script.write(user_code + "\n\n")
 
-        # Append wrapper code to process all test cases at once, capturing prints and errors separately
-        temp_script.write(
-            """
+# Wrapper code to process all test cases at once, capturing prints and errors separately.
+# stdin holds either the list of inputs, or {"inputs", "fail_fast"}; fail_fast stops at
+# the first exception (the evaluator stops mismatching runs itself). As each case finishes, a
+# PROGRESS_PREFIX line with its result goes to stderr (sandbox_pool.py): {"case", "output",
+# "print_log", "error", "metrics"}, with the case's wall time, CPU time, peak RSS so far
+# and when it finished ("done_ms", from the sandbox's "started_at", which the first case
+# carries). The evaluator grades these lines; stdout gets {"cases_run"} once all are done.
+WRAPPER = """
+import os
 import sys
 import json
 import traceback
 import io
+import resource
+import time
 
 if __name__ == "__main__":
+    started_at = time.time()
     # Read all test cases from stdin
     test_cases = json.loads(sys.stdin.read())
+    fail_fast = False
+    if isinstance(test_cases, dict):
+        fail_fast = test_cases.get("fail_fast", False)
+        test_cases = test_cases["inputs"]
 
     # Instantiate Solution and retrieve method dynamically
     solution_instance = Solution()
     method_name = [m for m in dir(solution_instance) if callable(getattr(solution_instance, m)) and not m.startswith("__")][0]
     user_method = getattr(solution_instance, method_name)
 
-    results = []
-    print_logs = []
-    error_logs = []
+    def case_metrics(wall_start, cpu_start):
+        return {
+            "wall_ms": round((time.perf_counter() - wall_start) * 1000, 3),
+            "cpu_ms": round((time.process_time() - cpu_start) * 1000, 3),
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "done_ms": round((time.time() - started_at) * 1000, 3),
+        }
 
-    for case in test_cases:
-        try:
-            # Capture print statements
-            stdout_buffer = io.StringIO()
-            sys.stdout = stdout_buffer  # Redirect stdout
+    def report_case(index, output, print_log, error, metrics):
+        record = {
+            "case": index,
+            "output": output,
+            "print_log": print_log,
+            "error": error,
+            "metrics": metrics,
+        }
+        if index == 0:
+            record["started_at"] = started_at
+        # Leading newline: keep it apart from unterminated user output.
+        # Written straight to the fd: the evaluator may stop the run on it.
+        data = ("\\n@@progress " + json.dumps(record) + "\\n").encode("utf-8")
+        while data:
+            data = data[os.write(2, data):]
 
+    cases_run = 0
+    for index, case in enumerate(test_cases):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        # Capture print statements
+        stdout_buffer = io.StringIO()
+        sys.stdout = stdout_buffer  # Redirect stdout
+        try:
             # Execute function
             result = user_method(*case)
+            error = None
+        except Exception as e:
+            result = None  # Placeholder for failed cases
+            error = traceback.format_exc()
+        sys.stdout = sys.__stdout__  # Restore stdout
+        metrics = case_metrics(wall_start, cpu_start)
+        report_case(index, result, stdout_buffer.getvalue(), error, metrics)
+        cases_run += 1
+        if fail_fast and error is not None:
+            break
 
-            # Restore stdout and capture prints
-            sys.stdout = sys.__stdout__
-            print_logs.append(stdout_buffer.getvalue())
+    print(json.dumps({"cases_run": cases_run}))
+"""
 
-            results.append(result)
 
-        except Exception as e:
-            sys.stdout = sys.__stdout__  # Restore stdout on error
-            error_message = traceback.format_exc()
-            error_logs.append(error_message)
-            results.append(None)  # Placeholder for failed cases
+def limit_resources():
+    # Limit the address space to 256MB
+    resource.setrlimit(
+        resource.RLIMIT_AS, (256 * 1024 * 1024, 256 * 1024 * 1024)
+    )
+    # Limit CPU time to 5 seconds (this is in addition to the timeout)
+    resource.setrlimit(resource.RLIMIT_CPU, (5, 5))
 
-    # Print final output as JSON
-    print(json.dumps({"outputs": results, "print_logs": print_logs, "errors": error_logs}))
-"""
-        )
 
+def build_submission_script(user_code: str) -> str:
+    """Prelude imports, then the user's code, then the test case wrapper."""
+    return PRELUDE + user_code + "\n\n" + WRAPPER
+
+
+def _relay_stderr(stream, lines, on_progress):
+    """
+    Collects stderr lines, passing progress lines to on_progress. Lines
+    with PROGRESS_PREFIX that do not parse are dropped, as in the workers.
+    """
+    for line in stream:
+        if not line.startswith(PROGRESS_PREFIX):
+            lines.append(line)
+            continue
+        progress = parse_progress_line(line)
+        if progress is not None and on_progress is not None:
+            on_progress(progress)
+
+
+def _write_stdin(process, stdin_data):
     try:
-        result = subprocess.run(
-            ["python3", temp_script_name],
-            input=json.dumps(input_cases),
-            capture_output=True,
+        process.stdin.write(stdin_data)
+        process.stdin.close()
+    except (BrokenPipeError, OSError):
+        pass
+
+
+def run_script_cold(
+    script: str, stdin_data: str, timeout: float, on_progress=None
+) -> dict:
+    """
+    Runs the script in a fresh python3 interpreter (the pre-pool behaviour).
+    Returns {"stdout", "stderr", "returncode", "timed_out"}; progress lines
+    are passed to on_progress as they arrive instead, and the child is
+    killed once on_progress returns True.
+    """
+    # Write the script to a temporary file
+    with tempfile.NamedTemporaryFile(
+        delete=False, suffix=".py", mode="w"
+    ) as temp_script:
+        temp_script_name = temp_script.name
+        temp_script.write(script)
+
+    stdout_chunks, stderr_lines = [], []
+    stopped = threading.Event()
+    try:
+        process = subprocess.Popen(
+            [sys.executable, temp_script_name],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=5,
             preexec_fn=limit_resources,
         )
-    except subprocess.TimeoutExpired as e:
-        return {"error": "Time limit exceeded."}
+
+        def relay_progress(progress):
+            if on_progress(progress) and not stopped.is_set():
+                stopped.set()
+                process.kill()
+
+        # Feed stdin and drain stdout/stderr in threads, so a full pipe can
+        # never stall the child past the timeout.
+        pipes = [
+            threading.Thread(target=_write_stdin, args=(process, stdin_data)),
+            threading.Thread(
+                target=lambda: stdout_chunks.append(process.stdout.read())
+            ),
+            threading.Thread(
+                target=_relay_stderr,
+                args=(
+                    process.stderr,
+                    stderr_lines,
+                    relay_progress if on_progress is not None else None,
+                ),
+            ),
+        ]
+        for pipe in pipes:
+            pipe.start()
+        try:
+            process.wait(timeout=timeout)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            timed_out = True
+        for pipe in pipes:
+            pipe.join()
+        process.stdout.close()
+        process.stderr.close()
     finally:
         os.remove(temp_script_name)  # Clean up temp file
 
-    stdout_output = result.stdout.strip()
-    stderr_output = result.stderr.strip()
+    if timed_out:
+        return {
+            "stdout": "",
+            "stderr": "",
+            "returncode": None,
+            "timed_out": True,
+        }
+    return {
+        "stdout": "".join(stdout_chunks),
+        "stderr": "".join(stderr_lines),
+        "returncode": process.returncode,
+        "timed_out": False,
+    }
+
+
+def run_script(
+    script: str, stdin_data: str, timeout: float, on_progress=None
+) -> dict:
+    """
+    Runs the script in a warm sandbox worker, falling back to a cold
+    interpreter if the pool is disabled or a worker could not be used.
+    """
+    if SANDBOX_POOL_ENABLED:
+        try:
+            return get_sandbox_pool().run(
+                script, stdin_data, timeout, on_progress
+            )
+        except SandboxPoolError as e:
+            log.warning("sandbox_pool_unavailable", error=str(e))
+    return run_script_cold(script, stdin_data, timeout, on_progress)
+
+
+def progress_event(progress: dict, test_cases: dict):
+    """
+    Grades one finished case from the sandbox's progress line:
+    {"case", "total", "passed", "wall_ms"}, or None if it names no case.
+    """
+    index = progress.get("case")
+    expected_outputs = test_cases["outputs"]
+    if not isinstance(index, int) or not 0 <= index < len(expected_outputs):
+        return None
+    metrics = progress.get("metrics")
+    return {
+        "case": index,
+        "total": len(expected_outputs),
+        "passed": (
+            not progress.get("error")
+            and progress.get("output") == expected_outputs[index]
+        ),
+        "wall_ms": (
+            metrics.get("wall_ms") if isinstance(metrics, dict) else None
+        ),
+    }
+
+
+class CaseResults:
+    """
+    The per-case results a run streams back, graded against the expected
+    outputs as they arrive. A later line for the same case replaces it.
+    With fail_fast, the first failing case ends the run: add() returns True
+    to stop the sandbox and later lines are ignored.
+    """
+
+    def __init__(self, test_cases, on_progress=None, fail_fast=False):
+        self.test_cases = test_cases
+        self.on_progress = on_progress
+        self.fail_fast = fail_fast
+        self.records = {}
+        self.failed_case = None
+
+    def add(self, progress) -> bool:
+        if self.failed_case is not None:
+            return True
+        event = progress_event(progress, self.test_cases)
+        if event is None:
+            return False
+        self.records[event["case"]] = progress
+        if self.on_progress is not None:
+            self.on_progress(event)
+        if self.fail_fast and not event["passed"]:
+            self.failed_case = event["case"]
+            # Cases reported past the failing one do not count
+            for index in [i for i in self.records if i > event["case"]]:
+                del self.records[index]
+            return True
+        return False
+
+    def execution_result(self, launched_at) -> dict:
+        """
+        {"outputs", "print_logs", "errors", "metrics"} for the cases up to
+        the last one reported; cases without a line count as None.
+        """
+        count = max(self.records) + 1 if self.records else 0
+        records = [self.records.get(i, {}) for i in range(count)]
+        case_metrics = [
+            r["metrics"] if isinstance(r.get("metrics"), dict) else {}
+            for r in records
+        ]
+        started_at = records[0].get("started_at") if records else None
+        if not isinstance(started_at, (int, float)):
+            started_at = None
+        return {
+            "outputs": [r.get("output") for r in records],
+            "print_logs": [r.get("print_log") or "" for r in records],
+            "errors": [r["error"] for r in records if r.get("error")],
+            "metrics": {
+                "cases": case_metrics,
+                "total_wall_ms": _total(case_metrics, "wall_ms"),
+                "total_cpu_ms": _total(case_metrics, "cpu_ms"),
+                "peak_rss_kb": max(
+                    (m.get("peak_rss_kb") or 0 for m in case_metrics),
+                    default=None,
+                ),
+                "startup_ms": (
+                    round((started_at - launched_at) * 1000, 3)
+                    if started_at
+                    else None
+                ),
+                "started_at": started_at,
+            },
+        }
+
+
+def _total(case_metrics, field):
+    values = [m.get(field) for m in case_metrics]
+    return round(sum(v for v in values if isinstance(v, (int, float))), 3)
+
+
+def execute_user_code_subprocess(
+    user_code: str,
+    test_cases: dict,
+    fail_fast: bool = False,
+    on_progress=None,
+):
+    """
+    Executes user code inside a sandboxed child process, processing all test cases in one run.
+    With fail_fast, the run is stopped at the first exception or mismatch. Timing and
+    memory are reported under "metrics". Each case's result streams back as it finishes
+    and is graded here; on_progress is called with its progress_event().
+    """
+    # Expected outputs stay here: user code can read everything it is sent
+    stdin = {"inputs": test_cases["inputs"]}
+    if fail_fast:
+        stdin["fail_fast"] = True
+    # The sandbox's startup time is measured from here
+    launched_at = time.time()
+    stdin_data = json.dumps(stdin)
+    cases = CaseResults(test_cases, on_progress, fail_fast)
+
+    run = run_script(
+        build_submission_script(user_code),
+        stdin_data,
+        EXECUTION_TIMEOUT_SECONDS,
+        cases.add,
+    )
+    if run["timed_out"]:
+        return {"error": "Time limit exceeded."}
+
+    stdout_output = run["stdout"].strip()
+    stderr_output = run["stderr"].strip()
 
     if stderr_output:
         return {"error": stderr_output}
 
-    try:
-        execution_result = json.loads(stdout_output)
-        return execution_result  # {"outputs": [...], "print_logs": [...], "errors": [...]}
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse execution output."}
+    # A fail-fast run stopped at a failing case never gets to report
+    if cases.failed_case is None:
+        try:
+            summary = json.loads(stdout_output)
+        except json.JSONDecodeError:
+            summary = None
+        if not isinstance(summary, dict) or "cases_run" not in summary:
+            return {"error": "Failed to parse execution output."}
+
+    execution_result = cases.execution_result(launched_at)
+    if fail_fast:
+        execution_result["failed_case"] = cases.failed_case
+        execution_result["skipped_cases"] = len(test_cases["inputs"]) - len(
+            execution_result["outputs"]
+        )
+    return execution_result
 
 
 def evaluate_results(test_cases, execution_result):
-    print("Entering evaluate_results()...")
     """Compares actual and expected outputs, formats final JSON response."""
 
     # Extract actual outputs and console logs
@@ -142,6 +421,13 @@ def evaluate_results(test_cases, execution_result):
         expected = expected_outputs[i]
         passed_per_case.append(actual == expected)
 
+    # Fail-fast runs stop at failed_case: it and every skipped case failed,
+    # even where the expected output is null like the padding above
+    failed_case = execution_result.get("failed_case")
+    if failed_case is not None:
+        for i in range(failed_case, len(passed_per_case)):
+            passed_per_case[i] = False
+
     # Overall pass/fail is true if all test cases passed
     passed = all(passed_per_case)
 
@@ -149,7 +435,7 @@ def evaluate_results(test_cases, execution_result):
     error_message = error_logs[0] if error_logs else None
 
     # Format final response
-    return {
+    evaluation = {
         "passed": passed,
         "passed_per_case": passed_per_case,
         "error": error_message,
@@ -158,3 +444,11 @@ def evaluate_results(test_cases, execution_result):
         "expected_outputs": expected_outputs,
         "actual_outputs": actual_outputs,
     }
+    # Per-case and total wall/CPU time, peak RSS and sandbox startup time
+    if "metrics" in execution_result:
+        evaluation["metrics"] = execution_result["metrics"]
+    # Fail-fast runs report where they stopped; skipped cases count as failed
+    if "failed_case" in execution_result:
+        evaluation["failed_case"] = execution_result["failed_case"]
+        evaluation["skipped_cases"] = execution_result.get("skipped_cases", 0)
+    return evaluation
@@ -1,22 +1,13 @@
-import inspect
-
-# FOR THE exec() ENVIRONMENT:
-import math
-import collections
-import heapq
-import queue as q
-import itertools
+import ast
 import functools
-import bisect
-import re
-import json
-import string
-import datetime
-import statistics
-import random
-import typing
-from typing import List, Tuple, Dict, Set, Optional
-from collections import defaultdict, deque, Counter
+import types
+
+from structured_log import get_logger
+
+log = get_logger("code-evaluator")
+
+# Expected signatures kept per distinct starter code (one per problem)
+SIGNATURE_CACHE_SIZE = 256
 
 
 def add_pass_to_starter_method_body(starter_code: str) -> str:
@@ -34,107 +25,93 @@ def add_pass_to_starter_method_body(starter_code: str) -> str:
     return "\n".join(new_lines)
 
 
-def extract_method_signature(starter_code: str):
-    print("Entering extract_method_signature()...")
-
-    # Define a safe execution environment with required imports
-    exec_globals = {
-        "__builtins__": __builtins__,  # Safe built-in functions
-        "math": math,
-        "collections": collections,
-        "heapq": heapq,
-        "queue": q,
-        "itertools": itertools,
-        "functools": functools,
-        "bisect": bisect,
-        "re": re,
-        "json": json,
-        "string": string,
-        "datetime": datetime,
-        "statistics": statistics,
-        "random": random,
-        "typing": typing,  # Ensure typing module is available
-        "List": List,
-        "Tuple": Tuple,
-        "Dict": Dict,
-        "Set": Set,
-        "Optional": Optional,
-        "defaultdict": defaultdict,
-        "deque": deque,
-        "Counter": Counter,
-    }
-    exec_locals = {}  # Keeps execution isolated
+def annotation_source(annotation):
+    """An annotation as source text ('typing.' dropped), None if absent."""
+    if annotation is None:
+        return None
+    return ast.unparse(annotation).replace("typing.", "")
 
-    print("Running exec() in a sandbox environment...")
 
+def extract_method_signature(code: str):
+    """
+    Reads the single method of class Solution from the parsed source. Nothing
+    is executed, so module-level code in a submission never runs here.
+    """
     try:
-        exec(starter_code, exec_globals, exec_locals)  # Isolated execution
-    except Exception as e:
-        raise ValueError(f"Failed to execute starter code: {str(e)}")
-
-    print("exec() completed!")
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        raise ValueError(f"Failed to parse code: {str(e)}")
 
     # Ensure the Solution class exists
-    if "Solution" not in exec_locals:
+    classes = [
+        node
+        for node in tree.body
+        if isinstance(node, ast.ClassDef) and node.name == "Solution"
+    ]
+    if not classes:
         raise ValueError("Starter code must define a class named 'Solution'.")
 
-    # Get the class reference from the sandbox
-    solution_class = exec_locals["Solution"]
-
-    # Retrieve all methods inside the class
-    methods = inspect.getmembers(solution_class, inspect.isfunction)
+    # Retrieve all methods inside the class (the last definition wins)
+    methods = [
+        node
+        for node in classes[-1].body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+    method_names = {method.name for method in methods}
 
     # Ensure exactly one method exists
-    if len(methods) != 1:
+    if len(method_names) != 1:
         raise ValueError(
             "Starter code must contain exactly one method inside 'Solution'."
         )
 
-    # Extract method details
-    method_name, method_ref = methods[0]
-    method_signature = inspect.signature(method_ref)
-
     # Extract parameter details (excluding 'self')
-    param_names = list(method_signature.parameters.keys())[1:]  # Skip 'self'
-    param_types = [
-        param.annotation
-        for param in list(method_signature.parameters.values())[1:]
-    ]  # Skip 'self'
+    method = methods[-1]
+    args = method.args
+    params = args.posonlyargs + args.args
+    params += [args.vararg] if args.vararg else []
+    params += args.kwonlyargs
+    params += [args.kwarg] if args.kwarg else []
+    params = params[1:]  # Skip 'self'
 
     return {
-        "method_name": method_name,
-        "param_count": len(param_names),
-        "param_types": param_types,
+        "method_name": method.name,
+        "param_count": len(params),
+        "param_types": tuple(annotation_source(p.annotation) for p in params),
     }
 
 
-def validate_user_code(starter_code: str, user_code: str):
-    print("Entering validate_user_code()...")
-
+@functools.lru_cache(maxsize=SIGNATURE_CACHE_SIZE)
+def expected_method_signature(starter_code: str):
+    """
+    The signature the starter code asks for. Memoized per starter code, so
+    jobs for the same problem parse it only once per container; read-only,
+    since every caller shares the cached value.
+    """
     # Add 'pass' to method body in starter code
     starter_code = add_pass_to_starter_method_body(starter_code)
-    print(f"NEW STARTER CODE WITH PASS: {starter_code}")
-    print("Added 'pass' to starter_code method body")
+    return types.MappingProxyType(extract_method_signature(starter_code))
+
 
+def validate_user_code(starter_code: str, user_code: str):
     # Extract expected method details from the starter code
-    expected_signature = extract_method_signature(starter_code)
-    print("Signature extracted")
+    expected_signature = expected_method_signature(starter_code)
 
     # Extract the user’s method details
     try:
         user_signature = extract_method_signature(user_code)
     except Exception as e:
-        print(f"Invalid user code: {str(e)}")
+        log.info("validation_failed", reason=f"Invalid user code: {e}")
         return {"valid": False, "error": f"Invalid user code: {str(e)}"}
 
     # Compare method names
     if user_signature["method_name"] != expected_signature["method_name"]:
-        print("Incorrect method name in user code.")
+        log.info("validation_failed", reason="method name")
         return {"valid": False, "error": "Incorrect method name in user code."}
 
     # Compare parameter count
     if user_signature["param_count"] != expected_signature["param_count"]:
-        print("Incorrect number of parameters in user code.")
+        log.info("validation_failed", reason="parameter count")
         return {
             "valid": False,
             "error": "Incorrect number of parameters in user code.",
@@ -145,14 +122,13 @@ def validate_user_code(starter_code: str, user_code: str):
     user_types = user_signature["param_types"]
 
     if expected_types != user_types:
-        print("Parameter types do not match the starter code.")
+        log.info("validation_failed", reason="parameter types")
         return {
             "valid": False,
             "error": "Parameter types do not match the starter code.",
         }
 
     # If everything passes:
-    print("Validation success!")
     return {"valid": True, "message": "User code is valid!"}
 
 
@@ -0,0 +1,54 @@
+"""
+Timestamps of a job's way through the evaluator, carried in its stored
+result as "trace". main-api starts the trace (trace_id, enqueued_at), adds
+delivered_at and turns it into a per-stage breakdown (main-api/job_trace.py).
+All times are epoch seconds.
+"""
+
+import os
+import time
+
+# Jobs with more cases keep only the first and last case's finish time
+TRACE_MAX_CASES = int(os.getenv("TRACE_MAX_CASES", "100"))
+
+
+def now() -> float:
+    return round(time.time(), 6)
+
+
+def start_trace(body_obj: dict, record: dict) -> dict:
+    """The job's trace from its SQS message, marked as dequeued."""
+    trace = dict(body_obj.get("trace") or {})
+    # When the Lambda poller received the message (milliseconds)
+    received = (record.get("attributes") or {}).get(
+        "ApproximateFirstReceiveTimestamp"
+    )
+    if received:
+        trace["sqs_received_at"] = int(received) / 1000
+    trace["dequeued_at"] = now()
+    return trace
+
+
+def mark(trace, event: str):
+    """Sets <event>_at; a None trace (no job context) is ignored."""
+    if trace is not None:
+        trace[f"{event}_at"] = now()
+
+
+def mark_execution(trace, metrics):
+    """
+    Copies the sandbox's clock from the run metrics: sandbox_started_at and
+    when each case finished, as case_finished_ms from sandbox start.
+    """
+    if trace is None or not metrics or not metrics.get("started_at"):
+        return
+    started_at = metrics["started_at"]
+    trace["sandbox_started_at"] = started_at
+    finished = [case.get("done_ms") for case in metrics.get("cases") or []]
+    if not finished or None in finished:
+        return
+    if len(finished) > TRACE_MAX_CASES:
+        trace["case_finished_ms"] = [finished[0], finished[-1]]
+    else:
+        trace["case_finished_ms"] = finished
+    trace["cases_finished_at"] = round(started_at + finished[-1] / 1000, 6)
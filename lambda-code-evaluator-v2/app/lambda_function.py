@@ -1,43 +1,118 @@
 import json
 import asyncio
-from cache_storing import store_result_in_valkey
+import os
+from cache_storing import (
+    JOB_PROGRESS_ENABLED,
+    publish_job_progress,
+    store_result_in_valkey,
+)
 from code_validation import validate_user_code
-from code_execution import execute_user_code_subprocess, evaluate_results
+from code_execution import (
+    SANDBOX_POOL_ENABLED,
+    execute_user_code_subprocess,
+    evaluate_results,
+)
+from job_trace import mark, mark_execution, start_trace
+from latency_histograms import record_latency
+from sandbox_pool import SandboxPoolError, get_sandbox_pool
+from structured_log import StageTimer, get_logger
+from result_format import (
+    RESULT_FORMAT,
+    VISIBLE_TEST_CASES,
+    compact_evaluation,
+)
+from result_cache import (
+    RESULT_CACHE_ENABLED,
+    get_cached_result,
+    result_cache_key,
+    store_cached_result,
+)
 
+log = get_logger("code-evaluator")
 
-def process_submission(job_id, starter_code, user_code, test_cases):
+# Submissions graded at the same time within one SQS batch
+MAX_CONCURRENT_SUBMISSIONS = int(os.getenv("MAX_CONCURRENT_SUBMISSIONS", "2"))
+
+# One event loop for the container's lifetime: the shared Valkey client is
+# bound to the loop it was created on, so reusing it needs the same loop.
+EVENT_LOOP = asyncio.new_event_loop()
+
+# Start the warm sandbox workers during the Lambda init phase
+if SANDBOX_POOL_ENABLED:
+    try:
+        get_sandbox_pool()
+    except SandboxPoolError as e:
+        log.warning("sandbox_pool_not_started", error=str(e))
+
+
+def process_submission(
+    job_id,
+    starter_code,
+    user_code,
+    test_cases,
+    fail_fast=False,
+    on_progress=None,
+    trace=None,
+):
     """
     End-to-end function to validate, execute, and evaluate user code.
     Returns a structured JSON response with status, execution results, and errors.
+    With fail_fast, execution stops at the first failing test case.
+    on_progress is called with each test case's outcome as it finishes.
+    The job's trace (job_trace.py) gets each stage's timestamps.
     """
-    print("Entering process_submission()...")
-    print(
-        (
-            f"job_id: {job_id}, starter_code: {starter_code}, "
-            f"user_code: {user_code}, test_cases: {test_cases}"
-        )
+    mark(trace, "grading_started")
+    # The code and every test case; only dumped on DEBUG
+    log.debug(
+        "submission",
+        job_id=job_id,
+        starter_code=starter_code,
+        user_code=user_code,
+        test_cases=test_cases,
     )
+    timer = StageTimer()
 
     # Ensure required fields are present
     if not user_code or not job_id or not test_cases or not starter_code:
-        print("Required fields are missing")
+        log.warning("submission_incomplete", job_id=job_id)
         return {
             "job_status": "completed",
             "error": "Missing required fields: 'user_code', 'job_id', or 'test_cases'.",
         }
 
     # Step 1 & 2: Validate User Code
-    validation_result = validate_user_code(starter_code, user_code)
+    with timer.stage("validate"):
+        validation_result = validate_user_code(starter_code, user_code)
+    mark(trace, "validated")
     if "error" in validation_result:
+        log.info(
+            "job_graded", job_id=job_id, outcome="invalid", **timer.fields()
+        )
         return {"job_status": "completed", "error": validation_result["error"]}
 
     # Step 3: Execute User Code
-    execution_result = execute_user_code_subprocess(user_code, test_cases)
+    with timer.stage("execute"):
+        execution_result = execute_user_code_subprocess(
+            user_code, test_cases, fail_fast, on_progress
+        )
+    mark_execution(trace, execution_result.get("metrics"))
     if "error" in execution_result:
+        log.info(
+            "job_graded", job_id=job_id, outcome="error", **timer.fields()
+        )
         return {"job_status": "completed", "error": execution_result["error"]}
 
     # Step 4: Evaluate Results
-    evaluation_result = evaluate_results(test_cases, execution_result)
+    with timer.stage("evaluate"):
+        evaluation_result = evaluate_results(test_cases, execution_result)
+    mark(trace, "graded")
+    log.info(
+        "job_graded",
+        job_id=job_id,
+        outcome="passed" if evaluation_result.get("passed") else "failed",
+        cases=len(evaluation_result.get("passed_per_case") or []),
+        **timer.fields(),
+    )
 
     # Format final response
     evaluation_result.update({"job_status": "completed", "job_id": job_id})
@@ -45,73 +120,223 @@ def process_submission(job_id, starter_code, user_code, test_cases):
 
 
 # ------------------------------
-# Main handler for Lambda
+# SQS batch handling
 # ------------------------------
-def lambda_handler(event, context):
-    print("Entering lambda...", event)
-    try:
-        if "Records" in event:
-            record = event["Records"][0]  # batch size of 1
-
-            body_str = record["body"]  # SQS JSON string
-            body_obj = json.loads(body_str)  # Make into dict
-            user_code = body_obj.get("code")
-            test_cases = body_obj.get("test_cases")
-            job_id = body_obj.get("job_id")
-            starter_code = body_obj.get("starter_code")
-            user_id = body_obj.get("user_id")
-            difficulty = body_obj.get("difficulty")
-            is_submit = body_obj.get("is_submit")
-            problem_id = body_obj.get("problem_id")
-
-            if not user_code:
-                print("Missing user_code.")
-                return {
-                    "statusCode": 400,
-                    "body": json.dumps("Missing user_code."),
-                }
-            if not job_id:
-                print("Missing job_id.")
-                return {
-                    "statusCode": 400,
-                    "body": json.dumps("Missing job_id."),
-                }
-
-            input_cases = test_cases.get("inputs")
-            expected_outputs = test_cases.get("outputs")
-
-            if not input_cases or not expected_outputs:
-                print("Missing test case data.")
-                return {
-                    "statusCode": 400,
-                    "body": json.dumps("Missing test case data."),
-                }
-
-            print("Data from job successfully accessed.")
-            results = process_submission(
-                job_id, starter_code, user_code, test_cases
+class InvalidJobError(Exception):
+    """Raised for SQS records that can never be graded (bad payload)."""
+
+    pass
+
+
+def parse_job(record):
+    """Extracts and checks the job fields from one SQS record."""
+    body_str = record["body"]  # SQS JSON string
+    body_obj = json.loads(body_str)  # Make into dict
+    job = {
+        "user_code": body_obj.get("code"),
+        "test_cases": body_obj.get("test_cases"),
+        "job_id": body_obj.get("job_id"),
+        "starter_code": body_obj.get("starter_code"),
+        "user_id": body_obj.get("user_id"),
+        "difficulty": body_obj.get("difficulty"),
+        "is_submit": body_obj.get("is_submit"),
+        "problem_id": body_obj.get("problem_id"),
+        "language": body_obj.get("language") or "python",
+        "fail_fast": bool(body_obj.get("fail_fast")),
+        "visible_cases": body_obj.get("visible_cases", VISIBLE_TEST_CASES),
+        "trace": start_trace(body_obj, record),
+    }
+
+    if not job["user_code"]:
+        raise InvalidJobError("Missing user_code.")
+    if not job["job_id"]:
+        raise InvalidJobError("Missing job_id.")
+
+    test_cases = job["test_cases"] or {}
+    if not isinstance(test_cases, dict):
+        raise InvalidJobError("test_cases must be an object.")
+    if not test_cases.get("inputs") or not test_cases.get("outputs"):
+        raise InvalidJobError("Missing test case data.")
+
+    visible_cases = job["visible_cases"]
+    if (
+        not isinstance(visible_cases, int)
+        or isinstance(visible_cases, bool)
+        or visible_cases < 0
+    ):
+        raise InvalidJobError("visible_cases must be a non-negative integer.")
+    return job
+
+
+def tag_results(job, results):
+    """Adds the job's metadata to an evaluation."""
+    # Add difficulty and user_id to results
+    results.update(
+        {
+            "difficulty": job["difficulty"],
+            "user_id": job["user_id"],
+            "is_submit": job["is_submit"],
+            "problem_id": job["problem_id"],
+        }
+    )
+    if job.get("trace") is not None:
+        results["trace"] = job["trace"]
+    log.debug("job_results", job_id=job["job_id"], results=results)
+    return results
+
+
+def grade_job(job, on_progress=None):
+    """Runs the submission and tags the results with the job's metadata."""
+    results = process_submission(
+        job["job_id"],
+        job["starter_code"],
+        job["user_code"],
+        job["test_cases"],
+        job.get("fail_fast", False),
+        on_progress,
+        job.get("trace"),
+    )
+    return tag_results(job, results)
+
+
+def cacheable_evaluation(results):
+    """
+    The evaluation stored for identical submissions, without the job's
+    metadata or the run's metrics (timings and clock of this run only).
+    """
+    evaluation = {
+        k: v
+        for k, v in results.items()
+        if k
+        not in (
+            "difficulty",
+            "user_id",
+            "is_submit",
+            "problem_id",
+            "trace",
+            "metrics",
+        )
+    }
+    if isinstance(evaluation.get("cases"), dict):
+        evaluation["cases"] = {
+            index: {k: v for k, v in case.items() if k != "metrics"}
+            for index, case in evaluation["cases"].items()
+        }
+    return evaluation
+
+
+async def evaluate_job(job, semaphore):
+    """
+    Grades the job, reusing the stored evaluation of an identical earlier
+    submission (same problem, code, test cases and language) if there is one.
+    """
+    key = None
+    if RESULT_CACHE_ENABLED:
+        key = result_cache_key(
+            job["problem_id"],
+            job["user_code"],
+            job["test_cases"],
+            job["starter_code"],
+            job["language"],
+            job["fail_fast"],
+            job["visible_cases"],
+            RESULT_FORMAT,
+        )
+        cached = await get_cached_result(key)
+        if cached is not None:
+            if "job_id" in cached:
+                cached["job_id"] = job["job_id"]
+            mark(job.get("trace"), "graded")
+            return tag_results(job, cached)
+
+    # Progress arrives on the grading thread; publish it from the loop
+    loop = asyncio.get_running_loop()
+    published = []
+
+    def on_progress(event):
+        published.append(
+            asyncio.run_coroutine_threadsafe(
+                publish_job_progress(job["job_id"], event), loop
             )
+        )
+
+    async with semaphore:
+        # Grading blocks on the sandbox, so keep it off the event loop
+        results = await asyncio.to_thread(
+            grade_job, job, on_progress if JOB_PROGRESS_ENABLED else None
+        )
+    # Let the progress land before the final result is stored
+    if published:
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in published))
+
+    if RESULT_FORMAT == "compact":
+        results = compact_evaluation(results, job["visible_cases"])
+
+    # Cached hits did not run, so only fresh runs count towards the latencies
+    if "metrics" in results:
+        await record_latency(job["problem_id"], results["metrics"])
+
+    if key:
+        await store_cached_result(key, cacheable_evaluation(results))
+    return results
+
 
-            # Add difficulty and user_id to results
-            results.update(
-                {
-                    "difficulty": difficulty,
-                    "user_id": user_id,
-                    "is_submit": is_submit,
-                    "problem_id": problem_id,
-                }
+async def handle_record(record, semaphore):
+    job = parse_job(record)
+    results = await evaluate_job(job, semaphore)
+
+    # Store the updated results in Valkey
+    if not await store_result_in_valkey(job["job_id"], results):
+        raise RuntimeError(f"Could not store results for job {job['job_id']}")
+    return results
+
+
+async def handle_records(records):
+    """
+    Grades every record in the batch, at most MAX_CONCURRENT_SUBMISSIONS at a
+    time. Returns the SQS partial batch failures: records with bad payloads
+    are dropped (retrying cannot fix them), anything else that failed is
+    reported so SQS redelivers just that message.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SUBMISSIONS)
+    outcomes = await asyncio.gather(
+        *(handle_record(record, semaphore) for record in records),
+        return_exceptions=True,
+    )
+
+    batch_item_failures = []
+    for record, outcome in zip(records, outcomes):
+        message_id = record.get("messageId")
+        if isinstance(outcome, (InvalidJobError, json.JSONDecodeError)):
+            log.warning(
+                "message_dropped", message_id=message_id, error=str(outcome)
+            )
+        elif isinstance(outcome, Exception):
+            log.error(
+                "message_failed", message_id=message_id, error=str(outcome)
             )
-            print(f"results with user_id and diff: {results}")
+            batch_item_failures.append({"itemIdentifier": message_id})
+    return batch_item_failures
 
-            # Store the updated results in Valkey
-            print("Calling store result in Valkey")
-            asyncio.run(store_result_in_valkey(job_id, results))
 
-            return {"statusCode": 200, "body": json.dumps(results)}
+# ------------------------------
+# Main handler for Lambda
+# ------------------------------
+def lambda_handler(event, context):
+    """
+    Grades all records of an SQS batch. The event source mapping must have
+    ReportBatchItemFailures enabled for the returned failures to be used.
+    """
+    log.debug("lambda_event", event=event)
+    if "Records" not in event:
+        err = "Event not in expected SQS format!"
+        log.error("invalid_event", error=err)
+        return {"statusCode": 500, "body": json.dumps({"error": err})}
 
-        else:
-            err = "Event not in expected SQS format!"
-            print(err)
-            return {"statusCode": 500, "body": json.dumps({"error": err})}
-    except Exception as e:
-        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+    records = event["Records"]
+    with log.timed("batch_handled", records=len(records)) as fields:
+        batch_item_failures = EVENT_LOOP.run_until_complete(
+            handle_records(records)
+        )
+        fields["failures"] = len(batch_item_failures)
+    return {"batchItemFailures": batch_item_failures}
@@ -0,0 +1,62 @@
+import asyncio
+
+from cache_storing import get_valkey_client
+from result_cache import VALKEY_ERRORS
+from structured_log import get_logger
+
+log = get_logger("code-evaluator")
+
+# Upper bounds (ms) of the cumulative histogram buckets, as in Prometheus:
+# a run counts in every bucket it fits, and always in "inf"
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+# Run totals aggregated per problem
+HISTOGRAM_METRICS = ("total_wall_ms", "total_cpu_ms", "startup_ms")
+
+
+def latency_histogram_key(problem_id) -> str:
+    """
+    Hash of <metric>:le_<bound> counters plus <metric>:count and
+    <metric>:sum_ms for one problem.
+    """
+    return f"latency:{problem_id}"
+
+
+def bucket_labels(value_ms) -> list:
+    """le_<bound> of every bucket the value fits in, le_inf last."""
+    labels = [
+        f"le_{bound}" for bound in LATENCY_BUCKETS_MS if value_ms <= bound
+    ]
+    return labels + ["le_inf"]
+
+
+def histogram_increments(metrics: dict) -> dict:
+    """Hash field -> increment for one run's metrics."""
+    increments = {}
+    for metric in HISTOGRAM_METRICS:
+        value = metrics.get(metric)
+        if value is None:
+            continue
+        name = metric.replace("total_", "").replace("_ms", "")
+        for label in bucket_labels(value):
+            increments[f"{name}:{label}"] = 1
+        increments[f"{name}:count"] = 1
+        increments[f"{name}:sum_ms"] = int(round(value))
+    return increments
+
+
+async def record_latency(problem_id, metrics):
+    """Adds a fresh run's timings to the problem's histograms."""
+    increments = histogram_increments(metrics or {})
+    if not increments:
+        return
+    key = latency_histogram_key(problem_id)
+    try:
+        client = await get_valkey_client()
+        await asyncio.gather(
+            *(
+                client.hincrby(key, field, amount)
+                for field, amount in increments.items()
+            )
+        )
+    except VALKEY_ERRORS as e:
+        log.warning("latency_histograms_failed", error=str(e))
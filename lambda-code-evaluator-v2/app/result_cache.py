@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+from glide import (
+    ClosingError,
+    ConnectionError,
+    ExpirySet,
+    ExpiryType,
+    RequestError,
+    TimeoutError,
+)
+
+from cache_storing import get_valkey_client
+from structured_log import get_logger
+
+log = get_logger("code-evaluator")
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+# How long an evaluation is reused for identical submissions
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+# Hash with "hits" and "misses" counters, shared by all evaluator instances
+RESULT_CACHE_STATS_KEY = "result_cache:stats"
+
+VALKEY_ERRORS = (ClosingError, ConnectionError, RequestError, TimeoutError)
+
+# Hits and misses seen by this container, for the logs
+local_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_code(user_code: str) -> str:
+    """
+    Unifies line endings, which Python reads the same way. Whitespace is
+    kept: inside string literals it changes what the program does.
+    """
+    return user_code.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def result_cache_key(
+    problem_id,
+    user_code,
+    test_cases,
+    starter_code=None,
+    language="python",
+    fail_fast=False,
+    visible_cases=None,
+    result_format=None,
+):
+    """
+    result:<sha256 of problem, normalized code, test cases, starter code
+    (the signature the code is validated against), language, grading mode
+    and result format>.
+    """
+    material = json.dumps(
+        [
+            problem_id,
+            normalize_code(user_code),
+            test_cases,
+            starter_code,
+            language,
+            fail_fast,
+            visible_cases,
+            result_format,
+        ],
+        sort_keys=True,
+    )
+    return "result:" + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(evaluation: dict) -> bool:
+    """Time limits depend on load, so only deterministic outcomes are kept."""
+    return evaluation.get("error") != "Time limit exceeded."
+
+
+async def record_lookup(client, hit: bool):
+    field = "hits" if hit else "misses"
+    local_stats[field] += 1
+    try:
+        await client.hincrby(RESULT_CACHE_STATS_KEY, field, 1)
+    except VALKEY_ERRORS as e:
+        log.warning("result_cache_stats_failed", error=str(e))
+
+
+async def get_cached_result(key: str):
+    """The stored evaluation for the key, or None on a miss or error."""
+    try:
+        client = await get_valkey_client()
+        cached = await client.get(key)
+    except VALKEY_ERRORS as e:
+        log.warning("result_cache_lookup_failed", error=str(e))
+        return None
+
+    await record_lookup(client, cached is not None)
+    log.info(
+        "result_cache_lookup",
+        hit=cached is not None,
+        hits=local_stats["hits"],
+        misses=local_stats["misses"],
+    )
+    if cached is None:
+        return None
+    return json.loads(cached)
+
+
+async def store_cached_result(
+    key: str, evaluation: dict, ttl=RESULT_CACHE_TTL_SECONDS
+):
+    """Stores an evaluation for reuse; failures are only logged."""
+    if not is_cacheable(evaluation):
+        return
+    try:
+        client = await get_valkey_client()
+        await client.set(
+            key,
+            json.dumps(evaluation),
+            expiry=ExpirySet(ExpiryType.SEC, ttl),
+        )
+    except VALKEY_ERRORS as e:
+        log.warning("result_cache_store_failed", error=str(e))
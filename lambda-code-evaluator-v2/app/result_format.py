@@ -0,0 +1,135 @@
+import base64
+import json
+import os
+import zlib
+
+# "compact" stores pass bitmaps and failing/visible case details only;
+# "full" keeps the original per-case arrays.
+RESULT_FORMAT = os.getenv("RESULT_FORMAT", "compact")
+COMPACT_FORMAT = "compact-v1"
+# Cases shown in the problem page; always returned in full
+VISIBLE_TEST_CASES = 3
+# Failing hidden cases returned in full, after the visible ones
+MAX_DETAILED_FAILURES = int(os.getenv("MAX_DETAILED_FAILURES", "5"))
+MAX_LOG_ENTRY_CHARS = int(os.getenv("MAX_LOG_ENTRY_CHARS", "2000"))
+MAX_CONSOLE_CHARS = int(os.getenv("MAX_CONSOLE_CHARS", "10000"))
+MAX_ERROR_CHARS = int(os.getenv("MAX_ERROR_CHARS", "4000"))
+
+# Stored job results larger than this are zlib-compressed and base64-encoded
+RESULT_COMPRESSION = os.getenv("RESULT_COMPRESSION", "0") == "1"
+RESULT_COMPRESS_MIN_BYTES = int(os.getenv("RESULT_COMPRESS_MIN_BYTES", "1024"))
+COMPRESSED_PREFIX = "zlib:"
+
+
+def truncate(text, limit):
+    if text is None or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def encode_pass_bitmap(passed_per_case) -> str:
+    """Case i is bit i % 8 of byte i // 8, base64-encoded."""
+    bitmap = bytearray((len(passed_per_case) + 7) // 8)
+    for index, passed in enumerate(passed_per_case):
+        if passed:
+            bitmap[index // 8] |= 1 << (index % 8)
+    return base64.b64encode(bytes(bitmap)).decode("ascii")
+
+
+def decode_pass_bitmap(bitmap: str, case_count: int) -> list:
+    data = base64.b64decode(bitmap)
+    return [bool(data[i // 8] >> (i % 8) & 1) for i in range(case_count)]
+
+
+def cap_console(console_logs):
+    """Non-empty logs, each truncated, within MAX_CONSOLE_CHARS overall."""
+    kept, used = [], 0
+    for entry in console_logs or []:
+        if not entry:
+            continue
+        entry = truncate(entry, MAX_LOG_ENTRY_CHARS)
+        if used + len(entry) > MAX_CONSOLE_CHARS:
+            kept.append("... [console output truncated]\n")
+            break
+        kept.append(entry)
+        used += len(entry)
+    return kept or None
+
+
+def compact_evaluation(evaluation: dict, visible_cases=VISIBLE_TEST_CASES):
+    """
+    Replaces the per-case arrays of an evaluate_results() evaluation with a
+    pass bitmap plus "cases": {index: {"input", "expected", "actual"}} for the
+    visible cases and the first failing ones. Logs and the error are capped.
+    Evaluations without per-case results (errors) are returned unchanged.
+    """
+    if "passed_per_case" not in evaluation or "format" in evaluation:
+        return evaluation
+
+    passed_per_case = evaluation["passed_per_case"]
+    inputs = evaluation.get("inputs") or []
+    expected_outputs = evaluation.get("expected_outputs") or []
+    actual_outputs = evaluation.get("actual_outputs") or []
+    metrics = evaluation.get("metrics")
+    case_metrics = (metrics or {}).get("cases") or []
+
+    failing = [i for i, passed in enumerate(passed_per_case) if not passed]
+    detailed = set(range(min(visible_cases, len(passed_per_case))))
+    detailed.update(
+        [i for i in failing if i not in detailed][:MAX_DETAILED_FAILURES]
+    )
+
+    cases = {}
+    for index in sorted(detailed):
+        case = {
+            "input": inputs[index] if index < len(inputs) else None,
+            "expected": (
+                expected_outputs[index]
+                if index < len(expected_outputs)
+                else None
+            ),
+            "actual": (
+                actual_outputs[index] if index < len(actual_outputs) else None
+            ),
+        }
+        if index < len(case_metrics):
+            case["metrics"] = case_metrics[index]
+        cases[str(index)] = case
+
+    compact = {
+        key: value
+        for key, value in evaluation.items()
+        if key
+        not in (
+            "passed_per_case",
+            "inputs",
+            "expected_outputs",
+            "actual_outputs",
+            "console",
+            "error",
+            "metrics",
+        )
+    }
+    compact.update(
+        {
+            "format": COMPACT_FORMAT,
+            "case_count": len(passed_per_case),
+            "failed_count": len(failing),
+            "pass_bitmap": encode_pass_bitmap(passed_per_case),
+            "cases": cases,
+            "error": truncate(evaluation.get("error"), MAX_ERROR_CHARS),
+            "console": cap_console(evaluation.get("console")),
+        }
+    )
+    if metrics is not None:
+        compact["metrics"] = {k: v for k, v in metrics.items() if k != "cases"}
+    return compact
+
+
+def encode_job_result(job_result: dict) -> str:
+    """JSON, compressed when RESULT_COMPRESSION is on and it is worth it."""
+    encoded = json.dumps(job_result)
+    if not RESULT_COMPRESSION or len(encoded) < RESULT_COMPRESS_MIN_BYTES:
+        return encoded
+    compressed = zlib.compress(encoded.encode("utf-8"), 6)
+    return COMPRESSED_PREFIX + base64.b64encode(compressed).decode("ascii")
@@ -0,0 +1,174 @@
+import collections
+import json
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+import time
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+SANDBOX_POOL_SIZE = int(os.getenv("SANDBOX_POOL_SIZE", "2"))
+# Extra time a worker gets on top of the job timeout before it is presumed hung
+WORKER_GRACE_SECONDS = 5
+# Starts the stderr line with each test case's result that the submission
+# wrapper (code_execution.WRAPPER) writes as the case finishes. Workers pass
+# these lines on verbatim. User code can write them too, which is no more
+# than returning those outputs: expected outputs never enter the sandbox.
+PROGRESS_PREFIX = "@@progress "
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def parse_progress_line(line: str):
+    """The dict of a PROGRESS_PREFIX line, else None."""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        progress = json.loads(line.removeprefix(PROGRESS_PREFIX))
+    except ValueError:
+        return None
+    return progress if isinstance(progress, dict) else None
+
+
+class SandboxPoolError(Exception):
+    """Raised when a warm sandbox worker cannot run a job."""
+
+    pass
+
+
+class SandboxWorker:
+    """A long-lived interpreter with the prelude imported (sandbox_worker.py)."""
+
+    def __init__(self):
+        self._lines = collections.deque()
+        self._partial = b""
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=os.path.dirname(WORKER_SCRIPT),
+            text=True,
+            encoding="utf-8",
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def _read_line(self, deadline):
+        """
+        Reads one protocol line straight from the pipe, so select() never
+        misses lines sitting in a file object's buffer. None on EOF.
+        """
+        fd = self.process.stdout.fileno()
+        while not self._lines:
+            remaining = deadline - time.monotonic()
+            ready, _, _ = select.select([fd], [], [], max(remaining, 0))
+            if not ready:
+                raise SandboxPoolError("Sandbox worker stopped responding.")
+            data = os.read(fd, 65536)
+            if not data:
+                return None
+            *lines, self._partial = (self._partial + data).split(b"\n")
+            self._lines.extend(lines)
+        return self._lines.popleft()
+
+    def run(
+        self,
+        script: str,
+        stdin_data: str,
+        timeout: float,
+        on_progress=None,
+    ) -> dict:
+        request = {"script": script, "stdin": stdin_data, "timeout": timeout}
+        deadline = time.monotonic() + timeout + WORKER_GRACE_SECONDS
+        stop_sent = False
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            while True:
+                line = self._read_line(deadline)
+                if line is None:
+                    raise SandboxPoolError(
+                        "Sandbox worker exited unexpectedly."
+                    )
+                text = line.decode("utf-8", "replace")
+                if not text.startswith(PROGRESS_PREFIX):
+                    response = json.loads(text)
+                    break
+                progress = parse_progress_line(text)
+                if progress is None or on_progress is None:
+                    continue
+                if on_progress(progress) and not stop_sent:
+                    self.process.stdin.write(json.dumps({"stop": True}) + "\n")
+                    self.process.stdin.flush()
+                    stop_sent = True
+        except (OSError, ValueError) as e:
+            raise SandboxPoolError(f"Sandbox worker I/O failed: {e}") from e
+
+        if "worker_error" in response:
+            raise SandboxPoolError(response["worker_error"])
+        return response
+
+    def close(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of warm sandbox workers. Each job borrows one worker,
+    which forks a disposable child for it; workers that fail are replaced.
+    """
+
+    def __init__(self, size=SANDBOX_POOL_SIZE):
+        self.size = size
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(SandboxWorker())
+
+    def run(
+        self,
+        script: str,
+        stdin_data: str,
+        timeout: float,
+        on_progress=None,
+    ) -> dict:
+        """
+        Returns {"stdout", "stderr", "returncode", "timed_out"}; progress
+        lines are passed to on_progress while the job runs, and the job's
+        child is killed once on_progress returns True.
+        """
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                worker.close()
+                worker = SandboxWorker()
+            return worker.run(script, stdin_data, timeout, on_progress)
+        except SandboxPoolError:
+            worker.close()
+            worker = SandboxWorker()
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Returns the process-wide pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = SandboxPool()
+            except OSError as e:
+                raise SandboxPoolError(
+                    f"Could not start sandbox workers: {e}"
+                ) from e
+        return _pool
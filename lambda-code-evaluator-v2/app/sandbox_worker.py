@@ -0,0 +1,297 @@
+"""
+Warm sandbox worker, started by sandbox_pool.SandboxPool.
+
+The worker imports the submission prelude once, then loops over requests
+from the pool. Every submission runs in a disposable child forked from the
+worker, with the same rlimits as a cold run, so the child starts with all
+prelude modules already imported.
+
+Protocol (one JSON object per line):
+    request:  {"script": str, "stdin": str, "timeout": float}
+    progress: zero or more PROGRESS_PREFIX lines while the job runs, the
+              ones the child wrote to stderr, passed on verbatim
+    stop:     {"stop": true}, from the pool while the job runs: kill the
+              child now (fail-fast). Late ones arrive between jobs and are
+              ignored.
+    response: {"stdout": str, "stderr": str, "returncode": int | None,
+               "timed_out": bool}
+"""
+
+import builtins
+import json
+import linecache
+import os
+import selectors
+import signal
+import sys
+import time
+import traceback
+
+from code_execution import PRELUDE, limit_resources
+from sandbox_pool import PROGRESS_PREFIX
+
+SCRIPT_FILENAME = "<submission>"
+
+# Warm the interpreter: import everything submissions get for free.
+exec(PRELUDE, {})
+
+
+def _run_child(script):
+    """Runs in the forked child with fds 0/1/2 already redirected."""
+    limit_resources()
+    # Let tracebacks show the offending source lines.
+    linecache.cache[SCRIPT_FILENAME] = (
+        len(script),
+        None,
+        script.splitlines(True),
+        SCRIPT_FILENAME,
+    )
+    exit_code = 0
+    try:
+        code = compile(script, SCRIPT_FILENAME, "exec")
+        exec(code, {"__name__": "__main__", "__builtins__": builtins})
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Skip this frame so the traceback looks like a plain script run.
+        tb = e.__traceback__.tb_next if e.__traceback__ else None
+        traceback.print_exception(type(e), e, tb)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+class _StderrSplitter:
+    """
+    Splits progress lines out of the child's stderr as it arrives. Each read
+    passes its complete progress lines to on_progress as one bytes chunk.
+    """
+
+    prefix = PROGRESS_PREFIX.encode("utf-8")
+
+    def __init__(self, on_progress):
+        self.on_progress = on_progress
+        self.chunks = []
+        self._partial = b""
+
+    def feed(self, data):
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        self._split([line + b"\n" for line in lines])
+
+    def close(self):
+        if self._partial:
+            self._split([self._partial])
+            self._partial = b""
+
+    def _split(self, lines):
+        progress = []
+        for line in lines:
+            if line.startswith(self.prefix):
+                progress.append(line)
+            else:
+                self.chunks.append(line)
+        if progress and self.on_progress is not None:
+            # An unterminated last line still has to end its protocol line
+            data = b"".join(progress)
+            self.on_progress(data if data.endswith(b"\n") else data + b"\n")
+
+
+def _communicate(
+    stdin_fd,
+    stdout_fd,
+    stderr_fd,
+    stdin_data,
+    timeout,
+    on_progress=None,
+    control_fd=None,
+    on_stop=None,
+):
+    """
+    Feeds stdin to the child and collects stdout/stderr until both close or
+    the deadline passes. Anything arriving on control_fd (a stop message,
+    or EOF) calls on_stop once. Returns (stdout, stderr, timed_out).
+    """
+    deadline = time.monotonic() + timeout
+    pending_input = memoryview(stdin_data)
+    stderr = _StderrSplitter(on_progress)
+    chunks = {stdout_fd: [], stderr_fd: stderr}
+
+    selector = selectors.DefaultSelector()
+    if pending_input:
+        os.set_blocking(stdin_fd, False)
+        selector.register(stdin_fd, selectors.EVENT_WRITE)
+    else:
+        os.close(stdin_fd)
+    selector.register(stdout_fd, selectors.EVENT_READ)
+    selector.register(stderr_fd, selectors.EVENT_READ)
+    if control_fd is not None:
+        selector.register(control_fd, selectors.EVENT_READ)
+
+    def child_fds():
+        return [fd for fd in selector.get_map() if fd != control_fd]
+
+    timed_out = False
+    try:
+        while child_fds():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(remaining):
+                fd = key.fd
+                if fd == control_fd:
+                    # The protocol fd stays open for the next request
+                    os.read(fd, 65536)
+                    selector.unregister(fd)
+                    on_stop()
+                elif fd == stdin_fd:
+                    try:
+                        written = os.write(fd, pending_input[:65536])
+                    except BrokenPipeError:
+                        written = len(pending_input)
+                    pending_input = pending_input[written:]
+                    if not pending_input:
+                        selector.unregister(fd)
+                        os.close(fd)
+                else:
+                    data = os.read(fd, 65536)
+                    if fd == stderr_fd and data:
+                        stderr.feed(data)
+                    elif data:
+                        chunks[fd].append(data)
+                    else:
+                        selector.unregister(fd)
+                        os.close(fd)
+    finally:
+        for fd in list(selector.get_map()):
+            selector.unregister(fd)
+            if fd != control_fd:
+                os.close(fd)
+        selector.close()
+
+    stderr.close()
+    stdout = b"".join(chunks[stdout_fd]).decode("utf-8", "replace")
+    return (
+        stdout,
+        b"".join(stderr.chunks).decode("utf-8", "replace"),
+        timed_out,
+    )
+
+
+def _wait_child(pid, deadline):
+    """Reaps the child, killing it if it outlives the deadline."""
+    while True:
+        waited_pid, status = os.waitpid(pid, os.WNOHANG)
+        if waited_pid:
+            return os.waitstatus_to_exitcode(status), False
+        if time.monotonic() >= deadline:
+            os.kill(pid, signal.SIGKILL)
+            _, status = os.waitpid(pid, 0)
+            return os.waitstatus_to_exitcode(status), True
+        time.sleep(0.001)
+
+
+def run_job(request, protocol_fds, send_raw=None):
+    script = request["script"]
+    stdin_data = request.get("stdin", "").encode("utf-8")
+    timeout = float(request["timeout"])
+    deadline = time.monotonic() + timeout
+
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            for fd in (stdin_w, stdout_r, stderr_r, *protocol_fds):
+                os.close(fd)
+            os.dup2(stdin_r, 0)
+            os.dup2(stdout_w, 1)
+            os.dup2(stderr_w, 2)
+            for fd in (stdin_r, stdout_w, stderr_w):
+                os.close(fd)
+            _run_child(script)
+        finally:
+            os._exit(1)
+
+    for fd in (stdin_r, stdout_w, stderr_w):
+        os.close(fd)
+
+    def send_progress(lines):
+        send_raw(lines.decode("utf-8", "replace"))
+
+    def stop_child():
+        os.kill(pid, signal.SIGKILL)
+
+    on_progress = send_progress if send_raw is not None else None
+
+    stdout, stderr, timed_out = _communicate(
+        stdin_w,
+        stdout_r,
+        stderr_r,
+        stdin_data,
+        timeout,
+        on_progress,
+        protocol_fds[0] if send_raw is not None else None,
+        stop_child,
+    )
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+    returncode, killed = _wait_child(pid, deadline)
+    timed_out = timed_out or killed
+
+    return {
+        "stdout": "" if timed_out else stdout,
+        "stderr": "" if timed_out else stderr,
+        "returncode": None if timed_out else returncode,
+        "timed_out": timed_out,
+    }
+
+
+def main():
+    # Keep the protocol on private fds so a child can never inherit buffered
+    # protocol data on its stdin/stdout.
+    protocol_in = os.dup(0)
+    protocol_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(2, 1)
+    os.close(devnull)
+
+    requests = os.fdopen(protocol_in, "r", encoding="utf-8")
+    responses = os.fdopen(protocol_out, "w", encoding="utf-8")
+    protocol_fds = (protocol_in, protocol_out)
+
+    def send_raw(text):
+        responses.write(text)
+        responses.flush()
+
+    def send(message):
+        send_raw(json.dumps(message) + "\n")
+
+    for line in requests:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if request.get("stop"):
+                continue
+            response = run_job(request, protocol_fds, send_raw)
+        except Exception as e:
+            response = {"worker_error": f"{type(e).__name__}: {e}"}
+        send(response)
+
+
+if __name__ == "__main__":
+    main()
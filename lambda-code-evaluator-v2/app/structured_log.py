@@ -0,0 +1,148 @@
+"""
+Leveled, structured logging: one JSON object per line on stdout, which
+CloudWatch can filter by field. Kept in sync with the copy in
+main-api/structured_log.py.
+
+    log = get_logger("code-evaluator")
+    log.info("job_enqueued", job_id=job_id, test_cases=12)
+    log.debug("job_payload", payload=job_payload)  # off unless LOG_LEVEL=DEBUG
+
+Events below LOG_LEVEL cost one comparison: fields are not formatted.
+DEBUG and INFO events are kept with probability LOG_SAMPLE_RATE (or the
+event's own sample=); warnings and errors are always written. Field values
+are capped at LOG_MAX_FIELD_CHARS once serialized.
+"""
+
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+LOG_LEVEL = LEVELS.get(os.getenv("LOG_LEVEL", "INFO").upper(), INFO)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+
+_loggers = {}
+
+
+def cap_field(value, limit=LOG_MAX_FIELD_CHARS):
+    """Numbers, booleans and None as they are; anything else as capped text."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if not isinstance(value, str):
+        try:
+            value = json.dumps(value, default=str)
+        except (TypeError, ValueError):
+            value = repr(value)
+    if len(value) > limit:
+        return f"{value[:limit]}... [{len(value) - limit} more chars]"
+    return value
+
+
+class StructuredLogger:
+    def __init__(self, name, level=None, sample_rate=None, stream=None):
+        self.name = name
+        self.level = LOG_LEVEL if level is None else level
+        self.sample_rate = (
+            LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        )
+        self.stream = stream
+
+    def enabled(self, level) -> bool:
+        return level >= self.level
+
+    def log(self, level, event, sample=None, **fields):
+        if level < self.level:
+            return
+        if level < WARNING:
+            rate = self.sample_rate if sample is None else sample
+            if rate < 1 and random.random() >= rate:
+                return
+        record = {
+            "ts": round(time.time(), 3),
+            "level": LEVEL_NAMES.get(level, str(level)),
+            "logger": self.name,
+            "event": event,
+        }
+        for key, value in fields.items():
+            record[key] = cap_field(value)
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(record) + "\n")
+
+    def debug(self, event, **fields):
+        self.log(DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        self.log(INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self.log(WARNING, event, **fields)
+
+    def error(self, event, **fields):
+        self.log(ERROR, event, **fields)
+
+    @contextlib.contextmanager
+    def timed(self, event, level=INFO, **fields):
+        """
+        Logs the event with duration_ms once the block finishes. Fields
+        added to the yielded dict are logged too. If the block raises, the
+        event is logged at WARNING (or above) with error=<exception type>.
+        """
+        start = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields["error"] = type(e).__name__
+            level = max(level, WARNING)
+            raise
+        finally:
+            fields["duration_ms"] = round(
+                (time.perf_counter() - start) * 1000, 3
+            )
+            self.log(level, event, **fields)
+
+
+class StageTimer:
+    """
+    Times consecutive stages of one request so they can be logged together:
+
+        timer = StageTimer()
+        with timer.stage("validate"):
+            ...
+        log.info("job_graded", **timer.fields())  # validate_ms=..., total_ms=
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.durations[name] = self.durations.get(name, 0) + elapsed
+
+    def fields(self) -> dict:
+        timings = {
+            f"{name}_ms": round(ms, 3) for name, ms in self.durations.items()
+        }
+        timings["total_ms"] = round(
+            (time.perf_counter() - self.start) * 1000, 3
+        )
+        return timings
+
+
+def get_logger(name) -> StructuredLogger:
+    """One logger per name, configured from the LOG_* environment."""
+    if name not in _loggers:
+        _loggers[name] = StructuredLogger(name)
+    return _loggers[name]
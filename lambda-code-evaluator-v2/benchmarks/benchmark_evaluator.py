@@ -0,0 +1,240 @@
+"""
+Offline benchmark of the grading pipeline (process_submission in
+app/lambda_function.py) and its stages. It runs the sample problems in
+app/test_data_*.py plus synthetic large-input and many-case problems:
+
+  validation   validate_user_code (signature cache warm, as per container)
+  startup      sandbox launch to first test case (wrapper "startup_ms")
+  case         wall time of each test case inside the sandbox
+  evaluate     evaluate_results
+  job          process_submission end to end
+
+Reports p50/p95/p99 per stage and jobs per second, then compares the p50s
+with benchmarks/baseline.json. Exits 1 if a stage is slower than the
+baseline by more than the tolerance (and MIN_REGRESSION_MS). Baselines are
+machine-specific; record one with --update-baseline before comparing changes.
+
+Run from lambda-code-evaluator-v2: python benchmarks/benchmark_evaluator.py
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "app")
+sys.path.insert(0, os.path.abspath(APP_DIR))
+
+import code_execution  # noqa: E402
+from code_execution import (  # noqa: E402
+    evaluate_results,
+    execute_user_code_subprocess,
+)
+from code_validation import validate_user_code  # noqa: E402
+from lambda_function import process_submission  # noqa: E402
+from test_data_1 import SOLUTION_CODE_1, TEST_DATA_1  # noqa: E402
+from test_data_2 import SOLUTION_CODE_2, TEST_DATA_2  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+STAGES = ("validation", "startup", "case", "evaluate", "job")
+# Allowed p50 slowdown against the baseline before a stage is flagged
+DEFAULT_TOLERANCE = 0.5
+# Smaller slowdowns are run-to-run noise, however large relatively
+MIN_REGRESSION_MS = 0.25
+
+
+def sample_problems():
+    """{name: (starter_code, user_code, test_cases)}"""
+    # test_data_2's solution is a stdin script; grade its process_string
+    # through the Solution interface submissions use.
+    process_string = SOLUTION_CODE_2.split("\ndef main():")[0]
+    large_input = list(range(200_000, 0, -1))
+    return {
+        "test_data_1": (
+            "class Solution:\n    def evaluate(self, a, b):\n",
+            SOLUTION_CODE_1,
+            TEST_DATA_1,
+        ),
+        "test_data_2": (
+            "class Solution:\n    def format_pairs(self, s):\n",
+            process_string
+            + "\n\nclass Solution:\n"
+            + "    def format_pairs(self, s):\n"
+            + "        return [process_string(s)]\n",
+            TEST_DATA_2,
+        ),
+        "large_input": (
+            "class Solution:\n"
+            "    def kth_smallest(self, nums: List[int], k: int) -> int:\n",
+            "class Solution:\n"
+            "    def kth_smallest(self, nums: List[int], k: int) -> int:\n"
+            "        return sorted(nums)[k - 1]\n",
+            {
+                "inputs": [[large_input, k] for k in (1, 1000, 100_000)],
+                "outputs": [1, 1000, 100_000],
+            },
+        ),
+        "many_cases": (
+            "class Solution:\n    def add(self, a: int, b: int) -> int:\n",
+            "class Solution:\n"
+            "    def add(self, a: int, b: int) -> int:\n"
+            "        return a + b\n",
+            {
+                "inputs": [[i, i + 1] for i in range(1000)],
+                "outputs": [2 * i + 1 for i in range(1000)],
+            },
+        ),
+    }
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+        "p99": round(percentile(samples, 99), 3),
+    }
+
+
+def elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark_problem(starter_code, user_code, test_cases, runs):
+    """Times each stage over `runs` jobs; returns {stage: summary}."""
+    samples = {stage: [] for stage in STAGES}
+    # Warm the sandbox pool and the signature cache, as a warm container is
+    process_submission("warmup", starter_code, user_code, test_cases)
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        validate_user_code(starter_code, user_code)
+        samples["validation"].append(elapsed_ms(start))
+
+        execution = execute_user_code_subprocess(user_code, test_cases)
+        if "error" in execution:
+            raise RuntimeError(f"Benchmark job failed: {execution['error']}")
+        metrics = execution["metrics"]
+        samples["startup"].append(metrics["startup_ms"])
+        samples["case"].extend(case["wall_ms"] for case in metrics["cases"])
+
+        start = time.perf_counter()
+        evaluate_results(test_cases, execution)
+        samples["evaluate"].append(elapsed_ms(start))
+
+        start = time.perf_counter()
+        process_submission("bench", starter_code, user_code, test_cases)
+        samples["job"].append(elapsed_ms(start))
+
+    report = {stage: summarize(values) for stage, values in samples.items()}
+    report["jobs_per_second"] = round(
+        1000 / (sum(samples["job"]) / len(samples["job"])), 2
+    )
+    return report
+
+
+def run_benchmarks(runs, problems=None):
+    results = {}
+    for name, problem in sample_problems().items():
+        if problems and name not in problems:
+            continue
+        # The pipeline logs every job; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = benchmark_problem(*problem, runs)
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Returns (problem, stage, baseline p50, p50) of every regression."""
+    regressions = []
+    for name, report in results.items():
+        for stage in STAGES:
+            expected = baseline.get(name, {}).get(stage, {}).get("p50")
+            actual = report[stage]["p50"]
+            if expected is None or actual - expected < MIN_REGRESSION_MS:
+                continue
+            if actual > expected * (1 + tolerance):
+                regressions.append((name, stage, expected, actual))
+    return regressions
+
+
+def print_report(results, baseline):
+    print(
+        f"{'problem':<14}{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'baseline p50':>14}"
+    )
+    for name, report in results.items():
+        for stage in STAGES:
+            row = report[stage]
+            expected = baseline.get(name, {}).get(stage, {}).get("p50")
+            print(
+                f"{name:<14}{stage:<12}{row['p50']:>10.3f}{row['p95']:>10.3f}"
+                f"{row['p99']:>10.3f}"
+                f"{'-' if expected is None else f'{expected:.3f}':>14}"
+            )
+        print(f"{name:<14}{'jobs/s':<12}{report['jobs_per_second']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--problem", action="append", dest="problems")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="run without the warm sandbox pool",
+    )
+    args = parser.parse_args(argv)
+
+    if args.cold:
+        code_execution.SANDBOX_POOL_ENABLED = False
+    results = run_benchmarks(args.runs, args.problems)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(
+                {
+                    "machine": platform.platform(),
+                    "python": platform.python_version(),
+                    "runs": args.runs,
+                    "sandbox_pool": code_execution.SANDBOX_POOL_ENABLED,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    for name, stage, expected, actual in regressions:
+        print(
+            f"REGRESSION {name}/{stage}: p50 {actual:.3f} ms vs baseline "
+            f"{expected:.3f} ms (+{args.tolerance:.0%} allowed)"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Stored size of the sample jobs' results (app/test_data_1/2) in the full and
+compact formats (app/result_format.py), with and without compression, also
+for the samples scaled up to a submit-sized test set.
+
+Run from lambda-code-evaluator-v2: python benchmarks/compare_payload_sizes.py
+"""
+
+import base64
+import contextlib
+import io
+import json
+import os
+import sys
+import zlib
+
+APP_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "app")
+sys.path.insert(0, os.path.abspath(APP_DIR))
+
+from code_execution import evaluate_results  # noqa: E402
+from result_format import COMPRESSED_PREFIX, compact_evaluation  # noqa: E402
+from test_data_1 import SOLUTION_CODE_1, TEST_DATA_1  # noqa: E402
+from test_data_2 import SOLUTION_CODE_2, TEST_DATA_2  # noqa: E402
+
+
+def run_in_process(code, call, test_cases):
+    namespace = {"__name__": "sample"}
+    exec(code, namespace)
+    outputs, print_logs = [], []
+    for case in test_cases["inputs"]:
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            outputs.append(call(namespace, case))
+        print_logs.append(buffer.getvalue())
+    return {"outputs": outputs, "print_logs": print_logs, "errors": []}
+
+
+def scaled(test_cases, repeat, widen):
+    return {
+        "inputs": [
+            [value * widen for value in case]
+            for case in test_cases["inputs"] * repeat
+        ],
+        "outputs": test_cases["outputs"] * repeat,
+    }
+
+
+def stored_bytes(output, compress):
+    """Size of the job result as stored, forcing compression either way."""
+    encoded = json.dumps({"status": "completed", "output": output})
+    if not compress:
+        return len(encoded)
+    compressed = zlib.compress(encoded.encode("utf-8"), 6)
+    return len(
+        COMPRESSED_PREFIX + base64.b64encode(compressed).decode("ascii")
+    )
+
+
+def compare_payload_sizes():
+    samples = [
+        (
+            "test_data_1",
+            SOLUTION_CODE_1,
+            lambda ns, case: ns["Solution"]().evaluate(*case),
+            TEST_DATA_1,
+        ),
+        (
+            "test_data_2",
+            SOLUTION_CODE_2,
+            lambda ns, case: [ns["process_string"](*case)],
+            TEST_DATA_2,
+        ),
+    ]
+    samples += [
+        (f"{name} x200", code, call, scaled(test_cases, 200, 20))
+        for name, code, call, test_cases in samples
+    ]
+
+    sizes = {}
+    for name, code, call, test_cases in samples:
+        full = evaluate_results(
+            test_cases, run_in_process(code, call, test_cases)
+        )
+        compact = compact_evaluation(full)
+        sizes[name] = {
+            "full": stored_bytes(full, False),
+            "compact": stored_bytes(compact, False),
+            "compact+zlib": stored_bytes(compact, True),
+        }
+        row = sizes[name]
+        print(
+            f"{name}: full {row['full']} B, compact {row['compact']} B, "
+            f"compact+zlib {row['compact+zlib']} B "
+            f"({row['full'] / row['compact+zlib']:.1f}x smaller)"
+        )
+    return sizes
+
+
+if __name__ == "__main__":
+    compare_payload_sizes()
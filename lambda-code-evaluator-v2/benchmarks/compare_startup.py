@@ -0,0 +1,59 @@
+"""
+Times a trivial submission run cold (fresh interpreter, app/code_execution.py)
+and warm (forked from a pool worker, app/sandbox_pool.py) and prints the
+per-job latency of each.
+
+Run from lambda-code-evaluator-v2: python benchmarks/compare_startup.py
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "app")
+sys.path.insert(0, os.path.abspath(APP_DIR))
+
+from code_execution import (  # noqa: E402
+    build_submission_script,
+    run_script_cold,
+)
+from sandbox_pool import SandboxPool  # noqa: E402
+
+
+def compare_startup(runs=20):
+    script = build_submission_script(
+        "class Solution:\n    def solve(self, x):\n        return x\n"
+    )
+    stdin_data = json.dumps([[1]])
+    pool = SandboxPool(size=1)
+    # The first job waits for the worker to finish importing the prelude.
+    pool.run(script, stdin_data, 5)
+
+    timings = {"cold": [], "warm": []}
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_script_cold(script, stdin_data, 5)
+        timings["cold"].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        pool.run(script, stdin_data, 5)
+        timings["warm"].append((time.perf_counter() - start) * 1000)
+    pool.close()
+
+    for mode, samples in timings.items():
+        print(
+            f"{mode}: mean {statistics.mean(samples):.1f} ms, "
+            f"p50 {statistics.median(samples):.1f} ms, "
+            f"max {max(samples):.1f} ms over {runs} runs"
+        )
+    speedup = statistics.mean(timings["cold"]) / statistics.mean(
+        timings["warm"]
+    )
+    print(f"warm start is {speedup:.1f}x faster")
+    return timings
+
+
+if __name__ == "__main__":
+    compare_startup()
@@ -0,0 +1,87 @@
+import json
+import time
+
+import code_execution
+from code_execution import evaluate_results, execute_user_code_subprocess
+
+
+def test_skipped_fail_fast_cases_count_as_failed():
+    test_cases = {
+        "inputs": [[1], [2], [3], [4]],
+        "outputs": [1, 0, None, None],
+    }
+    # Stopped at case 1; cases 2 and 3 never ran
+    execution = {
+        "outputs": [1, 5],
+        "print_logs": ["", ""],
+        "errors": [],
+        "failed_case": 1,
+        "skipped_cases": 2,
+    }
+
+    evaluation = evaluate_results(test_cases, execution)
+
+    assert evaluation["passed_per_case"] == [True, False, False, False]
+    assert evaluation["passed"] is False
+    assert evaluation["failed_case"] == 1
+
+
+def test_failing_case_with_null_expected_output_fails():
+    test_cases = {"inputs": [[1], [2]], "outputs": [None, None]}
+    execution = {
+        "outputs": [None],
+        "print_logs": [""],
+        "errors": ["Traceback ...\nValueError"],
+        "failed_case": 0,
+        "skipped_cases": 1,
+    }
+
+    evaluation = evaluate_results(test_cases, execution)
+
+    assert evaluation["passed_per_case"] == [False, False]
+
+
+def test_complete_run_is_unchanged():
+    test_cases = {"inputs": [[1], [2]], "outputs": [1, None]}
+    execution = {"outputs": [1, None], "print_logs": ["", ""], "errors": []}
+
+    evaluation = evaluate_results(test_cases, execution)
+
+    assert evaluation["passed_per_case"] == [True, True]
+    assert evaluation["passed"] is True
+
+
+def test_fail_fast_stops_the_sandbox_at_the_first_mismatch(monkeypatch):
+    monkeypatch.setattr(code_execution, "SANDBOX_POOL_ENABLED", False)
+    code = (
+        "import time\n"
+        "class Solution:\n"
+        "    def f(self, x):\n"
+        "        if x == 3:\n"
+        "            time.sleep(3)\n"
+        "        return 5 if x == 2 else x * 2\n"
+    )
+    test_cases = {"inputs": [[1], [2], [3]], "outputs": [2, 4, 6]}
+
+    start = time.perf_counter()
+    result = execute_user_code_subprocess(code, test_cases, fail_fast=True)
+
+    assert time.perf_counter() - start < 2
+    assert result["outputs"] == [2, 5]
+    assert result["failed_case"] == 1
+    assert result["skipped_cases"] == 1
+
+
+def test_fail_fast_runs_get_no_expected_outputs(monkeypatch):
+    sent = []
+
+    def fake_run_script(script, stdin_data, timeout, on_progress=None):
+        sent.append(json.loads(stdin_data))
+        return {"stdout": "", "stderr": "", "timed_out": True}
+
+    monkeypatch.setattr(code_execution, "run_script", fake_run_script)
+    test_cases = {"inputs": [[1]], "outputs": ["secret"]}
+
+    execute_user_code_subprocess("", test_cases, fail_fast=True)
+
+    assert sent == [{"inputs": [[1]], "fail_fast": True}]
@@ -0,0 +1,32 @@
+import pytest
+
+from code_validation import expected_method_signature, validate_user_code
+
+STARTER = "class Solution:\n    def twoSum(self, nums: List[int], k: int):\n"
+
+
+def test_cached_signature_is_read_only():
+    signature = expected_method_signature(STARTER)
+
+    with pytest.raises(TypeError):
+        signature["method_name"] = "other"
+    with pytest.raises(AttributeError):
+        signature["param_types"].append("str")
+    assert expected_method_signature(STARTER) is signature
+    assert signature["param_types"] == ("List[int]", "int")
+
+
+def test_validate_user_code_compares_with_the_cached_signature():
+    user_code = (
+        "class Solution:\n"
+        "    def twoSum(self, nums: List[int], k: int):\n"
+        "        return []\n"
+    )
+    wrong_types = user_code.replace("k: int", "k: str")
+
+    for _ in range(2):
+        assert validate_user_code(STARTER, user_code)["valid"] is True
+        assert validate_user_code(STARTER, wrong_types) == {
+            "valid": False,
+            "error": "Parameter types do not match the starter code.",
+        }
@@ -0,0 +1,36 @@
+from latency_histograms import bucket_labels, histogram_increments
+
+
+def test_buckets_are_cumulative():
+    assert bucket_labels(1) == [
+        "le_1",
+        "le_5",
+        "le_10",
+        "le_50",
+        "le_100",
+        "le_500",
+        "le_1000",
+        "le_5000",
+        "le_inf",
+    ]
+    assert bucket_labels(700) == ["le_1000", "le_5000", "le_inf"]
+    assert bucket_labels(5000.5) == ["le_inf"]
+
+
+def test_histogram_increments():
+    increments = histogram_increments(
+        {"total_wall_ms": 42.6, "total_cpu_ms": 7000, "startup_ms": None}
+    )
+    assert increments == {
+        "wall:le_50": 1,
+        "wall:le_100": 1,
+        "wall:le_500": 1,
+        "wall:le_1000": 1,
+        "wall:le_5000": 1,
+        "wall:le_inf": 1,
+        "wall:count": 1,
+        "wall:sum_ms": 43,
+        "cpu:le_inf": 1,
+        "cpu:count": 1,
+        "cpu:sum_ms": 7000,
+    }
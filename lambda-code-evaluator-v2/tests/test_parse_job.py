@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from lambda_function import InvalidJobError, parse_job
+from result_format import VISIBLE_TEST_CASES
+
+
+def record(**fields):
+    body = {
+        "code": "class Solution:\n    pass\n",
+        "job_id": "job-1",
+        "test_cases": {"inputs": [[1]], "outputs": [1]},
+    }
+    body.update(fields)
+    return {"body": json.dumps(body)}
+
+
+def test_visible_cases_defaults_and_passes_through():
+    assert parse_job(record())["visible_cases"] == VISIBLE_TEST_CASES
+    assert parse_job(record(visible_cases=0))["visible_cases"] == 0
+    assert parse_job(record(visible_cases=10))["visible_cases"] == 10
+
+
+@pytest.mark.parametrize("visible_cases", [-1, "3", 2.5, None, True, [3]])
+def test_invalid_visible_cases_are_rejected(visible_cases):
+    with pytest.raises(InvalidJobError):
+        parse_job(record(visible_cases=visible_cases))
+
+
+@pytest.mark.parametrize("test_cases", [[[1], [1]], "inputs", 3, None, {}])
+def test_malformed_test_cases_are_rejected(test_cases):
+    with pytest.raises(InvalidJobError):
+        parse_job(record(test_cases=test_cases))
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import cache_storing
+import code_execution
+from code_execution import (
+    _relay_stderr,
+    execute_user_code_subprocess,
+    progress_event,
+)
+from sandbox_pool import PROGRESS_PREFIX, parse_progress_line
+from sandbox_worker import _StderrSplitter
+
+TEST_CASES = {"inputs": [[1], [2]], "outputs": [2, 4]}
+
+
+def progress_line(progress):
+    return f"{PROGRESS_PREFIX}{json.dumps(progress)}\n"
+
+
+def test_parse_progress_line():
+    line = progress_line({"case": 0, "output": 2})
+    assert parse_progress_line(line) == {"case": 0, "output": 2}
+    assert parse_progress_line("@@progres {}\n") is None
+    assert parse_progress_line(f"{PROGRESS_PREFIX}[1]\n") is None
+    assert parse_progress_line(f"{PROGRESS_PREFIX}{{\n") is None
+
+
+def test_splitter_joins_a_line_split_across_reads():
+    forwarded = []
+    splitter = _StderrSplitter(forwarded.append)
+    line = progress_line({"case": 0, "output": 2}).encode()
+    data = b"\n" + line + b"\n" + line
+    splitter.feed(data[:9])
+    splitter.feed(data[9:20])
+    assert forwarded == []
+    splitter.feed(data[20:])
+    splitter.close()
+    # Complete lines of one read go on together, verbatim
+    assert forwarded == [line + line]
+    assert b"".join(splitter.chunks).strip() == b""
+
+
+def test_splitter_ends_an_unterminated_progress_line():
+    forwarded = []
+    splitter = _StderrSplitter(forwarded.append)
+    splitter.feed(b'@@progress {"case": 0')
+    splitter.close()
+    assert forwarded == [b'@@progress {"case": 0\n']
+    assert splitter.chunks == []
+
+
+def test_splitter_keeps_an_unterminated_line_as_stderr():
+    events = []
+    splitter = _StderrSplitter(events.append)
+    splitter.feed(b"Traceback (most recent call last):\nValueError: bad")
+    splitter.close()
+    assert events == []
+    assert b"".join(splitter.chunks) == (
+        b"Traceback (most recent call last):\nValueError: bad"
+    )
+
+
+def test_relay_stderr_splits_progress_lines():
+    lines, events = [], []
+    _relay_stderr(
+        ["oops\n", progress_line({"case": 1}), "@@progress nope\n"],
+        lines,
+        events.append,
+    )
+    # Malformed progress lines are dropped, as the workers drop them
+    assert lines == ["oops\n"]
+    assert events == [{"case": 1}]
+
+
+def test_progress_event_grades_against_expected_outputs():
+    assert progress_event({"case": 5, "output": 2}, TEST_CASES) is None
+    assert progress_event({"case": "0"}, TEST_CASES) is None
+    assert progress_event(
+        {"case": 1, "output": 4, "metrics": {"wall_ms": 0.2}}, TEST_CASES
+    ) == {"case": 1, "total": 2, "passed": True, "wall_ms": 0.2}
+    failed = progress_event({"case": 0, "output": 3}, TEST_CASES)
+    assert failed["passed"] is False
+    raised = progress_event(
+        {"case": 0, "output": 2, "error": "Traceback"}, TEST_CASES
+    )
+    assert raised["passed"] is False
+
+
+def test_expected_outputs_never_reach_the_sandbox(monkeypatch):
+    monkeypatch.setattr(code_execution, "SANDBOX_POOL_ENABLED", False)
+    # Reads its own stdin and claims whatever "expected" it finds
+    code = (
+        "import sys, json, os\n"
+        "d = json.loads(sys.stdin.read())\n"
+        "if isinstance(d, dict) and 'expected' in d:\n"
+        "    print(json.dumps({'cases_run': 2}))\n"
+        "    for i, out in enumerate(d['expected']):\n"
+        "        sys.stderr.write('\\n@@progress ' + json.dumps(\n"
+        "            {'case': i, 'output': out, 'error': None}) + '\\n')\n"
+        "    os._exit(0)\n"
+        "class Solution:\n"
+        "    def f(self, x):\n"
+        "        return 0\n"
+    )
+    events = []
+    result = execute_user_code_subprocess(
+        code, TEST_CASES, on_progress=events.append
+    )
+    assert "error" in result
+    assert not any(event["passed"] for event in events)
+
+
+def test_sandbox_streams_outputs_graded_here(monkeypatch):
+    monkeypatch.setattr(code_execution, "SANDBOX_POOL_ENABLED", False)
+    code = (
+        "class Solution:\n"
+        "    def f(self, x):\n"
+        "        print('case', x)\n"
+        "        return x * 2 if x == 1 else 5\n"
+    )
+    events = []
+    result = execute_user_code_subprocess(
+        code, TEST_CASES, on_progress=events.append
+    )
+    assert result["outputs"] == [2, 5]
+    assert result["print_logs"] == ["case 1\n", "case 2\n"]
+    assert result["errors"] == []
+    assert len(result["metrics"]["cases"]) == 2
+    assert result["metrics"]["startup_ms"] > 0
+    assert [(e["case"], e["passed"]) for e in events] == [
+        (0, True),
+        (1, False),
+    ]
+
+
+def test_spoofed_progress_lines_are_graded_like_outputs(monkeypatch):
+    monkeypatch.setattr(code_execution, "SANDBOX_POOL_ENABLED", False)
+    code = (
+        "import sys\n"
+        "class Solution:\n"
+        "    def f(self, x):\n"
+        '        sys.stderr.write(\'@@progress {"case": 1, "output": 7}\\n\')\n'
+        "        return x * 2\n"
+    )
+    events = []
+    result = execute_user_code_subprocess(
+        code, TEST_CASES, on_progress=events.append
+    )
+    # The wrapper's own line for each case comes last and wins
+    assert result["outputs"] == [2, 4]
+    last_events = {event["case"]: event["passed"] for event in events}
+    assert last_events == {0: True, 1: True}
+    assert (1, False) in [(e["case"], e["passed"]) for e in events]
+
+
+def test_every_progress_append_refreshes_the_ttl(monkeypatch):
+    calls = []
+
+    class FakeClient:
+        async def xadd(self, key, values):
+            calls.append(("xadd", key))
+
+        async def expire(self, key, ttl):
+            calls.append(("expire", key, ttl))
+
+        async def publish(self, message, channel):
+            calls.append(("publish", channel))
+
+    async def fake_client():
+        return FakeClient()
+
+    monkeypatch.setattr(cache_storing, "get_valkey_client", fake_client)
+    for case in (1, 2):
+        asyncio.run(
+            cache_storing.publish_job_progress("job", {"case": case}, ttl=60)
+        )
+    assert calls.count(("expire", "job_progress:job", 60)) == 2
+    assert calls[0] == ("xadd", "job_progress:job")
@@ -0,0 +1,103 @@
+import asyncio
+
+import lambda_function
+from result_cache import normalize_code, result_cache_key
+
+TEST_CASES = {"inputs": [[1]], "outputs": [1]}
+STARTER = "class Solution:\n    def f(self, x):\n"
+
+
+def test_line_endings_share_a_key():
+    code = "class Solution:\n    def f(self, x):\n        return x\n"
+    assert result_cache_key(1, code, TEST_CASES, STARTER) == result_cache_key(
+        1, code.replace("\n", "\r\n"), TEST_CASES, STARTER
+    )
+
+
+def test_whitespace_inside_strings_changes_the_key():
+    padded = 's = """a   \nb"""'
+    plain = 's = """a\nb"""'
+    assert normalize_code(padded) != normalize_code(plain)
+    assert result_cache_key(1, padded, TEST_CASES, STARTER) != (
+        result_cache_key(1, plain, TEST_CASES, STARTER)
+    )
+
+
+def test_starter_code_is_part_of_the_key():
+    code = "class Solution:\n    def f(self, x):\n        return x\n"
+    other_starter = "class Solution:\n    def f(self, x: int) -> int:\n"
+    assert result_cache_key(1, code, TEST_CASES, STARTER) != (
+        result_cache_key(1, code, TEST_CASES, other_starter)
+    )
+
+
+def test_cache_hits_do_not_repeat_the_run_metrics(monkeypatch):
+    store = {}
+    latencies = []
+    metrics = {
+        "cases": [{"wall_ms": 1.0, "done_ms": 3.0}],
+        "total_wall_ms": 1.0,
+        "started_at": 1700000000.0,
+    }
+
+    async def get_cached_result(key):
+        return dict(store[key]) if key in store else None
+
+    async def store_cached_result(key, evaluation):
+        store[key] = evaluation
+
+    async def record_latency(problem_id, run_metrics):
+        latencies.append(run_metrics)
+
+    def grade_job(job, on_progress=None):
+        return lambda_function.tag_results(
+            job,
+            {
+                "passed_per_case": [True],
+                "inputs": [[1]],
+                "expected_outputs": [1],
+                "actual_outputs": [1],
+                "console": [""],
+                "error": None,
+                "metrics": metrics,
+            },
+        )
+
+    for name, value in [
+        ("RESULT_CACHE_ENABLED", True),
+        ("RESULT_FORMAT", "compact"),
+        ("JOB_PROGRESS_ENABLED", False),
+        ("get_cached_result", get_cached_result),
+        ("store_cached_result", store_cached_result),
+        ("record_latency", record_latency),
+        ("grade_job", grade_job),
+    ]:
+        monkeypatch.setattr(lambda_function, name, value)
+    job = {
+        "job_id": "job-1",
+        "problem_id": 1,
+        "user_code": "class Solution:\n    def f(self, x):\n        return x\n",
+        "test_cases": TEST_CASES,
+        "starter_code": STARTER,
+        "language": "python",
+        "fail_fast": False,
+        "visible_cases": 1,
+        "difficulty": "introductory",
+        "user_id": "user-1",
+        "is_submit": False,
+    }
+
+    async def evaluate_twice():
+        semaphore = asyncio.Semaphore(1)
+        fresh = await lambda_function.evaluate_job(dict(job), semaphore)
+        hit = await lambda_function.evaluate_job(dict(job), semaphore)
+        return fresh, hit
+
+    fresh, hit = asyncio.run(evaluate_twice())
+
+    assert fresh["metrics"]["started_at"] == metrics["started_at"]
+    assert fresh["cases"]["0"]["metrics"]["done_ms"] == 3.0
+    assert "metrics" not in hit
+    assert "metrics" not in hit["cases"]["0"]
+    assert hit["pass_bitmap"] == fresh["pass_bitmap"]
+    assert len(latencies) == 1
@@ -0,0 +1,112 @@
+import json
+import time
+
+import pytest
+
+from code_execution import build_submission_script
+from sandbox_pool import SandboxPool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """One worker, so consecutive jobs share it."""
+    pool = SandboxPool(size=1)
+    yield pool
+    pool.close()
+
+
+def worker_pid(pool):
+    return pool._idle.queue[0].process.pid
+
+
+def test_runs_a_submission(pool):
+    script = build_submission_script(
+        "class Solution:\n    def f(self, x):\n        return x * 2\n"
+    )
+    progress = []
+
+    run = pool.run(script, json.dumps([[1], [2]]), 5, progress.append)
+
+    assert run["timed_out"] is False
+    assert run["returncode"] == 0
+    assert run["stderr"].strip() == ""
+    assert json.loads(run["stdout"]) == {"cases_run": 2}
+    assert [(p["case"], p["output"]) for p in progress] == [(0, 2), (1, 4)]
+
+
+def test_timeout_kills_the_child_and_keeps_the_worker(pool):
+    pid = worker_pid(pool)
+    start = time.monotonic()
+
+    run = pool.run("import time\ntime.sleep(10)\n", "", 0.5)
+
+    assert run["timed_out"] is True
+    assert time.monotonic() - start < 3
+    assert worker_pid(pool) == pid
+    assert pool.run("print('after')\n", "", 5)["stdout"] == "after\n"
+
+
+@pytest.mark.parametrize(
+    "script, returncode",
+    [
+        ("import os\nos._exit(3)\n", 3),
+        ("import os, signal\nos.kill(os.getpid(), signal.SIGKILL)\n", -9),
+        ("raise SystemExit(2)\n", 2),
+        ("1 / 0\n", 1),
+    ],
+)
+def test_child_crashes_are_reported(pool, script, returncode):
+    pid = worker_pid(pool)
+
+    run = pool.run(script, "", 5)
+
+    assert run["returncode"] == returncode
+    assert run["timed_out"] is False
+    assert worker_pid(pool) == pid
+
+
+def test_state_does_not_leak_between_jobs(pool):
+    pool.run(
+        "import json, builtins, sys\n"
+        "json.leaked = True\n"
+        "builtins.leaked = True\n"
+        "sys.modules['leaked'] = json\n"
+        "open('/dev/null').close()\n",
+        "",
+        5,
+    )
+
+    run = pool.run(
+        "import json, builtins, sys\n"
+        "print(hasattr(json, 'leaked'), hasattr(builtins, 'leaked'),"
+        " 'leaked' in sys.modules)\n",
+        "",
+        5,
+    )
+
+    assert run["stdout"] == "False False False\n"
+
+
+def test_stopping_kills_the_child_and_keeps_the_worker(pool):
+    pid = worker_pid(pool)
+    script = (
+        "import sys, time\n"
+        "sys.stderr.write('@@progress {\"case\": 0}\\n')\n"
+        "sys.stderr.flush()\n"
+        "time.sleep(10)\n"
+    )
+    start = time.monotonic()
+
+    run = pool.run(script, "", 5, lambda progress: True)
+
+    assert time.monotonic() - start < 3
+    assert run["returncode"] == -9
+    assert worker_pid(pool) == pid
+    assert pool.run("print('after')\n", "", 5)["stdout"] == "after\n"
+
+
+def test_a_dead_worker_is_replaced(pool):
+    pool._idle.queue[0].process.kill()
+    pool._idle.queue[0].process.wait()
+
+    assert pool.run("print('replaced')\n", "", 5)["stdout"] == "replaced\n"
@@ -1,6 +1,200 @@
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from db_client import supabase
+import leaderboard_cache
+
+# Rows fetched per request when reconciling (PostgREST caps responses)
+RECONCILE_PAGE_SIZE = 1000
+
+
+def fetch_leaderboard_rows():
+    """Every row of the Supabase leaderboard table, one page at a time."""
+    columns = ", ".join(
+        ["user_id", "display_name"]
+        + leaderboard_cache.LEADERBOARD_DIFFICULTIES
+    )
+    rows = []
+    start = 0
+    while True:
+        response = (
+            supabase.table("leaderboard")
+            .select(columns)
+            .order("user_id")
+            .range(start, start + RECONCILE_PAGE_SIZE - 1)
+            .execute()
+        )
+        result = response.dict()
+        if result.get("error"):
+            error_msg = result["error"].get("message", "Unknown error")
+            raise RuntimeError(f"Error fetching leaderboard: {error_msg}")
+        page = result.get("data", [])
+        rows.extend(page)
+        if len(page) < RECONCILE_PAGE_SIZE:
+            return rows
+        start += RECONCILE_PAGE_SIZE
+
+
+def reconcile_handler():
+    """
+    Scheduled job: rebuilds the Valkey sorted sets from Supabase, fixing any
+    drift from missed or duplicated increments.
+    """
+    try:
+        rows = fetch_leaderboard_rows()
+        counts = leaderboard_cache.run(
+            leaderboard_cache.reconcile_leaderboard(rows)
+        )
+    except Exception as e:
+        error_msg = f"Leaderboard reconcile failed: {str(e)}"
+        print("DEBUG:", error_msg)
+        return {"statusCode": 500, "body": json.dumps({"error": error_msg})}
+
+    print("DEBUG: Reconciled leaderboard:", counts)
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"message": "Leaderboard reconciled", **counts}),
+    }
+
+
+def fetch_display_name(user_id):
+    """
+    The user's display name from Supabase, or None if they have no
+    leaderboard row or name yet, so none is cached for them.
+    """
+    response = (
+        supabase.table("leaderboard")
+        .select("display_name")
+        .eq("user_id", user_id)
+        .limit(1)
+        .execute()
+    )
+    rows = response.dict().get("data") or []
+    if not rows:
+        return None
+    return rows[0].get("display_name") or None
+
+
+def update_leaderboard_cache(user_id, difficulty):
+    """
+    Mirrors a recorded completion into the Valkey leaderboard. Failures are
+    only logged: Supabase stays the source of truth and the scheduled
+    reconcile repairs the sorted sets.
+    """
+    if difficulty not in leaderboard_cache.LEADERBOARD_DIFFICULTIES:
+        return
+    try:
+        display_name = None
+        if not leaderboard_cache.run(
+            leaderboard_cache.has_display_name(user_id)
+        ):
+            display_name = fetch_display_name(user_id)
+        score = leaderboard_cache.run(
+            leaderboard_cache.record_completion(
+                user_id, difficulty, display_name
+            )
+        )
+        print(f"DEBUG: Leaderboard score for {user_id} ({difficulty}):", score)
+    except Exception as e:
+        print("DEBUG: Failed to update Valkey leaderboard:", e)
+
+
+def validate_submission(data):
+    """
+    Checks a submission's required fields and optional completed_at, and
+    renames problem_id to question_id in place. Returns an error message,
+    or None if the submission is valid.
+    """
+    required_fields = ["user_id", "problem_id", "difficulty"]
+    for field in required_fields:
+        if field not in data or not data[field]:
+            error_msg = f"Missing required field: {field}"
+            print("DEBUG:", error_msg)
+            return error_msg
+
+    data["question_id"] = data.pop("problem_id")
+
+    if "completed_at" in data and data["completed_at"]:
+        try:
+            datetime.fromisoformat(data["completed_at"])
+        except Exception as e:
+            error_msg = "Invalid 'completed_at' format. Must be ISO 8601."
+            print("DEBUG:", error_msg, e)
+            return error_msg
+    return None
+
+
+def insert_completions(rows):
+    """Inserts rows into completed_questions; raises if Supabase refuses."""
+    response = supabase.table("completed_questions").insert(rows).execute()
+    result = response.dict()
+    if result.get("error"):
+        raise RuntimeError(result["error"].get("message", "Unknown error"))
+
+
+def batch_handler(records):
+    """
+    Records a batch of submissions from SQS with one multi-row insert.
+    Each message body is a JSON submission (user_id, problem_id, difficulty,
+    optional completed_at). Invalid messages are dropped, and a
+    (user_id, question_id) pair is inserted once per batch. If the insert
+    fails, the rows are retried one by one and only the messages whose own
+    row failed are reported back to SQS for retry.
+    """
+    rows = {}
+    # (user_id, question_id) -> ids of the messages carrying that pair
+    message_ids = {}
+    for record in records:
+        try:
+            data = json.loads(record.get("body") or "")
+        except json.JSONDecodeError as e:
+            print(f"DEBUG: Dropping message {record.get('messageId')}:", e)
+            continue
+        if not isinstance(data, dict) or validate_submission(data):
+            print(f"DEBUG: Dropping invalid message {record.get('messageId')}")
+            continue
+
+        pair = (str(data["user_id"]), str(data["question_id"]))
+        message_ids.setdefault(pair, []).append(record["messageId"])
+        if pair in rows:
+            continue
+        # Every row carries the same columns, as a multi-row insert requires.
+        rows[pair] = {
+            "user_id": data["user_id"],
+            "question_id": data["question_id"],
+            "difficulty": data["difficulty"],
+            "completed_at": data.get("completed_at")
+            or datetime.now(timezone.utc).isoformat(),
+        }
+
+    print(
+        f"DEBUG: {len(rows)} unique completions in a batch of {len(records)}."
+    )
+    if not rows:
+        return {"batchItemFailures": []}
+
+    failed = []
+    try:
+        insert_completions(list(rows.values()))
+    except Exception as e:
+        # One bad row fails the whole insert; keep the others out of the DLQ
+        print("DEBUG: Batch insert failed, retrying row by row:", e)
+        for pair, row in rows.items():
+            try:
+                insert_completions([row])
+            except Exception as e:
+                print(f"DEBUG: Insert failed for {pair}:", e)
+                failed.append(pair)
+
+    for pair, row in rows.items():
+        if pair not in failed:
+            update_leaderboard_cache(row["user_id"], row["difficulty"])
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_id}
+            for pair in failed
+            for message_id in message_ids[pair]
+        ]
+    }
 
 
 def lambda_handler(event, context):
@@ -9,9 +203,21 @@ def lambda_handler(event, context):
     or query string parameters, parse it, and insert the record into the
     'completed_questions' table in Supabase.
     Expected fields: user_id, question_id, difficulty, and optionally completed_at.
+    SQS invocations record a whole batch of submissions in one insert, and
+    scheduled (EventBridge) invocations reconcile the Valkey leaderboard.
     """
     print("DEBUG: Received event:", json.dumps(event))
 
+    if (
+        event.get("source") == "aws.events"
+        or event.get("action") == "reconcile"
+    ):
+        return reconcile_handler()
+
+    records = event.get("Records") or []
+    if records and records[0].get("eventSource") == "aws:sqs":
+        return batch_handler(records)
+
     # 1. Attempt to get the body from the event
     body_str = event.get("body", "")
     if body_str:
@@ -43,35 +249,17 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": error_msg}),
             }
 
-    # 3. Validate required fields
-    required_fields = ["user_id", "problem_id", "difficulty"]
-    for field in required_fields:
-        if field not in data or not data[field]:
-            error_msg = f"Missing required field: {field}"
-            print("DEBUG:", error_msg)
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": error_msg}),
-            }
-
-    data["question_id"] = data.pop("problem_id")
-
-    # 4. Validate and process completed_at if provided
-    if "completed_at" in data and data["completed_at"]:
-        try:
-            datetime.fromisoformat(data["completed_at"])
-            print("DEBUG: 'completed_at' is valid ISO 8601.")
-        except Exception as e:
-            error_msg = "Invalid 'completed_at' format. Must be ISO 8601."
-            print("DEBUG:", error_msg, e)
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": error_msg}),
-            }
+    # 3. Validate required fields and completed_at
+    error_msg = validate_submission(data)
+    if error_msg:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": error_msg}),
+        }
 
     print("DEBUG: Final input data to be inserted:", data)
 
-    # 5. Insert data into Supabase 'completed_questions' table.
+    # 4. Insert data into Supabase 'completed_questions' table.
     try:
         print(
             "DEBUG: Inserting data into Supabase table 'completed_questions'..."
@@ -91,6 +279,8 @@ def lambda_handler(event, context):
         print("DEBUG:", error_msg)
         return {"statusCode": 500, "body": json.dumps({"error": error_msg})}
 
+    update_leaderboard_cache(data["user_id"], data["difficulty"])
+
     success_msg = "Data inserted successfully"
     print("DEBUG:", success_msg, "Inserted data:", result.get("data"))
     return {
@@ -0,0 +1,153 @@
+import asyncio
+import os
+from glide import (
+    ClosingError,
+    ConnectionError,
+    GlideClient,
+    GlideClientConfiguration,
+    Logger,
+    LogLevel,
+    NodeAddress,
+)
+
+VALKEY_HOST = os.getenv(
+    "VALKEY_HOST", "main-cache-mutbnm.serverless.eun1.cache.amazonaws.com"
+)
+VALKEY_PORT = int(os.getenv("VALKEY_PORT", "6379"))
+
+# Score columns of the Supabase leaderboard table mirrored in Valkey
+LEADERBOARD_DIFFICULTIES = ["introductory", "interview"]
+# user_id -> display_name for every member of the sorted sets
+LEADERBOARD_NAMES_KEY = "leaderboard:names"
+
+Logger.set_logger_config(LogLevel.INFO)
+
+# Reused across warm invocations; must stay on the loop it was created on.
+valkey_client = None
+
+
+def leaderboard_key(difficulty):
+    """
+    Sorted set of user_id -> score for one difficulty. The difficulty is a
+    hash tag so the rebuild key lives in the same slot and can be renamed
+    over it.
+    """
+    return f"leaderboard:{{{difficulty}}}"
+
+
+async def get_valkey_client():
+    """Returns the shared Valkey client, connecting on first use."""
+    global valkey_client
+    if valkey_client is None:
+        addresses = [NodeAddress(VALKEY_HOST, VALKEY_PORT)]
+        config = GlideClientConfiguration(addresses=addresses, use_tls=True)
+        valkey_client = await GlideClient.create(config)
+        print("DEBUG: Connected to Valkey.")
+    return valkey_client
+
+
+async def reset_valkey_client():
+    """Drops the shared client so the next call reconnects."""
+    global valkey_client
+    client, valkey_client = valkey_client, None
+    if client:
+        try:
+            await client.close()
+        except ClosingError as e:
+            print("DEBUG: Error closing Valkey client:", e)
+
+
+async def with_valkey_client(operation, action, idempotent=True):
+    """
+    Awaits operation(client) on the shared client, reconnecting and trying
+    once more if the connection was lost. action completes the error
+    message ("Could not reach Valkey to <action>."). A non-idempotent
+    operation is only retried if connecting failed: once sent, it may have
+    been applied even though the reply was lost.
+    """
+    for attempt in range(2):
+        sent = False
+        try:
+            client = await get_valkey_client()
+            sent = True
+            return await operation(client)
+        except (ClosingError, ConnectionError) as e:
+            print(f"DEBUG: Valkey connection lost (attempt {attempt + 1}):", e)
+            await reset_valkey_client()
+            if sent and not idempotent:
+                break
+    raise ConnectionError(f"Could not reach Valkey to {action}.")
+
+
+async def record_completion(user_id, difficulty, display_name=None):
+    """
+    Adds one solve to the user's score in the difficulty's sorted set, an
+    O(log n) update that is visible to the next leaderboard read.
+    Not retried after a lost connection, so a solve is never counted twice;
+    the scheduled reconcile restores a lost increment. Returns the new score.
+    """
+
+    async def operation(client):
+        score = await client.zincrby(leaderboard_key(difficulty), 1, user_id)
+        if display_name is not None:
+            await client.hset(LEADERBOARD_NAMES_KEY, {user_id: display_name})
+        return score
+
+    return await with_valkey_client(
+        operation, "update the leaderboard", idempotent=False
+    )
+
+
+async def has_display_name(user_id):
+    async def operation(client):
+        return await client.hget(LEADERBOARD_NAMES_KEY, user_id) is not None
+
+    return await with_valkey_client(operation, "look up a display name")
+
+
+async def reconcile_leaderboard(rows):
+    """
+    Rebuilds the sorted sets and names from Supabase leaderboard rows
+    ({"user_id", "display_name", <difficulty>: score, ...}). Each set is
+    built under a temporary key and renamed into place, so readers never
+    see a half-built ranking. A rebuild cut off by a lost connection starts
+    over. Returns the number of members per difficulty.
+    """
+
+    async def operation(client):
+        counts = {}
+        for difficulty in LEADERBOARD_DIFFICULTIES:
+            key = leaderboard_key(difficulty)
+            members = {
+                row["user_id"]: row.get(difficulty) or 0
+                for row in rows
+                if row.get("user_id")
+            }
+            if members:
+                rebuild_key = f"{key}:rebuild"
+                await client.delete([rebuild_key])
+                await client.zadd(rebuild_key, members)
+                await client.rename(rebuild_key, key)
+            else:
+                await client.delete([key])
+            counts[difficulty] = len(members)
+
+        names = {
+            row["user_id"]: row.get("display_name") or ""
+            for row in rows
+            if row.get("user_id")
+        }
+        if names:
+            await client.hset(LEADERBOARD_NAMES_KEY, names)
+        return counts
+
+    return await with_valkey_client(operation, "reconcile the leaderboard")
+
+
+# Lambda invocations are synchronous; run every coroutine on one loop so the
+# shared client stays usable across warm invocations.
+EVENT_LOOP = asyncio.new_event_loop()
+
+
+def run(coroutine):
+    return EVENT_LOOP.run_until_complete(coroutine)
@@ -0,0 +1,135 @@
+import os
+import sys
+import types
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import leaderboard_cache  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def dict(self):
+        return {"data": self.data}
+
+
+class FakeInsert:
+    def __init__(self, supabase, table, rows):
+        self.supabase = supabase
+        self.table = table
+        self.rows = rows if isinstance(rows, list) else [rows]
+
+    def execute(self):
+        self.supabase.insert_calls.append(self.rows)
+        for row in self.rows:
+            if row["user_id"] in self.supabase.rejected_users:
+                raise RuntimeError(f"foreign key violation: {row['user_id']}")
+        self.supabase.tables.setdefault(self.table, []).extend(self.rows)
+        return FakeResponse(self.rows)
+
+
+class FakeSelect:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def eq(self, column, value):
+        return FakeSelect([r for r in self.rows if r.get(column) == value])
+
+    def limit(self, count):
+        return FakeSelect(self.rows[:count])
+
+    def execute(self):
+        return FakeResponse(self.rows)
+
+
+class FakeSupabase:
+    """Inserts go to in-memory tables; rows of rejected_users raise."""
+
+    def __init__(self):
+        self.tables = {}
+        self.insert_calls = []
+        self.rejected_users = set()
+
+    def table(self, name):
+        return types.SimpleNamespace(
+            insert=lambda rows: FakeInsert(self, name, rows),
+            select=lambda columns: FakeSelect(self.tables.get(name, [])),
+        )
+
+
+class FakeValkeyClient:
+    """The sorted set and hash commands leaderboard_cache uses."""
+
+    def __init__(self):
+        self.sorted_sets = {}
+        self.hashes = {}
+        self.failures = []  # exceptions raised by the next commands
+
+    def _maybe_fail(self):
+        if self.failures:
+            raise self.failures.pop(0)
+
+    async def zincrby(self, key, increment, member):
+        self._maybe_fail()
+        members = self.sorted_sets.setdefault(key, {})
+        members[member] = members.get(member, 0) + increment
+        return members[member]
+
+    async def zadd(self, key, members):
+        self._maybe_fail()
+        self.sorted_sets.setdefault(key, {}).update(members)
+        return len(members)
+
+    async def hget(self, key, field):
+        self._maybe_fail()
+        value = self.hashes.get(key, {}).get(field)
+        return value.encode("utf-8") if value is not None else None
+
+    async def hset(self, key, values):
+        self._maybe_fail()
+        self.hashes.setdefault(key, {}).update(values)
+        return len(values)
+
+    async def delete(self, keys):
+        self._maybe_fail()
+        removed = 0
+        for key in keys:
+            removed += self.sorted_sets.pop(key, None) is not None
+            removed += self.hashes.pop(key, None) is not None
+        return removed
+
+    async def rename(self, key, new_key):
+        self._maybe_fail()
+        self.sorted_sets[new_key] = self.sorted_sets.pop(key)
+        return "OK"
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_valkey(monkeypatch):
+    client = FakeValkeyClient()
+
+    async def fake_create(config):
+        return client
+
+    monkeypatch.setattr(leaderboard_cache.GlideClient, "create", fake_create)
+    monkeypatch.setattr(leaderboard_cache, "valkey_client", client)
+    return client
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch, fake_valkey):
+    """A fresh lambda_handler importing a db_client with the fake client."""
+    client = FakeSupabase()
+    client_module = types.ModuleType("db_client")
+    client_module.supabase = client
+    monkeypatch.setitem(sys.modules, "db_client", client_module)
+    monkeypatch.delitem(sys.modules, "lambda_handler", raising=False)
+    return client
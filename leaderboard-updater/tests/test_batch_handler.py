@@ -0,0 +1,55 @@
+import json
+
+import leaderboard_cache
+
+
+def sqs_record(message_id, user_id, problem_id, difficulty="introductory"):
+    body = {
+        "user_id": user_id,
+        "problem_id": problem_id,
+        "difficulty": difficulty,
+    }
+    return {
+        "messageId": message_id,
+        "eventSource": "aws:sqs",
+        "body": json.dumps(body),
+    }
+
+
+def test_batch_is_one_insert(fake_supabase, fake_valkey):
+    from lambda_handler import batch_handler
+
+    records = [
+        sqs_record("m1", "alice", 1),
+        sqs_record("m2", "bob", 1),
+        sqs_record("m3", "alice", 1),  # duplicate within the batch
+    ]
+    assert batch_handler(records) == {"batchItemFailures": []}
+    assert len(fake_supabase.insert_calls) == 1
+    assert len(fake_supabase.tables["completed_questions"]) == 2
+    key = leaderboard_cache.leaderboard_key("introductory")
+    assert fake_valkey.sorted_sets[key] == {"alice": 1, "bob": 1}
+
+
+def test_rejected_row_fails_only_its_messages(fake_supabase, fake_valkey):
+    from lambda_handler import batch_handler
+
+    fake_supabase.rejected_users.add("ghost")
+    records = [
+        sqs_record("m1", "alice", 1),
+        sqs_record("m2", "ghost", 1),
+        sqs_record("m3", "bob", 2),
+        sqs_record("m4", "ghost", 1),
+    ]
+    result = batch_handler(records)
+
+    assert result == {
+        "batchItemFailures": [
+            {"itemIdentifier": "m2"},
+            {"itemIdentifier": "m4"},
+        ]
+    }
+    inserted = fake_supabase.tables["completed_questions"]
+    assert sorted(row["user_id"] for row in inserted) == ["alice", "bob"]
+    key = leaderboard_cache.leaderboard_key("introductory")
+    assert fake_valkey.sorted_sets[key] == {"alice": 1, "bob": 1}
@@ -0,0 +1,155 @@
+import pytest
+from glide import ConnectionError
+
+import leaderboard_cache
+from leaderboard_cache import LEADERBOARD_NAMES_KEY, leaderboard_key
+
+EASY = leaderboard_key("introductory")
+HARD = leaderboard_key("interview")
+
+
+def record_calls(client, *names):
+    calls = []
+    for name in names:
+        original = getattr(client, name)
+
+        def recorder(*args, _original=original, _name=name):
+            calls.append((_name,) + args)
+            return _original(*args)
+
+        setattr(client, name, recorder)
+    return calls
+
+
+def test_reconcile_renames_a_rebuilt_set_into_place(fake_valkey):
+    fake_valkey.sorted_sets[EASY] = {"alice": 9, "gone": 4}
+    fake_valkey.sorted_sets[HARD] = {"gone": 1}
+    calls = record_calls(fake_valkey, "delete", "zadd", "rename")
+    rows = [
+        {"user_id": "alice", "display_name": "Alice", "introductory": 3},
+        {"user_id": "bob", "display_name": None, "interview": 2},
+        {"user_id": None, "introductory": 5},
+    ]
+
+    counts = leaderboard_cache.run(
+        leaderboard_cache.reconcile_leaderboard(rows)
+    )
+
+    assert counts == {"introductory": 2, "interview": 2}
+    assert fake_valkey.sorted_sets == {
+        EASY: {"alice": 3, "bob": 0},
+        HARD: {"alice": 0, "bob": 2},
+    }
+    assert fake_valkey.hashes[LEADERBOARD_NAMES_KEY] == {
+        "alice": "Alice",
+        "bob": "",
+    }
+    rebuild_key = f"{EASY}:rebuild"
+    assert calls[:3] == [
+        ("delete", [rebuild_key]),
+        ("zadd", rebuild_key, {"alice": 3, "bob": 0}),
+        ("rename", rebuild_key, EASY),
+    ]
+
+
+def test_reconcile_retries_after_a_lost_connection(fake_valkey):
+    fake_valkey.failures.append(ConnectionError("connection reset"))
+    rows = [{"user_id": "alice", "introductory": 1}]
+
+    counts = leaderboard_cache.run(
+        leaderboard_cache.reconcile_leaderboard(rows)
+    )
+
+    assert counts == {"introductory": 1, "interview": 1}
+    assert fake_valkey.sorted_sets[EASY] == {"alice": 1}
+
+
+def test_has_display_name_gives_up_after_two_attempts(fake_valkey):
+    fake_valkey.failures.extend(
+        [ConnectionError("reset"), ConnectionError("reset")]
+    )
+    with pytest.raises(ConnectionError, match="look up a display name"):
+        leaderboard_cache.run(leaderboard_cache.has_display_name("alice"))
+
+
+def test_record_completion_is_not_resent_after_a_lost_connection(
+    fake_valkey,
+):
+    calls = record_calls(fake_valkey, "zincrby")
+    fake_valkey.failures.append(ConnectionError("reset"))
+
+    with pytest.raises(ConnectionError, match="update the leaderboard"):
+        leaderboard_cache.run(
+            leaderboard_cache.record_completion("alice", "introductory")
+        )
+
+    assert len(calls) == 1
+
+
+def test_record_completion_retries_a_failed_connect(fake_valkey, monkeypatch):
+    attempts = []
+
+    async def flaky_create(config):
+        attempts.append(config)
+        if len(attempts) == 1:
+            raise ConnectionError("refused")
+        return fake_valkey
+
+    monkeypatch.setattr(leaderboard_cache, "valkey_client", None)
+    monkeypatch.setattr(leaderboard_cache.GlideClient, "create", flaky_create)
+
+    score = leaderboard_cache.run(
+        leaderboard_cache.record_completion("alice", "introductory")
+    )
+
+    assert score == 1
+    assert len(attempts) == 2
+
+
+def test_update_leaderboard_cache_does_not_cache_a_missing_name(
+    fake_supabase, fake_valkey
+):
+    from lambda_handler import update_leaderboard_cache
+
+    fake_supabase.tables["leaderboard"] = [
+        {"user_id": "alice", "display_name": None}
+    ]
+    update_leaderboard_cache("alice", "introductory")
+    assert LEADERBOARD_NAMES_KEY not in fake_valkey.hashes
+
+    fake_supabase.tables["leaderboard"] = [
+        {"user_id": "alice", "display_name": "Alice"}
+    ]
+    update_leaderboard_cache("alice", "introductory")
+    assert fake_valkey.hashes[LEADERBOARD_NAMES_KEY] == {"alice": "Alice"}
+    assert fake_valkey.sorted_sets == {EASY: {"alice": 2}}
+
+
+def test_update_leaderboard_cache_fetches_a_missing_name(
+    fake_supabase, fake_valkey
+):
+    from lambda_handler import update_leaderboard_cache
+
+    fake_supabase.tables["leaderboard"] = [
+        {"user_id": "alice", "display_name": "Alice"}
+    ]
+    update_leaderboard_cache("alice", "introductory")
+    fake_supabase.tables["leaderboard"] = []
+    update_leaderboard_cache("alice", "introductory")
+    update_leaderboard_cache("alice", "unknown-difficulty")
+
+    assert fake_valkey.sorted_sets == {EASY: {"alice": 2}}
+    assert fake_valkey.hashes[LEADERBOARD_NAMES_KEY] == {"alice": "Alice"}
+
+
+def test_update_leaderboard_cache_only_logs_valkey_errors(
+    fake_supabase, fake_valkey
+):
+    from lambda_handler import update_leaderboard_cache
+
+    fake_valkey.hashes[LEADERBOARD_NAMES_KEY] = {"alice": "Alice"}
+    fake_valkey.failures.extend([ConnectionError("reset")] * 4)
+
+    update_leaderboard_cache("alice", "introductory")
+
+    assert fake_valkey.sorted_sets == {}
@@ -1,66 +1,52 @@
 import os
 from db_client.db_client import supabase
 
+# Score columns of the leaderboard table to rank by, e.g. "introductory,interview"
+LEADERBOARD_DIFFICULTIES = [
+    difficulty.strip()
+    for difficulty in os.getenv(
+        "LEADERBOARD_DIFFICULTIES", "introductory,interview"
+    ).split(",")
+    if difficulty.strip()
+]
 
-def get_top_leaderboard_entries(count=5, difficulty="introductory"):
+
+def get_top_leaderboard_entries(count=5, difficulties=None):
+    """
+    Returns the top `count` entries for every difficulty, fetched in one
+    round trip by the top_leaderboard_entries database function
+    (sql/top_leaderboard_entries.sql). Shape:
+    {"introductory": [{"name": ..., "score": ...}, ...], "interview": [...]}
+    """
     # Optionally override count from an environment variable, if set.
     count = int(os.getenv("LEADERBOARD_COUNT", count))
+    if difficulties is None:
+        difficulties = LEADERBOARD_DIFFICULTIES
 
     # Debug: log the environment variables (mask sensitive info if needed)
     print("DEBUG: SUPABASE_URL =", os.getenv("SUPABASE_URL"))
     # Note: You might not want to print the key in production!
     print("DEBUG: SUPABASE_KEY =", os.getenv("SUPABASE_KEY"))
     print(
-        f"DEBUG: get_top_leaderboard_entries called with count={count}, difficulty={difficulty}"
+        f"DEBUG: get_top_leaderboard_entries called with count={count}, difficulties={difficulties}"
     )
 
-    # Query for top entries based on 'introductory' score (highest first)
-    introductory_query = (
-        supabase.table("leaderboard")
-        .select("display_name, introductory")
-        .order("introductory", desc=True)
-        .limit(count)
-    )
-    introductory_response = introductory_query.execute()
-    print("DEBUG: introductory_response =", introductory_response)
-    introductory_data = introductory_response.dict()
-    if introductory_data.get("error"):
-        error_msg = introductory_data["error"].get("message", "Unknown error")
-        raise RuntimeError(
-            f"Error fetching 'introductory' leaderboard: {error_msg}"
-        )
-    introductory_leaders = introductory_data.get("data", [])
+    response = supabase.rpc(
+        "top_leaderboard_entries",
+        {"entry_count": count, "difficulties": difficulties},
+    ).execute()
+    print("DEBUG: leaderboard response =", response)
+    data = response.dict()
+    if data.get("error"):
+        error_msg = data["error"].get("message", "Unknown error")
+        raise RuntimeError(f"Error fetching leaderboard: {error_msg}")
 
-    # Query for top entries based on 'interview' score (highest first)-
-    interview_query = (
-        supabase.table("leaderboard")
-        .select("display_name, interview")
-        .order("interview", desc=True)
-        .limit(count)
-    )
-    interview_response = interview_query.execute()
-    print("DEBUG: interview_response =", interview_response)
-    interview_data = interview_response.dict()
-    if interview_data.get("error"):
-        error_msg = interview_data["error"].get("message", "Unknown error")
-        raise RuntimeError(
-            f"Error fetching 'interview' leaderboard: {error_msg}"
+    # Transform the rows into a simplified format, best first per difficulty
+    result = {difficulty: [] for difficulty in difficulties}
+    for entry in data.get("data", []):
+        result.setdefault(entry["difficulty"], []).append(
+            {"name": entry["display_name"], "score": entry["score"]}
         )
-    interview_leaders = interview_data.get("data", [])
-
-    # Transform the data into a simplified format
-    introductory_results = [
-        {"name": entry["display_name"], "score": entry["introductory"]}
-        for entry in introductory_leaders
-    ]
-    interview_results = [
-        {"name": entry["display_name"], "score": entry["interview"]}
-        for entry in interview_leaders
-    ]
 
-    result = {
-        "introductory": introductory_results,
-        "interview": interview_results,
-    }
     print("DEBUG: returning result =", result)
     return result
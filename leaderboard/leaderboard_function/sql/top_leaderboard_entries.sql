@@ -0,0 +1,27 @@
+-- Top entries of the leaderboard for every requested difficulty, in one
+-- round trip. Each difficulty is a score column of the leaderboard table.
+-- leaderboard.py calls it with
+--   supabase.rpc("top_leaderboard_entries",
+--                {"entry_count": 5,
+--                 "difficulties": ["introductory", "interview"]})
+-- and gets one row per (difficulty, rank), best first.
+create or replace function top_leaderboard_entries(
+    entry_count integer,
+    difficulties text[]
+)
+returns table (difficulty text, display_name text, score bigint)
+language plpgsql
+stable
+as $$
+declare
+    score_column text;
+begin
+    foreach score_column in array difficulties loop
+        return query execute format(
+            'select %L::text, display_name, %I::bigint from leaderboard '
+            'order by %I desc nulls last limit %s',
+            score_column, score_column, score_column, entry_count
+        );
+    end loop;
+end;
+$$;
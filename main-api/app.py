@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi import FastAPI, HTTPException, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
 from pydantic import BaseModel
@@ -17,12 +17,40 @@ from glide import (
     ClosingError,
     Logger,
     LogLevel,
+    MaxId,
+    MinId,
 )
-from questions_fns import get_day_index, parse_inputs_outputs
-from leaderboard import format_leaderboard_data
+from questions_fns import PUBLIC_TEST_CASES, ActiveQuestionsCache
+from leaderboard import format_leaderboard_data, read_ranked_leaderboard
+from job_notifier import (
+    JOB_PROGRESS_CHANNEL,
+    JOB_RESULTS_CHANNEL,
+    JobResultNotifier,
+    job_progress_key,
+)
+from http_pool import PooledHTTPClient
+from job_trace import finish_trace, new_trace
+from metrics import (
+    CACHE_LOOKUPS,
+    JOB_STATUS_OUTCOMES,
+    SQS_SEND_SECONDS,
+    VALKEY_SECONDS,
+    MetricsMiddleware,
+    job_enqueued,
+    job_result_seen,
+    job_stages_seen,
+    leaderboard_call,
+    observe_outcome,
+    render_metrics,
+)
+from result_format import decode_job_result, expand_job_result
+from sqs_batcher import SQSBatchSender
+from structured_log import get_logger
 
 load_dotenv()
 
+log = get_logger("main-api")
+
 app = FastAPI()
 origins = [
     "https://sse-team-project.vercel.app",
@@ -36,11 +64,33 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so CORS handling is timed too; see GET /metrics
+app.add_middleware(MetricsMiddleware)
 valkey_client = None
+# Dedicated connection subscribed to job results (pub/sub needs its own)
+subscriber_client = None
+job_notifier = JobResultNotifier()
+job_listener_task = None
+# Parsed copy of 'active_questions', refreshed in the background
+questions_cache = ActiveQuestionsCache()
+questions_refresh_task = None
+# Shared outbound HTTP client (connection pool), see http_pool.py
+http_client = None
+# Batches job messages to SQS_QUEUE_URL off the event loop
+job_sender = None
+QUESTIONS_REFRESH_SECONDS = int(os.getenv("QUESTIONS_REFRESH_SECONDS", "60"))
+
+# How long a WebSocket waits for a job result
+JOB_STATUS_TIMEOUT = 30
+# Safety-net cache check while waiting, in case a published result was missed
+JOB_RESULT_RECHECK_INTERVAL = 5
 
 sqs = boto3.client("sqs", region_name=os.getenv("AWS_REGION", "eu-north-1"))
 SQS_QUEUE_URL = os.getenv("SQS_QUEUE_URL")
 LEADERBOARD_API_URL = os.getenv("LEADERBOARD_API_URL")
+# When set, completions are queued for leaderboard-updater's batch mode
+# instead of posted one by one
+LEADERBOARD_QUEUE_URL = os.getenv("LEADERBOARD_QUEUE_URL")
 
 # class SubmitCodePayload(BaseModel):
 #     code: str
@@ -63,10 +113,14 @@ async def index():
 @app.on_event("startup")
 async def startup_event():
     """
-    Initializes the Valkey client once, when the FastAPI app starts.
+    Initializes the Valkey clients once, when the FastAPI app starts, and
+    starts listening for published job results.
     """
-    global valkey_client
+    global valkey_client, subscriber_client, job_listener_task
+    global questions_refresh_task, http_client, job_sender
     Logger.set_logger_config(LogLevel.INFO)
+    http_client = PooledHTTPClient()
+    job_sender = SQSBatchSender(sqs, SQS_QUEUE_URL)
 
     addresses = [
         NodeAddress(
@@ -76,93 +130,123 @@ async def startup_event():
     config = GlideClientConfiguration(addresses=addresses, use_tls=True)
     try:
         valkey_client = await GlideClient.create(config)
-        print("Valkey client created successfully.")
+        log.info("valkey_connected")
     except Exception as e:
-        print("Failed to create Valkey client:", e)
+        log.error("valkey_connect_failed", error=str(e))
         raise e
 
+    subscriber_config = GlideClientConfiguration(
+        addresses=addresses,
+        use_tls=True,
+        pubsub_subscriptions=GlideClientConfiguration.PubSubSubscriptions(
+            channels_and_patterns={
+                GlideClientConfiguration.PubSubChannelModes.Exact: {
+                    JOB_RESULTS_CHANNEL,
+                    JOB_PROGRESS_CHANNEL,
+                }
+            },
+            callback=None,
+            context=None,
+        ),
+    )
+    try:
+        subscriber_client = await GlideClient.create(subscriber_config)
+        job_listener_task = asyncio.create_task(
+            job_notifier.listen(subscriber_client)
+        )
+        log.info(
+            "job_results_subscribed",
+            channels=[JOB_RESULTS_CHANNEL, JOB_PROGRESS_CHANNEL],
+        )
+    except Exception as e:
+        # Waiters still see results through the periodic cache check.
+        log.warning("job_results_subscribe_failed", error=str(e))
+
+    try:
+        await questions_cache.refresh(valkey_client)
+    except Exception as e:
+        # Retried on the first request and by the background refresh.
+        log.warning("active_questions_load_failed", error=str(e))
+    questions_refresh_task = asyncio.create_task(
+        questions_cache.refresh_periodically(
+            valkey_client, QUESTIONS_REFRESH_SECONDS
+        )
+    )
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """
-    Gracefully close the Valkey client on shutdown.
+    Send any queued jobs, then gracefully close the Valkey and HTTP clients.
     """
-    global valkey_client
-    if valkey_client:
-        try:
-            await valkey_client.close()
-            print("Valkey client closed successfully.")
-        except ClosingError as e:
-            print("Error closing Valkey client:", e)
+    global valkey_client, subscriber_client, job_listener_task
+    global questions_refresh_task, http_client, job_sender
+    if job_sender:
+        await job_sender.close()
+        job_sender = None
+    for task in (job_listener_task, questions_refresh_task):
+        if task:
+            task.cancel()
+    job_listener_task = None
+    questions_refresh_task = None
+    for client in (subscriber_client, valkey_client):
+        if client:
+            try:
+                await client.close()
+                log.info("valkey_closed")
+            except ClosingError as e:
+                log.warning("valkey_close_failed", error=str(e))
+    subscriber_client = None
+    if http_client:
+        await http_client.aclose()
+        http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared outbound client; created here if startup has not run."""
+    global http_client
+    if http_client is None:
+        http_client = PooledHTTPClient()
+    return http_client.client
+
+
+def get_job_sender() -> SQSBatchSender:
+    """The shared job batcher; created here if startup has not run."""
+    global job_sender
+    if job_sender is None:
+        job_sender = SQSBatchSender(sqs, SQS_QUEUE_URL)
+    return job_sender
 
 
 # ==== API Routes ====
 # Daily Q Helper
 async def get_daily_questions(max_test_cases=None):
-    global valkey_client
-    if not valkey_client:
-        return {"error": "Valkey client not initialized."}
+    """
+    Today's questions from the in-process cache. Only the first call, the
+    first call of a new day, or a call after a failed load goes to Valkey.
+    """
+    if not questions_cache.is_current():
+        if not valkey_client:
+            return {"error": "Valkey client not initialized."}
+        try:
+            with VALKEY_SECONDS.labels("questions_refresh").time():
+                await questions_cache.refresh(valkey_client)
+        except Exception as e:
+            CACHE_LOOKUPS.labels("questions", "error").inc()
+            return {"error": str(e)}
+        CACHE_LOOKUPS.labels("questions", "miss").inc()
+    else:
+        CACHE_LOOKUPS.labels("questions", "hit").inc()
 
-    key = "active_questions"
     try:
-        cached_value = await valkey_client.get(key)
-        if cached_value:
-            active_questions_data = json.loads(cached_value)
-        else:
-            return {
-                "error": (
-                    "Could not find data in cache "
-                    "for key 'active_questions'."
-                )
-            }
+        daily_qs = questions_cache.get_daily_questions(max_test_cases)
     except Exception as e:
         return {"error": str(e)}
 
-    # Calculate the day index relative to the stored timestamp.
-    ts = active_questions_data.get("timestamp")
-    if not ts:
-        return {"error": "Cache data missing timestamp."}
-
-    day_index = get_day_index(ts)
-    print(f"Day index: {day_index}")
-
-    # Retrieve today's questions.
-    questions = active_questions_data.get("questions", {})
-    easy_section = questions.get("easy", {})
-    hard_section = questions.get("hard", {})
-    easy_qs = easy_section.get("questions", [])
-    hard_qs = hard_section.get("questions", [])
-
-    if not easy_qs or not hard_qs:
-        return {"error": "No questions available in cache."}
-
-    # If the day index is >= to the number of questions, use the last one.
-    if day_index >= len(easy_qs):
-        day_index = len(easy_qs) - 1
-
-    easy = easy_qs[day_index]
-    hard = hard_qs[day_index]
-
-    # Remove the "solutions" key from both question objects, if present.
-    easy.pop("solutions", None)
-    hard.pop("solutions", None)
-
-    # Parse stringified arrays for I/O keys back into arrays
-    easy = parse_inputs_outputs(easy)
-    hard = parse_inputs_outputs(hard)
-
-    # Limit number of test cases sent to client
-    if max_test_cases is not None:
-        easy["inputs"] = easy["inputs"][:max_test_cases]
-        easy["outputs"] = easy["outputs"][:max_test_cases]
-        hard["inputs"] = hard["inputs"][:max_test_cases]
-        hard["outputs"] = hard["outputs"][:max_test_cases]
-
-    print(f"Today's easy Q: {easy}")
-    print(f"Today's hard Q: {hard}")
+    log.debug("daily_questions", easy=daily_qs["easy"], hard=daily_qs["hard"])
 
     # Return the selected questions as a JSON object.
-    return {"easy": easy, "hard": hard}
+    return daily_qs
 
 
 # Route now checks for errors before returning response
@@ -179,46 +263,77 @@ async def daily_question():
 
 # Submission (not Run) helper
 async def handle_is_submit(cache_job_results):
-    print(f"Entering handle_is_submit() with results: {cache_job_results}")
     """
     Handles user submission by making an API call and returning the response.
     """
+    log.debug("handle_is_submit", result=cache_job_results)
+    started = time.perf_counter()
     body_obj = cache_job_results.get("output")
     user_id = body_obj.get("user_id")
     problem_id = body_obj.get("problem_id")
     difficulty = body_obj.get("difficulty")
 
     if not all([user_id, problem_id, difficulty]):
-        print("Missing required parameters")
+        log.warning(
+            "leaderboard_update_skipped",
+            reason="missing parameters",
+            user_id=user_id,
+            problem_id=problem_id,
+            difficulty=difficulty,
+        )
+        leaderboard_call("skipped", started)
         return {"error": "Missing required parameters"}
 
-    url = f"{LEADERBOARD_API_URL}/user-submission"
     params = {
         "user_id": user_id,
         "problem_id": problem_id,
         "difficulty": difficulty,
     }
-    print(f"URL: {url}, PARAMS: {params}")
 
-    async with httpx.AsyncClient() as client:
+    if LEADERBOARD_QUEUE_URL:
         try:
-            response = await client.post(url, params=params)
-            response.raise_for_status()
-            print(f"Call made. Response: {response}")
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            # Print additional info like the response body and headers
-            print(f"API request failed with status {e.response.status_code}")
-            print(f"Response body: {e.response.text}")
-            print(f"Response headers: {e.response.headers}")
-            print(f"\nFULL ERROR: {str(e)}")
-            return {
-                "error": f"API request failed with status {e.response.status_code}",
-                "body": e.response.text,
-            }
-        except httpx.RequestError as e:
-            print(f"API request failed: {e}")
-            return {"error": f"API request failed: {str(e)}"}
+            await asyncio.to_thread(
+                sqs.send_message,
+                QueueUrl=LEADERBOARD_QUEUE_URL,
+                MessageBody=json.dumps(params),
+            )
+            leaderboard_call("queued", started)
+            return {"status": "queued"}
+        except Exception as e:
+            log.warning("leaderboard_queue_failed", error=str(e))
+            leaderboard_call("queue_failed", started)
+            started = time.perf_counter()
+
+    url = f"{LEADERBOARD_API_URL}/user-submission"
+    log.debug("leaderboard_post", url=url, params=params)
+
+    client = get_http_client()
+    try:
+        response = await client.post(url, params=params)
+        response.raise_for_status()
+        log.info(
+            "leaderboard_updated",
+            user_id=user_id,
+            status=response.status_code,
+        )
+        leaderboard_call("ok", started)
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        log.error(
+            "leaderboard_post_failed",
+            status=e.response.status_code,
+            body=e.response.text,
+            error=str(e),
+        )
+        leaderboard_call("http_error", started)
+        return {
+            "error": f"API request failed with status {e.response.status_code}",
+            "body": e.response.text,
+        }
+    except httpx.RequestError as e:
+        log.error("leaderboard_post_failed", error=str(e))
+        leaderboard_call("request_error", started)
+        return {"error": f"API request failed: {str(e)}"}
 
 
 @app.post("/api/submit-code")
@@ -250,6 +365,7 @@ async def submit_code(payload: Dict[str, Any]):
         }
 
     job_id = str(uuid.uuid4())
+    trace = new_trace()
     test_cases = {"inputs": question["inputs"], "outputs": question["outputs"]}
     starter_code = question["starter_code"]
     difficulty = question["difficulty"]
@@ -264,20 +380,81 @@ async def submit_code(payload: Dict[str, Any]):
         "is_submit": is_submit,
         "user_id": payload["user_id"],
         "difficulty": difficulty,
+        # Opt-in: stop grading at the first failing test case
+        "fail_fast": bool(payload.get("fail_fast", False)),
+        # Always detailed in the result; other cases only if they fail
+        "visible_cases": PUBLIC_TEST_CASES,
+        # Timestamps added along the way, returned with the result
+        "trace": trace,
     }
-    print(f"Job payload: {job_payload}")
+    # The payload holds the code and every test case; only dump it on DEBUG
+    log.debug("job_payload", payload=job_payload)
 
     try:
-        sqs.send_message(
-            QueueUrl=SQS_QUEUE_URL,
-            MessageBody=json.dumps(job_payload),
-            MessageGroupId="default",
-        )
+        # Shares a send_message_batch call with submissions arriving within
+        # a few milliseconds; the loop is not blocked while SQS answers.
+        with log.timed(
+            "job_enqueued",
+            job_id=job_id,
+            trace_id=trace["trace_id"],
+            problem_id=problem_id,
+            is_submit=is_submit,
+            code_chars=len(payload["code"]),
+            test_cases=len(test_cases["inputs"]),
+        ), observe_outcome(SQS_SEND_SECONDS, "jobs"):
+            await get_job_sender().send(
+                json.dumps(job_payload), message_group_id="default"
+            )
+        job_enqueued(job_id)
         return {"status": "queued", "job_id": job_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format; see metrics.py."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/api/http-client-stats")
+async def http_client_stats():
+    if http_client is None:
+        return {"in_flight_requests": 0, "requests_sent": 0}
+    return http_client.request_stats()
+
+
+# Counters kept by the code evaluator's result cache (result_cache.py)
+RESULT_CACHE_STATS_KEY = "result_cache:stats"
+
+
+@app.get("/api/result-cache-stats")
+async def result_cache_stats():
+    """How many runs the evaluator answered from its result cache."""
+    if not valkey_client:
+        raise HTTPException(
+            status_code=500, detail="Valkey client not initialized"
+        )
+    try:
+        raw = await valkey_client.hgetall(RESULT_CACHE_STATS_KEY)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    counters = {
+        (k.decode("utf-8") if isinstance(k, bytes) else k): int(v)
+        for k, v in (raw or {}).items()
+    }
+    hits = counters.get("hits", 0)
+    misses = counters.get("misses", 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else None,
+    }
+
+
 @app.get("/api/leaderboard")
 async def leaderboard():
     global valkey_client
@@ -286,6 +463,14 @@ async def leaderboard():
             status_code=500, detail="Valkey client not initialized"
         )
 
+    # Live rankings first; the periodically rebuilt blob is the fallback.
+    try:
+        leaderboard_data = await read_ranked_leaderboard(valkey_client)
+        if leaderboard_data:
+            return format_leaderboard_data(leaderboard_data)
+    except Exception as e:
+        log.warning("ranked_leaderboard_failed", error=str(e))
+
     key = "active_leaderboard"
     try:
         cached_value = await valkey_client.get(key)
@@ -328,50 +513,142 @@ async def leaderboard_testing():
 
 
 # ==== WEBSOCKET for job results ===
+async def wait_for_job_result(job_id: str, timeout: float):
+    """
+    Waits for the job's result to be published, falling back to the cache
+    for results stored before we subscribed (or published while the
+    subscriber was reconnecting). Returns None on timeout.
+    """
+    deadline = time.time() + timeout
+    key = f"job:{job_id}"
+    # Register before the first GET so a result published in between is
+    # not missed.
+    future = job_notifier.register(job_id)
+    try:
+        with VALKEY_SECONDS.labels("job_result_get").time():
+            job_result = await valkey_client.get(key)
+        if job_result:
+            log.debug("job_result_cache_hit", job_id=job_id)
+            CACHE_LOOKUPS.labels("job_result", "hit").inc()
+            return decode_job_result(job_result)
+        CACHE_LOOKUPS.labels("job_result", "miss").inc()
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(future),
+                    min(remaining, JOB_RESULT_RECHECK_INTERVAL),
+                )
+            except asyncio.TimeoutError:
+                with VALKEY_SECONDS.labels("job_result_get").time():
+                    job_result = await valkey_client.get(key)
+                if job_result:
+                    log.info("job_result_recheck_hit", job_id=job_id)
+                    CACHE_LOOKUPS.labels("job_result", "recheck_hit").inc()
+                    return decode_job_result(job_result)
+    finally:
+        job_notifier.unregister(job_id, future)
+
+
+async def read_job_progress(job_id: str) -> list:
+    """Progress events already published for the job, oldest first."""
+    entries = await valkey_client.xrange(
+        job_progress_key(job_id), MinId(), MaxId()
+    )
+    events = []
+    for fields in (entries or {}).values():
+        for name, value in fields:
+            if name in (b"event", "event"):
+                events.append(decode_job_result(value))
+    return events
+
+
+async def relay_job_progress(websocket: WebSocket, job_id: str, queue):
+    """
+    Sends the job's progress to the client: events published before the
+    WebSocket connected are replayed from the stream, then live ones follow.
+    Each test case is sent once.
+    """
+    sent = set()
+
+    async def send(event):
+        case = event.get("case")
+        if case in sent:
+            return
+        sent.add(case)
+        await websocket.send_json({"status": "progress", "progress": event})
+
+    try:
+        for event in await read_job_progress(job_id):
+            await send(event)
+    except Exception as e:
+        # Live events still arrive through the queue.
+        log.warning("job_progress_replay_failed", job_id=job_id, error=str(e))
+    while True:
+        await send(await queue.get())
+
+
 @app.websocket("/ws/job-status/{job_id}")
 async def websocket_job_status(websocket: WebSocket, job_id: str):
-    print(f"Entering websocket for job_id: {job_id}")
     await websocket.accept()
-    print("Websocket accepted.")
+    log.debug("job_status_connected", job_id=job_id)
+    started = time.perf_counter()
 
-    timeout = 30
-    poll_interval = 0.5
-    start_time = time.time()
+    timeout = JOB_STATUS_TIMEOUT
+    progress_queue = job_notifier.register_progress(job_id)
+    progress_task = asyncio.create_task(
+        relay_job_progress(websocket, job_id, progress_queue)
+    )
 
     try:
-        cache_polled = False
-        while True:
-            job_result = await valkey_client.get(f"job:{job_id}")
-            if not cache_polled:
-                print("Cache being polled.")
-                cache_polled = True
-
-            if job_result:
-                json_job_result = json.loads(job_result.decode("utf-8"))
-                print("> Cache hit!", json_job_result)
-                print("Checking if Submit and Pass...")
-                if (
-                    json_job_result["output"]["is_submit"]
-                    and json_job_result["output"]["passed"]
-                ):
-                    print("Submit and Pass both True!")
-                    # Trigger handle_is_submit in the background
-                    asyncio.create_task(handle_is_submit(json_job_result))
-                # Send result back to the client immediately
-                await websocket.send_json(
-                    {"status": "done", "job_result": json_job_result}
-                )
-                break
-
-            elif time.time() - start_time > timeout:
-                print(">> Time ran out!")
-                error_msg = f"Job timed out after {timeout} seconds"
-                await websocket.send_json(
-                    {"status": "timeout", "error": error_msg}
-                )
-                break
-
-            print("> Cache miss.")
-            await asyncio.sleep(poll_interval)
+        json_job_result = await wait_for_job_result(job_id, timeout)
+        # No progress after the final message
+        progress_task.cancel()
+        await asyncio.gather(progress_task, return_exceptions=True)
+        if json_job_result is None:
+            log.warning("job_status_timeout", job_id=job_id, timeout=timeout)
+            JOB_STATUS_OUTCOMES.labels("timeout").inc()
+            error_msg = f"Job timed out after {timeout} seconds"
+            await websocket.send_json(
+                {"status": "timeout", "error": error_msg}
+            )
+            return
+
+        job_result_seen(job_id)
+        # Compact results get the per-case arrays the frontend reads
+        json_job_result = expand_job_result(json_job_result)
+        output = json_job_result.get("output")
+        trace = finish_trace(output)
+        stages_ms = trace.get("stages_ms", {})
+        job_stages_seen(stages_ms)
+        log.info(
+            "job_result_delivered",
+            job_id=job_id,
+            trace_id=trace.get("trace_id"),
+            passed=isinstance(output, dict) and output.get("passed"),
+            wait_ms=round((time.perf_counter() - started) * 1000, 1),
+            **{f"{stage}_ms": ms for stage, ms in stages_ms.items()},
+        )
+        log.debug("job_result", job_id=job_id, result=json_job_result)
+        if (
+            isinstance(output, dict)
+            and output.get("is_submit")
+            and output.get("passed")
+        ):
+            # Trigger handle_is_submit in the background
+            asyncio.create_task(handle_is_submit(json_job_result))
+        # Send result back to the client immediately
+        await websocket.send_json(
+            {"status": "done", "job_result": json_job_result}
+        )
+        JOB_STATUS_OUTCOMES.labels("done").inc()
+    except Exception:
+        JOB_STATUS_OUTCOMES.labels("error").inc()
+        raise
     finally:
+        progress_task.cancel()
+        job_notifier.unregister_progress(job_id, progress_queue)
         await websocket.close()
@@ -0,0 +1,108 @@
+import os
+
+import httpx
+
+# Pool limits and timeouts for outbound HTTP calls (leaderboard API, ...)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10")
+)
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(
+    os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5")
+)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1"
+
+
+def http2_available() -> bool:
+    """httpx only speaks HTTP/2 when the optional h2 package is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a transport to count requests in flight (until their response
+    headers arrive), responses and errors, using only httpx's public API.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests_sent = 0
+        self.responses_received = 0
+        self.request_errors = 0
+        self.http2_responses = 0
+
+    async def handle_async_request(self, request):
+        self.requests_sent += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            self.request_errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.responses_received += 1
+        if response.http_version == "HTTP/2":
+            self.http2_responses += 1
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class PooledHTTPClient:
+    """
+    One application-wide httpx.AsyncClient, so outbound calls reuse
+    keep-alive connections instead of opening a new TCP+TLS connection per
+    request. Its transport counts requests for request_stats().
+    """
+
+    def __init__(self):
+        self.http2 = HTTP2_ENABLED and http2_available()
+        self.limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.transport = CountingTransport(
+            httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits)
+        )
+        self.client = httpx.AsyncClient(
+            transport=self.transport,
+            timeout=httpx.Timeout(
+                HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS
+            ),
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def request_stats(self) -> dict:
+        """
+        Pool limits and the transport's request counts, for monitoring.
+        These count requests, not the pool's open or idle connections.
+        """
+        transport = self.transport
+        return {
+            "http2_enabled": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": (
+                self.limits.max_keepalive_connections
+            ),
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "in_flight_requests": transport.in_flight,
+            "peak_in_flight_requests": transport.peak_in_flight,
+            "requests_sent": transport.requests_sent,
+            "responses_received": transport.responses_received,
+            "request_errors": transport.request_errors,
+            "http2_responses": transport.http2_responses,
+        }
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import zlib
+
+from result_format import decode_job_result
+from structured_log import get_logger
+
+log = get_logger("main-api")
+
+# Channel the code evaluator publishes finished jobs on. Messages look like
+# {"job_id": "...", "result": {"status": "completed", "output": {...}}}, with
+# "result" as the stored string when it is compressed
+JOB_RESULTS_CHANNEL = "job-results"
+# Per-case progress of running jobs, also appended to job_progress:{job_id}:
+# {"job_id": "...", "progress": {"case", "total", "passed", "wall_ms"}}
+JOB_PROGRESS_CHANNEL = "job-progress"
+
+
+def job_progress_key(job_id: str) -> str:
+    return f"job_progress:{job_id}"
+
+
+class JobResultNotifier:
+    """
+    Fans job results published on JOB_RESULTS_CHANNEL out to the WebSocket
+    handlers waiting for them. One subscriber connection serves every waiter,
+    so nobody has to poll the cache.
+    """
+
+    def __init__(self):
+        self._waiters = {}  # job_id -> set of futures
+        self._progress = {}  # job_id -> set of queues
+
+    def register(self, job_id: str) -> asyncio.Future:
+        """Returns a future resolved with the job's result once published."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, set()).add(future)
+        return future
+
+    def unregister(self, job_id: str, future: asyncio.Future):
+        waiters = self._waiters.get(job_id)
+        if waiters is None:
+            return
+        waiters.discard(future)
+        if not waiters:
+            del self._waiters[job_id]
+
+    def register_progress(self, job_id: str) -> asyncio.Queue:
+        """Returns a queue receiving the job's progress events."""
+        queue = asyncio.Queue()
+        self._progress.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unregister_progress(self, job_id: str, queue: asyncio.Queue):
+        queues = self._progress.get(job_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._progress[job_id]
+
+    def waiting(self, job_id: str = None) -> int:
+        """Number of waiters, for one job or overall."""
+        if job_id is not None:
+            return len(self._waiters.get(job_id, ()))
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def dispatch(self, message) -> int:
+        """
+        Resolves the waiters of a published job, or queues a progress event
+        for its listeners. Returns how many were notified.
+        """
+        if isinstance(message, (bytes, bytearray)):
+            message = message.decode("utf-8")
+        try:
+            payload = json.loads(message)
+            job_id = payload["job_id"]
+            if "progress" in payload:
+                return self._dispatch_progress(job_id, payload["progress"])
+            result = payload["result"]
+            if isinstance(result, str):
+                result = decode_job_result(result)
+        except (ValueError, KeyError, TypeError, zlib.error) as e:
+            log.warning("job_message_malformed", error=str(e))
+            return 0
+
+        delivered = 0
+        for future in self._waiters.pop(job_id, ()):
+            if not future.done():
+                future.set_result(result)
+                delivered += 1
+        return delivered
+
+    def _dispatch_progress(self, job_id: str, event) -> int:
+        queues = self._progress.get(job_id, ())
+        for queue in queues:
+            queue.put_nowait(event)
+        return len(queues)
+
+    async def listen(self, subscriber_client, retry_delay=1.0):
+        """
+        Reads messages from a client subscribed to JOB_RESULTS_CHANNEL and
+        JOB_PROGRESS_CHANNEL until cancelled.
+        """
+        while True:
+            try:
+                message = await subscriber_client.get_pubsub_message()
+                self.dispatch(message.message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("job_subscriber_error", error=str(e))
+                await asyncio.sleep(retry_delay)
@@ -0,0 +1,52 @@
+"""
+End-to-end job tracing. submit_code starts a trace in the job payload; the
+evaluator adds its timestamps (lambda-code-evaluator-v2/app/job_trace.py) and
+stores it with the result, and the WebSocket adds delivered_at before turning
+it into a per-stage breakdown. All times are epoch seconds.
+"""
+
+import time
+import uuid
+
+# (stage, from, to), in the order a job goes through them
+TRACE_STAGES = (
+    ("queue", "enqueued_at", "dequeued_at"),
+    ("scheduling", "dequeued_at", "grading_started_at"),
+    ("validate", "grading_started_at", "validated_at"),
+    ("sandbox_start", "validated_at", "sandbox_started_at"),
+    ("cases", "sandbox_started_at", "cases_finished_at"),
+    ("evaluate", "cases_finished_at", "graded_at"),
+    ("store", "graded_at", "stored_at"),
+    ("deliver", "stored_at", "delivered_at"),
+    ("total", "enqueued_at", "delivered_at"),
+)
+
+
+def new_trace() -> dict:
+    return {"trace_id": uuid.uuid4().hex, "enqueued_at": round(time.time(), 6)}
+
+
+def stage_breakdown(trace: dict) -> dict:
+    """
+    {stage: milliseconds} for every stage with both timestamps. Stages that
+    span main-api's and the evaluator's clocks can be slightly off (or
+    negative) by the skew between them.
+    """
+    stages = {}
+    for stage, start, end in TRACE_STAGES:
+        if trace.get(start) is not None and trace.get(end) is not None:
+            stages[stage] = round((trace[end] - trace[start]) * 1000, 3)
+    return stages
+
+
+def finish_trace(job_output) -> dict:
+    """
+    Marks a job result's trace as delivered and adds its "stages_ms".
+    Returns the trace, or {} for results without one.
+    """
+    trace = job_output.get("trace") if isinstance(job_output, dict) else None
+    if not isinstance(trace, dict):
+        return {}
+    trace["delivered_at"] = round(time.time(), 6)
+    trace["stages_ms"] = stage_breakdown(trace)
+    return trace
@@ -1,3 +1,8 @@
+import asyncio
+
+from glide import RangeByIndex
+
+
 def format_leaderboard_entry(entry: dict, rank: int) -> dict:
     """
     Formats a single leaderboard entry for presentation.
@@ -54,3 +59,56 @@ def format_leaderboard_data(raw_data: dict) -> dict:
         formatted_data[category] = formatted_entries
 
     return formatted_data
+
+
+# Sorted sets (user_id -> score) kept up to date by leaderboard-updater
+LEADERBOARD_SETS = {
+    "easy": "leaderboard:{introductory}",
+    "hard": "leaderboard:{interview}",
+}
+# user_id -> display_name for the members of LEADERBOARD_SETS
+LEADERBOARD_NAMES_KEY = "leaderboard:names"
+LEADERBOARD_SIZE = 5
+
+
+async def read_ranked_leaderboard(client, count=LEADERBOARD_SIZE) -> dict:
+    """
+    Reads the top `count` entries per category straight from the sorted sets
+    with one range query each, plus one HMGET for the display names.
+
+    Returns:
+        dict: Raw leaderboard data in the shape format_leaderboard_data
+        expects, or None if the sorted sets have not been built yet.
+    """
+    categories = list(LEADERBOARD_SETS)
+    ranges = await asyncio.gather(
+        *(
+            client.zrange_withscores(
+                LEADERBOARD_SETS[category],
+                RangeByIndex(0, count - 1),
+                reverse=True,
+            )
+            for category in categories
+        )
+    )
+    if not any(ranges):
+        return None
+
+    members = list({member for scores in ranges for member in scores})
+    names = await client.hmget(LEADERBOARD_NAMES_KEY, members)
+    name_of = {
+        member: name.decode("utf-8")
+        for member, name in zip(members, names)
+        if name is not None
+    }
+
+    raw_data = {}
+    for category, scores in zip(categories, ranges):
+        entries = []
+        for member, score in scores.items():
+            entry = {"score": int(score)}
+            if member in name_of:
+                entry["name"] = name_of[member]
+            entries.append(entry)
+        raw_data[category] = entries
+    return raw_data
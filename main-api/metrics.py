@@ -0,0 +1,210 @@
+"""
+Prometheus metrics for main-api's hot paths, served at GET /metrics.
+
+Everything is registered on REGISTRY rather than the process-wide default,
+so importing the app twice (tests) does not register metrics twice. Updates
+are a lock and an addition; request timing is a plain ASGI middleware.
+"""
+
+import collections
+import contextlib
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+REGISTRY = CollectorRegistry()
+
+# Seconds; from a cache hit (~1 ms) up to the WebSocket timeout (30 s)
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+# Enqueue until the result is seen; grading takes 0.1 s to the 30 s timeout
+JOB_WAIT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and outcome (hit, miss, error)",
+    ["cache", "outcome"],
+    registry=REGISTRY,
+)
+VALKEY_SECONDS = Histogram(
+    "valkey_operation_duration_seconds",
+    "Valkey round trips on request paths",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+OPEN_WEBSOCKETS = Gauge(
+    "open_websockets",
+    "WebSockets currently open, by route",
+    ["route"],
+    registry=REGISTRY,
+)
+JOB_STATUS_OUTCOMES = Counter(
+    "job_status_outcomes_total",
+    "How /ws/job-status connections ended (done, timeout, error)",
+    ["outcome"],
+    registry=REGISTRY,
+)
+JOB_WAIT_SECONDS = Histogram(
+    "job_wait_seconds",
+    "Time from enqueueing a job to its result being seen on a WebSocket",
+    buckets=JOB_WAIT_BUCKETS,
+    registry=REGISTRY,
+)
+JOB_STAGE_SECONDS = Histogram(
+    "job_stage_duration_seconds",
+    "Time a job spent in each stage, from its trace (job_trace.py)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+SQS_SEND_SECONDS = Histogram(
+    "sqs_send_duration_seconds",
+    "SQS enqueue latency as seen by the caller, batching wait included",
+    ["queue", "outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+LEADERBOARD_CALLS = Counter(
+    "leaderboard_calls_total",
+    "Leaderboard updates from handle_is_submit, by outcome",
+    ["outcome"],
+    registry=REGISTRY,
+)
+LEADERBOARD_SECONDS = Histogram(
+    "leaderboard_call_duration_seconds",
+    "Leaderboard update latency (queue send or API call)",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+# Enqueue times of recent jobs, for JOB_WAIT_SECONDS. Bounded: results of
+# jobs enqueued by another instance, or long forgotten, are not timed.
+MAX_TRACKED_JOBS = 10000
+_enqueued_at = collections.OrderedDict()
+
+
+def job_enqueued(job_id):
+    _enqueued_at[job_id] = time.perf_counter()
+    if len(_enqueued_at) > MAX_TRACKED_JOBS:
+        _enqueued_at.popitem(last=False)
+
+
+def job_result_seen(job_id):
+    """Observes the job's wait once; unknown jobs are ignored."""
+    enqueued_at = _enqueued_at.pop(job_id, None)
+    if enqueued_at is not None:
+        JOB_WAIT_SECONDS.observe(time.perf_counter() - enqueued_at)
+
+
+def job_stages_seen(stages_ms: dict):
+    """Clock skew can make a cross-host stage negative; those count as 0."""
+    for stage, ms in stages_ms.items():
+        JOB_STAGE_SECONDS.labels(stage).observe(max(ms, 0) / 1000)
+
+
+@contextlib.contextmanager
+def observe_outcome(histogram, *labels):
+    """Times the block into histogram, labelled "ok" or "error" last."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.labels(*labels, outcome).observe(time.perf_counter() - start)
+
+
+def leaderboard_call(outcome, started):
+    LEADERBOARD_CALLS.labels(outcome).inc()
+    LEADERBOARD_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+
+
+def render_metrics():
+    """(body, content type) of the text exposition format."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def route_template(scope) -> str:
+    """The matched route's path ("/ws/job-status/{job_id}"), not the URL."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Times HTTP requests by method, route template and status, and counts
+    open WebSockets. Route templates keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], route_template(scope), str(status)
+            ).observe(time.perf_counter() - start)
+
+    async def _websocket(self, scope, receive, send):
+        gauge = None
+
+        async def send_tracking_open(message):
+            nonlocal gauge
+            if message["type"] == "websocket.accept":
+                gauge = OPEN_WEBSOCKETS.labels(route_template(scope))
+                gauge.inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking_open)
+        finally:
+            if gauge is not None:
+                gauge.dec()
@@ -1,6 +1,11 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+import asyncio
 import json
 
+from structured_log import get_logger
+
+log = get_logger("main-api")
+
 BASE_URL = (
     "https://byspc9u2xa.execute-api.eu-north-1.amazonaws.com/random-questions"
 )
@@ -39,3 +44,209 @@ def parse_inputs_outputs(data):
             except json.JSONDecodeError:
                 pass  # Leave it unchanged if it fails
     return data
+
+
+ACTIVE_QUESTIONS_KEY = "active_questions"
+# Small key written by the questions cache updater next to the blob:
+# {"version": "...", "timestamp": "...", "days": 5}
+ACTIVE_QUESTIONS_META_KEY = "active_questions_meta"
+# Test cases included in the public view of a question
+PUBLIC_TEST_CASES = 3
+LEVELS = ("easy", "hard")
+
+
+def daily_question_key(date: str, level: str, view: str) -> str:
+    """
+    Key of one per-day projection written by the questions cache updater.
+    The date is a hash tag so one day's keys can be read with a single MGET.
+    """
+    return f"daily_question:{{{date}}}:{level}:{view}"
+
+
+def day_date(timestamp_str: str, day_index: int) -> str:
+    day_start = datetime.fromisoformat(timestamp_str)
+    return (day_start + timedelta(days=day_index)).date().isoformat()
+
+
+def prepare_question(question):
+    """
+    Returns a copy of a cached question ready to serve: solutions removed
+    and stringified inputs/outputs parsed.
+    """
+    prepared = {k: v for k, v in question.items() if k != "solutions"}
+    return parse_inputs_outputs(prepared)
+
+
+def question_views(question):
+    """The public (first test cases only) and full grading views."""
+    full = prepare_question(question)
+    public = dict(full)
+    public["inputs"] = full["inputs"][:PUBLIC_TEST_CASES]
+    public["outputs"] = full["outputs"][:PUBLIC_TEST_CASES]
+    return {"public": public, "full": full}
+
+
+class ActiveQuestionsCache:
+    """
+    Process-local copy of today's questions, already parsed, so serving a
+    request needs no cache round trip and no JSON decoding. refresh() reads
+    the small ACTIVE_QUESTIONS_META_KEY and only fetches questions again
+    when the version or the day changes: today's per-day projections if the
+    updater wrote them, otherwise the full 'active_questions' blob.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.timestamp = None
+        self.days = None
+        self.day_index = None
+        self.views = {}  # level -> {"public": question, "full": question}
+        self._lock = None
+
+    @property
+    def is_loaded(self):
+        return bool(self.timestamp and self.views)
+
+    def current_day_index(self, timestamp=None, days=None):
+        timestamp = timestamp or self.timestamp
+        days = days or self.days
+        # If the day index is >= to the number of questions, use the last one.
+        return min(get_day_index(timestamp), days - 1)
+
+    def is_current(self):
+        """False once the day has rolled over since the last load."""
+        return self.is_loaded and self.current_day_index() == self.day_index
+
+    def load(self, active_questions_data, version=None):
+        """Selects today's questions from a decoded 'active_questions'."""
+        ts = active_questions_data.get("timestamp")
+        if not ts:
+            raise ValueError("Cache data missing timestamp.")
+
+        questions = active_questions_data.get("questions", {})
+        easy_qs = questions.get("easy", {}).get("questions", [])
+        hard_qs = questions.get("hard", {}).get("questions", [])
+        if not easy_qs or not hard_qs:
+            raise ValueError("No questions available in cache.")
+
+        days = min(len(easy_qs), len(hard_qs))
+        day_index = self.current_day_index(ts, days)
+        self._set_day(
+            {
+                "easy": question_views(easy_qs[day_index]),
+                "hard": question_views(hard_qs[day_index]),
+            },
+            version,
+            ts,
+            days,
+            day_index,
+        )
+
+    def _set_day(self, views, version, timestamp, days, day_index):
+        self.views = views
+        self.version = version
+        self.timestamp = timestamp
+        self.days = days
+        self.day_index = day_index
+
+    async def _load_projections(self, valkey_client, meta, day_index):
+        """Loads today's per-day keys. Returns False if any is missing."""
+        date = day_date(meta["timestamp"], day_index)
+        keys = [
+            daily_question_key(date, level, view)
+            for level in LEVELS
+            for view in ("public", "full")
+        ]
+        values = await valkey_client.mget(keys)
+        if not all(values):
+            return False
+
+        decoded = iter(json.loads(value) for value in values)
+        views = {
+            level: {"public": next(decoded), "full": next(decoded)}
+            for level in LEVELS
+        }
+        self._set_day(
+            views,
+            meta.get("version"),
+            meta["timestamp"],
+            meta["days"],
+            day_index,
+        )
+        return True
+
+    async def refresh(self, valkey_client, force=False):
+        """
+        Reloads the questions if the updater published a new version or the
+        day has changed. Returns True if the cached questions changed.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            meta = {}
+            meta_value = await valkey_client.get(ACTIVE_QUESTIONS_META_KEY)
+            if meta_value:
+                meta = json.loads(meta_value)
+            version = meta.get("version")
+
+            if meta.get("timestamp") and meta.get("days"):
+                day_index = self.current_day_index(
+                    meta["timestamp"], meta["days"]
+                )
+                if (
+                    not force
+                    and self.is_loaded
+                    and version == self.version
+                    and day_index == self.day_index
+                ):
+                    return False
+                if await self._load_projections(
+                    valkey_client, meta, day_index
+                ):
+                    log.info("daily_questions_loaded", version=version)
+                    return True
+            elif (
+                not force
+                and self.is_current()
+                and version is not None
+                and version == self.version
+            ):
+                return False
+
+            # Fall back to the full blob.
+            cached_value = await valkey_client.get(ACTIVE_QUESTIONS_KEY)
+            if not cached_value:
+                raise LookupError(
+                    "Could not find data in cache "
+                    f"for key '{ACTIVE_QUESTIONS_KEY}'."
+                )
+            self.load(json.loads(cached_value), version=version)
+            log.info("active_questions_reloaded", version=version)
+            return True
+
+    async def refresh_periodically(self, valkey_client, interval):
+        """Keeps the cache fresh in the background until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(valkey_client)
+            except Exception as e:
+                log.warning("active_questions_refresh_failed", error=str(e))
+
+    def get_daily_questions(self, max_test_cases=None):
+        """Today's easy and hard questions, as shallow copies."""
+        use_public = (
+            max_test_cases is not None and max_test_cases <= PUBLIC_TEST_CASES
+        )
+        daily = {}
+        for level in LEVELS:
+            question = dict(
+                self.views[level]["public" if use_public else "full"]
+            )
+            # Limit number of test cases sent to client
+            if max_test_cases is not None:
+                question["inputs"] = question["inputs"][:max_test_cases]
+                question["outputs"] = question["outputs"][:max_test_cases]
+            daily[level] = question
+        return daily
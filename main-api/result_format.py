@@ -0,0 +1,51 @@
+import base64
+import json
+import zlib
+
+# Must match lambda-code-evaluator-v2/app/result_format.py
+COMPACT_FORMAT = "compact-v1"
+COMPRESSED_PREFIX = "zlib:"
+
+
+def decode_job_result(raw):
+    """
+    Cached job results are JSON strings (bytes from Valkey), optionally
+    zlib-compressed and base64-encoded behind COMPRESSED_PREFIX.
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode("utf-8")
+    if raw.startswith(COMPRESSED_PREFIX):
+        start = len(COMPRESSED_PREFIX)
+        raw = zlib.decompress(base64.b64decode(raw[start:])).decode("utf-8")
+    return json.loads(raw)
+
+
+def decode_pass_bitmap(bitmap: str, case_count: int) -> list:
+    """Case i is bit i % 8 of byte i // 8."""
+    data = base64.b64decode(bitmap)
+    return [bool(data[i // 8] >> (i % 8) & 1) for i in range(case_count)]
+
+
+def expand_job_output(output):
+    """
+    Adds the per-case fields the frontend reads (passed_per_case,
+    actual_outputs) to a compact evaluation. Cases the evaluator did not
+    detail have a null actual output. Other outputs are returned as is.
+    """
+    if not isinstance(output, dict) or output.get("format") != COMPACT_FORMAT:
+        return output
+    case_count = output["case_count"]
+    actual_outputs = [None] * case_count
+    for index, case in output.get("cases", {}).items():
+        actual_outputs[int(index)] = case.get("actual")
+    return dict(
+        output,
+        passed_per_case=decode_pass_bitmap(output["pass_bitmap"], case_count),
+        actual_outputs=actual_outputs,
+    )
+
+
+def expand_job_result(job_result):
+    if not isinstance(job_result, dict):
+        return job_result
+    return dict(job_result, output=expand_job_output(job_result.get("output")))
@@ -0,0 +1,108 @@
+import asyncio
+import os
+
+# SQS accepts at most 10 entries and 256 KiB per send_message_batch call
+SQS_BATCH_SIZE = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+# How long a message may wait for others to share its batch
+SQS_BATCH_WAIT_SECONDS = float(os.getenv("SQS_BATCH_WAIT_MS", "5")) / 1000
+
+
+class SQSBatchError(Exception):
+    """Raised for a message SQS rejected within an otherwise sent batch."""
+
+    pass
+
+
+class SQSBatchSender:
+    """
+    Coalesces messages sent within a few milliseconds of each other into
+    send_message_batch calls. The blocking boto3 call runs in a worker
+    thread, so the event loop keeps serving other requests and WebSockets
+    while AWS answers.
+    """
+
+    def __init__(
+        self,
+        sqs_client,
+        queue_url,
+        max_batch_size=SQS_BATCH_SIZE,
+        max_wait=SQS_BATCH_WAIT_SECONDS,
+    ):
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches_sent = 0
+        self._pending = []  # (entry, future, size)
+        self._pending_bytes = 0
+        self._flush_handle = None
+        self._inflight = set()
+
+    async def send(self, message_body: str, message_group_id=None) -> str:
+        """Queues one message and returns its SQS MessageId once sent."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = {"MessageBody": message_body}
+        if message_group_id is not None:
+            entry["MessageGroupId"] = message_group_id
+        size = len(message_body.encode("utf-8"))
+
+        if self._pending_bytes + size > SQS_BATCH_MAX_BYTES:
+            self._flush()
+        self._pending.append((entry, future, size))
+        self._pending_bytes += size
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        """Starts sending everything buffered so far."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        self._pending_bytes = 0
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send_batch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send_batch(self, batch):
+        entries = [
+            dict(entry, Id=str(index))
+            for index, (entry, _, _) in enumerate(batch)
+        ]
+        self.batches_sent += 1
+        try:
+            response = await asyncio.to_thread(
+                self.sqs.send_message_batch,
+                QueueUrl=self.queue_url,
+                Entries=entries,
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for sent in response.get("Successful", []):
+            future = batch[int(sent["Id"])][1]
+            if not future.done():
+                future.set_result(sent["MessageId"])
+        for failed in response.get("Failed", []):
+            future = batch[int(failed["Id"])][1]
+            if not future.done():
+                future.set_exception(
+                    SQSBatchError(failed.get("Message") or failed["Code"])
+                )
+
+    async def close(self):
+        """Sends anything still buffered and waits for batches in flight."""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
@@ -0,0 +1,405 @@
+"""
+Load harness for main-api. Simulated users each fetch the daily question,
+submit code and wait on the job's WebSocket, while a fake evaluator completes
+the queued jobs after a realistic, randomized delay.
+
+The app runs in-process (ASGI) with the Valkey and SQS stand-ins below, so
+the numbers show main-api's own cost: throughput, tail latency per step,
+event-loop lag and Valkey operations per request. Network latency to Valkey
+and SQS is simulated with fixed delays.
+
+Run from main-api: python tests/load_harness.py --users 2000 --concurrency 500
+"""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import httpx  # noqa: E402
+from glide import GlideClient  # noqa: E402
+
+import app as app_module  # noqa: E402
+from test_valkey_cache import FakeValkeyClient  # noqa: E402
+
+# Simulated round trips of the managed services
+VALKEY_LATENCY = 0.0005
+SQS_LATENCY = 0.02
+
+
+class CountingValkeyClient(FakeValkeyClient):
+    """The test fake, with a simulated round trip and per-command counts."""
+
+    def __init__(self, latency=VALKEY_LATENCY):
+        super().__init__()
+        self.latency = latency
+        self.ops = collections.Counter()
+        self.startup_ops = 0
+
+    async def _round_trip(self, command):
+        self.ops[command] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get(self, key):
+        await self._round_trip("get")
+        return await super().get(key)
+
+    async def mget(self, keys):
+        await self._round_trip("mget")
+        values = []
+        for key in keys:
+            values.append(await super().get(key))
+        return values
+
+    async def xrange(self, key, start, end):
+        await self._round_trip("xrange")
+        return await super().xrange(key, start, end)
+
+    async def publish(self, message, channel):
+        await self._round_trip("publish")
+        return await super().publish(message, channel)
+
+
+class FakeEvaluator:
+    """
+    Stands in for SQS plus the code evaluator: every queued job is graded
+    after a log-normally distributed delay, then stored and published the
+    way cache_storing.store_result_in_valkey does.
+    """
+
+    def __init__(self, valkey, loop, median_ms, sigma):
+        self.valkey = valkey
+        self.loop = loop
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.batches = 0
+        self.pending = set()
+
+    def send_message_batch(self, QueueUrl, Entries):
+        # Called from SQSBatchSender's worker thread, like boto3 would be
+        time.sleep(SQS_LATENCY)
+        self.batches += 1
+        for entry in Entries:
+            self.loop.call_soon_threadsafe(
+                self._start, json.loads(entry["MessageBody"])
+            )
+        return {
+            "Successful": [
+                {"Id": entry["Id"], "MessageId": entry["Id"]}
+                for entry in Entries
+            ],
+            "Failed": [],
+        }
+
+    def _start(self, job):
+        task = asyncio.ensure_future(self._grade(job))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _grade(self, job):
+        trace = dict(job.get("trace") or {}, dequeued_at=time.time())
+        delay = min(self.median * math.exp(random.gauss(0, self.sigma)), 20)
+        await asyncio.sleep(delay)
+        trace["graded_at"] = trace["stored_at"] = time.time()
+        job_result = {
+            "status": "completed",
+            "output": {
+                "passed": True,
+                "passed_per_case": [True] * len(job["test_cases"]["inputs"]),
+                "job_id": job["job_id"],
+                "is_submit": job["is_submit"],
+                "trace": trace,
+            },
+        }
+        self.valkey.store[f"job:{job['job_id']}"] = json.dumps(job_result)
+        self.valkey.ops["set"] += 1
+        await self.valkey.publish(
+            json.dumps({"job_id": job["job_id"], "result": job_result}),
+            app_module.JOB_RESULTS_CHANNEL,
+        )
+
+
+def active_questions(test_cases=10):
+    """An 'active_questions' blob for today, as the updater writes it."""
+    today = datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+
+    def question(question_id, difficulty):
+        return {
+            "id": question_id,
+            "difficulty": difficulty,
+            "question": "Return the input.",
+            "starter_code": "class Solution:\n    def f(self, x):\n",
+            "inputs": json.dumps([[i] for i in range(test_cases)]),
+            "outputs": json.dumps(list(range(test_cases))),
+        }
+
+    return {
+        "timestamp": today.isoformat(),
+        "questions": {
+            "easy": {"questions": [question(1, "introductory")]},
+            "hard": {"questions": [question(2, "interview")]},
+        },
+    }
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Runs the app's startup and shutdown handlers (ASGI lifespan)."""
+    inbox = asyncio.Queue()
+    started, stopped = asyncio.Event(), asyncio.Event()
+
+    async def send(message):
+        if message["type"].startswith("lifespan.startup"):
+            started.set()
+        elif message["type"].startswith("lifespan.shutdown"):
+            stopped.set()
+
+    task = asyncio.ensure_future(
+        app({"type": "lifespan", "asgi": {"version": "3.0"}}, inbox.get, send)
+    )
+    await inbox.put({"type": "lifespan.startup"})
+    await started.wait()
+    try:
+        yield
+    finally:
+        await inbox.put({"type": "lifespan.shutdown"})
+        await stopped.wait()
+        await task
+
+
+async def websocket_messages(app, path):
+    """
+    Connects to a WebSocket route in-process and returns the JSON messages
+    it sent, as (seconds since connecting, message), until it closed.
+    """
+    inbox = asyncio.Queue()
+    inbox.put_nowait({"type": "websocket.connect"})
+    messages = []
+    start = time.perf_counter()
+
+    async def send(message):
+        if message["type"] == "websocket.send":
+            data = json.loads(message.get("text") or message["bytes"])
+            messages.append((time.perf_counter() - start, data))
+        elif message["type"] == "websocket.close":
+            inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0"},
+        "scheme": "ws",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+        "subprotocols": [],
+    }
+    await app(scope, inbox.get, send)
+    return messages
+
+
+class LoadReport:
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.completed = 0
+        self.open_websockets = 0
+        self.peak_websockets = 0
+        self.loop_lags = []
+
+    def record(self, step, seconds):
+        self.latencies[step].append(seconds * 1000)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def simulate_user(client, index, report):
+    start = time.perf_counter()
+    response = await client.get("/api/daily-question")
+    report.record("daily_question", time.perf_counter() - start)
+    if response.status_code != 200:
+        report.errors[f"daily_question {response.status_code}"] += 1
+        return
+    question = response.json()["easy"]
+
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/submit-code",
+        json={
+            "problem_id": question["id"],
+            "language": "python",
+            "code": f"class Solution:\n    def f(self, x):\n        return x  # {index}",
+            "is_submit": False,
+            "user_id": f"load-user-{index}",
+        },
+    )
+    report.record("submit_code", time.perf_counter() - start)
+    job_id = response.json().get("job_id") if response.is_success else None
+    if not job_id:
+        report.errors[f"submit_code {response.status_code}"] += 1
+        return
+
+    report.open_websockets += 1
+    report.peak_websockets = max(
+        report.peak_websockets, report.open_websockets
+    )
+    try:
+        messages = await websocket_messages(
+            app_module.app, f"/ws/job-status/{job_id}"
+        )
+    finally:
+        report.open_websockets -= 1
+    final = messages[-1][1] if messages else {}
+    if final.get("status") != "done":
+        report.errors[f"websocket {final.get('status', 'closed')}"] += 1
+        return
+    report.record("job_result", messages[-1][0])
+    report.completed += 1
+
+
+async def measure_loop_lag(report, done, interval=0.005):
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        report.loop_lags.append(
+            (time.perf_counter() - start - interval) * 1000
+        )
+
+
+async def run_load(users, concurrency, median_ms, sigma, seed=0):
+    """Runs the simulation and returns (report, valkey, evaluator, seconds)."""
+    random.seed(seed)
+    loop = asyncio.get_running_loop()
+    valkey = CountingValkeyClient()
+    valkey.store["active_questions"] = json.dumps(active_questions())
+    evaluator = FakeEvaluator(valkey, loop, median_ms, sigma)
+
+    async def fake_create(config):
+        return valkey
+
+    original_create = GlideClient.create
+    GlideClient.create = fake_create
+    app_module.sqs = evaluator
+    app_module.SQS_QUEUE_URL = "https://sqs.local/jobs"
+    report = LoadReport()
+    try:
+        async with lifespan(app_module.app):
+            valkey.startup_ops = sum(valkey.ops.values())
+            valkey.ops.clear()
+            transport = httpx.ASGITransport(app=app_module.app)
+            limit = asyncio.Semaphore(concurrency)
+            done = asyncio.Event()
+            ticker = asyncio.ensure_future(measure_loop_lag(report, done))
+
+            async def user(index):
+                async with limit:
+                    await simulate_user(client, index, report)
+
+            start = time.perf_counter()
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://main-api"
+            ) as client:
+                await asyncio.gather(*(user(i) for i in range(users)))
+            elapsed = time.perf_counter() - start
+            done.set()
+            await ticker
+    finally:
+        GlideClient.create = original_create
+    return report, valkey, evaluator, elapsed
+
+
+def print_report(report, valkey, evaluator, elapsed, users):
+    requests = sum(
+        len(report.latencies[step])
+        for step in ("daily_question", "submit_code", "job_result")
+    )
+    print(f"users: {users}, completed: {report.completed}, {elapsed:.1f} s")
+    print(
+        f"throughput: {report.completed / elapsed:.1f} jobs/s, "
+        f"{requests / elapsed:.1f} requests/s (HTTP + WebSocket)"
+    )
+    print(f"peak open WebSockets: {report.peak_websockets}")
+    print(f"{'step':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max':>10}")
+    for step, samples in report.latencies.items():
+        print(
+            f"{step:<16}{percentile(samples, 50):>10.1f}"
+            f"{percentile(samples, 95):>10.1f}{percentile(samples, 99):>10.1f}"
+            f"{max(samples):>10.1f}"
+        )
+    lags = report.loop_lags
+    print(
+        f"event loop lag: p50 {percentile(lags, 50):.1f} ms, "
+        f"p99 {percentile(lags, 99):.1f} ms, max {max(lags):.1f} ms"
+    )
+    total_ops = sum(valkey.ops.values())
+    print(
+        f"Valkey ops: {total_ops} ({total_ops / max(requests, 1):.2f} per "
+        f"request, {valkey.startup_ops} at startup): {dict(valkey.ops)}"
+    )
+    print(f"SQS batches: {evaluator.batches} for {users} submissions")
+    for error, count in report.errors.items():
+        print(f"ERROR {error}: {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=250,
+        help="users in flight at once",
+    )
+    parser.add_argument(
+        "--eval-median-ms",
+        type=float,
+        default=800,
+        help="median time the fake evaluator takes per job",
+    )
+    parser.add_argument("--eval-sigma", type=float, default=0.5)
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="keep the app's own log output",
+    )
+    args = parser.parse_args(argv)
+
+    output = contextlib.nullcontext()
+    if not args.verbose:
+        # The app logs every request; that cost stays in the numbers.
+        output = contextlib.redirect_stdout(io.StringIO())
+    with output:
+        report, valkey, evaluator, elapsed = asyncio.run(
+            run_load(
+                args.users,
+                args.concurrency,
+                args.eval_median_ms,
+                args.eval_sigma,
+            )
+        )
+    print_report(report, valkey, evaluator, elapsed, args.users)
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+import pytest
+
+from http_pool import PooledHTTPClient
+
+
+def test_request_stats_count_requests_in_flight():
+    async def scenario():
+        pooled = PooledHTTPClient()
+        release = asyncio.Event()
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if request.url.path == "/fail":
+                raise httpx.ConnectError("refused", request=request)
+            await release.wait()
+            return httpx.Response(200, json={"message": "ok"})
+
+        pooled.transport.transport = httpx.MockTransport(handler)
+        pending = [
+            asyncio.ensure_future(pooled.client.get("https://api.test/slow"))
+            for _ in range(3)
+        ]
+        while len(calls) < 3:
+            await asyncio.sleep(0)
+        during = pooled.request_stats()
+
+        with pytest.raises(httpx.ConnectError):
+            await pooled.client.get("https://api.test/fail")
+        release.set()
+        await asyncio.gather(*pending)
+        after = pooled.request_stats()
+        await pooled.aclose()
+        return during, after
+
+    during, after = asyncio.run(scenario())
+    assert during["in_flight_requests"] == 3
+    assert during["requests_sent"] == 3
+    assert after["in_flight_requests"] == 0
+    # The failing request was sent while the other three were waiting
+    assert after["peak_in_flight_requests"] == 4
+    assert after["requests_sent"] == 4
+    assert after["responses_received"] == 3
+    assert after["request_errors"] == 1
@@ -0,0 +1,26 @@
+import asyncio
+
+import app as app_module
+from load_harness import run_load
+
+
+def test_load_harness_completes_every_user(monkeypatch):
+    """
+    Smoke test of tests/load_harness.py: a small simulated crowd gets every
+    job result over the WebSocket, with no Valkey polling.
+    """
+    for name in ("sqs", "SQS_QUEUE_URL", "valkey_client", "questions_cache"):
+        monkeypatch.setattr(app_module, name, getattr(app_module, name))
+
+    report, valkey, evaluator, _ = asyncio.run(
+        run_load(users=40, concurrency=20, median_ms=20, sigma=0.2)
+    )
+
+    assert not report.errors
+    assert report.completed == 40
+    assert len(report.latencies["job_result"]) == 40
+    # One cache check and one progress replay per WebSocket; the daily
+    # question is served from memory.
+    assert valkey.ops["get"] == 40
+    assert valkey.ops["xrange"] == 40
+    assert evaluator.batches < 40
@@ -0,0 +1,121 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from questions_fns import (
+    ActiveQuestionsCache,
+    daily_question_key,
+    question_views,
+)
+
+
+# --- Fake Valkey Client counting GETs ---
+class CountingValkeyClient:
+    def __init__(self, store):
+        self.store = store
+        self.gets = []
+
+    async def get(self, key):
+        self.gets.append(key)
+        value = self.store.get(key)
+        return value.encode("utf-8") if isinstance(value, str) else value
+
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+
+
+def make_question(question_id, difficulty):
+    return {
+        "id": question_id,
+        "difficulty": difficulty,
+        "starter_code": "class Solution:\n    def f(self, x):\n",
+        "solutions": "secret",
+        "inputs": json.dumps([[1], [2], [3], [4]]),
+        "outputs": json.dumps([1, 2, 3, 4]),
+    }
+
+
+def today_start():
+    return datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+
+
+def make_store(version):
+    today = today_start()
+    payload = {
+        "timestamp": today.isoformat(),
+        "questions": {
+            "easy": {"questions": [make_question(1, "introductory")]},
+            "hard": {"questions": [make_question(2, "interview")]},
+        },
+    }
+    return {
+        "active_questions": json.dumps(payload),
+        "active_questions_meta": json.dumps({"version": version}),
+    }
+
+
+def test_questions_are_parsed_once_and_served_from_memory():
+    client = CountingValkeyClient(make_store("v1"))
+    cache = ActiveQuestionsCache()
+
+    assert asyncio.run(cache.refresh(client)) is True
+    gets_after_load = len(client.gets)
+
+    daily = cache.get_daily_questions(max_test_cases=3)
+    assert daily["easy"]["id"] == 1
+    assert daily["hard"]["id"] == 2
+    assert daily["easy"]["inputs"] == [[1], [2], [3]]
+    assert daily["easy"]["outputs"] == [1, 2, 3]
+    assert "solutions" not in daily["easy"]
+
+    # Serving a request touches neither the cache nor the stored copy.
+    full = cache.get_daily_questions()
+    assert full["easy"]["inputs"] == [[1], [2], [3], [4]]
+    assert len(client.gets) == gets_after_load
+
+
+def test_refresh_only_reloads_on_new_version():
+    client = CountingValkeyClient(make_store("v1"))
+    cache = ActiveQuestionsCache()
+    asyncio.run(cache.refresh(client))
+
+    client.gets.clear()
+    assert asyncio.run(cache.refresh(client)) is False
+    assert client.gets == ["active_questions_meta"]
+
+    client.store.update(make_store("v2"))
+    assert asyncio.run(cache.refresh(client)) is True
+    assert cache.version == "v2"
+
+
+def test_refresh_reads_only_todays_projections():
+    """
+    When the updater wrote per-day projections, only today's keys are read
+    and the full active_questions blob is never fetched.
+    """
+    today = today_start()
+    date = today.date().isoformat()
+    store = {
+        "active_questions_meta": json.dumps(
+            {"version": "v1", "timestamp": today.isoformat(), "days": 5}
+        )
+    }
+    for level, question in (
+        ("easy", make_question(1, "introductory")),
+        ("hard", make_question(2, "interview")),
+    ):
+        for view, value in question_views(question).items():
+            store[daily_question_key(date, level, view)] = json.dumps(value)
+
+    client = CountingValkeyClient(store)
+    cache = ActiveQuestionsCache()
+    assert asyncio.run(cache.refresh(client)) is True
+    assert "active_questions" not in client.gets
+
+    public = cache.get_daily_questions(max_test_cases=3)
+    assert public["easy"]["inputs"] == [[1], [2], [3]]
+    full = cache.get_daily_questions()
+    assert full["hard"]["outputs"] == [1, 2, 3, 4]
+    assert "solutions" not in full["hard"]
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import pytest
 from fastapi.testclient import TestClient
@@ -84,3 +85,42 @@ def test_submit_code_enqueues_message(client, sqs_client_and_queue):
     assert body["problem_id"] == client_payload["problem_id"]
     assert body["language"] == client_payload["language"]
     # Additional asserts can be added to validate other parts of the payload.
+
+
+def test_handle_is_submit_queues_leaderboard_update(
+    sqs_client_and_queue, monkeypatch
+):
+    """
+    With LEADERBOARD_QUEUE_URL set, a passing submission is queued for the
+    leaderboard updater's batch mode instead of posted to the API.
+    """
+    import app as app_module
+
+    sqs_client, _ = sqs_client_and_queue
+    queue_url = sqs_client.create_queue(QueueName="leaderboard-updates")[
+        "QueueUrl"
+    ]
+    monkeypatch.setattr(app_module, "LEADERBOARD_QUEUE_URL", queue_url)
+
+    result = asyncio.run(
+        app_module.handle_is_submit(
+            {
+                "output": {
+                    "user_id": "user-1",
+                    "problem_id": 7,
+                    "difficulty": "introductory",
+                }
+            }
+        )
+    )
+    assert result == {"status": "queued"}
+
+    messages = sqs_client.receive_message(
+        QueueUrl=queue_url, MaxNumberOfMessages=1
+    )
+    body = json.loads(messages["Messages"][0]["Body"])
+    assert body == {
+        "user_id": "user-1",
+        "problem_id": 7,
+        "difficulty": "introductory",
+    }
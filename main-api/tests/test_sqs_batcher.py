@@ -0,0 +1,167 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+import app as app_module
+from questions_fns import ActiveQuestionsCache
+from sqs_batcher import SQSBatchError, SQSBatchSender
+
+# Simulated AWS round trip of the SQS stand-in
+SQS_LATENCY = 0.2
+CONCURRENT_SUBMITS = 30
+
+
+# --- Local SQS stand-in with a realistic, blocking round trip ---
+class SlowFakeSQS:
+    def __init__(self, fail_ids=()):
+        self.calls = []
+        self.messages = []
+        self.fail_ids = set(fail_ids)
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        time.sleep(SQS_LATENCY)
+        self.calls.append(1)
+        self.messages.append(MessageBody)
+        return {"MessageId": str(len(self.messages))}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        time.sleep(SQS_LATENCY)
+        self.calls.append(len(Entries))
+        response = {"Successful": [], "Failed": []}
+        for entry in Entries:
+            if entry["Id"] in self.fail_ids:
+                response["Failed"].append(
+                    {"Id": entry["Id"], "Code": "InternalError"}
+                )
+                continue
+            self.messages.append(entry["MessageBody"])
+            response["Successful"].append(
+                {"Id": entry["Id"], "MessageId": str(len(self.messages))}
+            )
+        return response
+
+
+async def max_loop_lag(workload):
+    """
+    Runs the workload while a ticker measures how late the event loop wakes
+    it up. Returns (workload result, worst lag in seconds).
+    """
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    try:
+        result = await workload()
+    finally:
+        done.set()
+        await ticker_task
+    return result, max(lags)
+
+
+def make_questions_cache():
+    today = datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+    question = {
+        "starter_code": "class Solution:\n    def f(self, x):\n",
+        "inputs": json.dumps([[1], [2]]),
+        "outputs": json.dumps([1, 2]),
+    }
+    cache = ActiveQuestionsCache()
+    cache.load(
+        {
+            "timestamp": today.isoformat(),
+            "questions": {
+                "easy": {
+                    "questions": [
+                        dict(question, id=1, difficulty="introductory")
+                    ]
+                },
+                "hard": {
+                    "questions": [dict(question, id=2, difficulty="interview")]
+                },
+            },
+        },
+        "v1",
+    )
+    return cache
+
+
+@pytest.fixture
+def slow_sqs(monkeypatch):
+    fake = SlowFakeSQS()
+    monkeypatch.setattr(app_module, "sqs", fake)
+    monkeypatch.setattr(app_module, "SQS_QUEUE_URL", "https://sqs.test/q")
+    monkeypatch.setattr(app_module, "job_sender", None)
+    monkeypatch.setattr(app_module, "questions_cache", make_questions_cache())
+    return fake
+
+
+def submit_payload(index):
+    return {
+        "problem_id": 1,
+        "language": "python",
+        "code": f"# submission {index}",
+        "is_submit": False,
+        "user_id": f"user-{index}",
+    }
+
+
+def test_concurrent_submits_do_not_block_event_loop(slow_sqs):
+    """
+    Load test: concurrent submits through the ASGI app are queued in a few
+    batches, every caller gets its job_id, and the event loop stays
+    responsive even though each SQS call takes SQS_LATENCY.
+    """
+
+    async def submit_all():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await asyncio.gather(
+                *(
+                    client.post("/api/submit-code", json=submit_payload(i))
+                    for i in range(CONCURRENT_SUBMITS)
+                )
+            )
+
+    responses, lag = asyncio.run(max_loop_lag(submit_all))
+
+    job_ids = {response.json()["job_id"] for response in responses}
+    assert all(response.status_code == 200 for response in responses)
+    assert len(job_ids) == CONCURRENT_SUBMITS
+    assert {json.loads(body)["job_id"] for body in slow_sqs.messages} == (
+        job_ids
+    )
+    # Up to 10 messages per call instead of one call per submit.
+    assert len(slow_sqs.calls) <= CONCURRENT_SUBMITS // 10 + 2
+    assert lag < SQS_LATENCY / 2
+
+
+def test_rejected_entry_fails_only_its_sender():
+    """An entry SQS rejects fails its own caller; the rest are sent."""
+    fake = SlowFakeSQS(fail_ids={"1"})
+
+    async def send_three():
+        sender = SQSBatchSender(fake, "q")
+        return await asyncio.gather(
+            *(sender.send(f"message {i}") for i in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(send_three())
+    assert isinstance(results[1], SQSBatchError)
+    assert results[0] != results[2]
+    assert fake.calls == [3]
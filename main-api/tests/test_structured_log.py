@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+from structured_log import DEBUG, INFO, WARNING, StageTimer, StructuredLogger
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_levels_and_capped_fields():
+    stream = io.StringIO()
+    log = StructuredLogger("test", level=INFO, stream=stream)
+
+    log.debug("payload", payload={"code": "x"})
+    log.info("job_enqueued", job_id="abc", code="x" * 600, cases=3)
+
+    (record,) = records(stream)
+    assert record["level"] == "INFO"
+    assert record["event"] == "job_enqueued"
+    assert record["cases"] == 3
+    assert record["code"].startswith("x" * 500)
+    assert record["code"].endswith("[100 more chars]")
+    assert not log.enabled(DEBUG)
+
+
+def test_sampling_never_drops_warnings():
+    stream = io.StringIO()
+    log = StructuredLogger("test", level=DEBUG, sample_rate=0, stream=stream)
+
+    log.info("sampled_out")
+    log.log(INFO, "always", sample=1)
+    log.log(WARNING, "warned")
+
+    assert [r["event"] for r in records(stream)] == ["always", "warned"]
+
+
+def test_stage_timings():
+    stream = io.StringIO()
+    log = StructuredLogger("test", stream=stream)
+    timer = StageTimer()
+    with timer.stage("validate"):
+        pass
+    with log.timed("stored", key="job:1") as fields:
+        fields["bytes"] = 10
+
+    fields = timer.fields()
+    assert set(fields) == {"validate_ms", "total_ms"}
+    assert fields["total_ms"] >= fields["validate_ms"] >= 0
+    (record,) = records(stream)
+    assert record["bytes"] == 10 and record["duration_ms"] >= 0
+
+
+def test_timed_block_that_raises_logs_a_warning():
+    stream = io.StringIO()
+    log = StructuredLogger("test", stream=stream)
+
+    with pytest.raises(ConnectionError):
+        with log.timed("job_enqueued", job_id="abc"):
+            raise ConnectionError("SQS unreachable")
+
+    (record,) = records(stream)
+    assert record["event"] == "job_enqueued"
+    assert record["level"] == "WARNING"
+    assert record["error"] == "ConnectionError"
+    assert record["duration_ms"] >= 0
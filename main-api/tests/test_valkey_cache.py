@@ -1,8 +1,13 @@
+import base64
 import json
 import time
+import zlib
+import httpx
 import pytest
 import asyncio
 from fastapi.testclient import TestClient
+from glide import PubSubMsg
+import app as app_module
 from app import app  # This imports the FastAPI instance
 
 
@@ -10,6 +15,10 @@ from app import app  # This imports the FastAPI instance
 class FakeValkeyClient:
     def __init__(self):
         self.store = {}
+        self.sorted_sets = {}
+        self.hashes = {}
+        self.streams = {}
+        self.messages = None
 
     async def get(self, key):
         # Return the value if present.
@@ -25,6 +34,58 @@ class FakeValkeyClient:
             value = value.decode("utf-8")
         self.store[key] = value
 
+    async def zrange_withscores(self, key, range_query, reverse=False):
+        scores = self.sorted_sets.get(key, {})
+        ranked = sorted(
+            scores.items(), key=lambda item: item[1], reverse=reverse
+        )
+        start, end = range_query.start, range_query.end + 1
+        ranked = ranked[start:end]
+        return {member.encode("utf-8"): score for member, score in ranked}
+
+    async def hgetall(self, key):
+        return {
+            field.encode("utf-8"): str(value).encode("utf-8")
+            for field, value in self.hashes.get(key, {}).items()
+        }
+
+    async def hmget(self, key, fields):
+        values = self.hashes.get(key, {})
+        return [
+            (
+                values[field.decode("utf-8")].encode("utf-8")
+                if field.decode("utf-8") in values
+                else None
+            )
+            for field in fields
+        ]
+
+    async def xrange(self, key, start, end):
+        entries = self.streams.get(key)
+        if not entries:
+            return None
+        return {
+            f"{index}-0".encode("utf-8"): [
+                [name.encode("utf-8"), value.encode("utf-8")]
+                for name, value in fields
+            ]
+            for index, fields in enumerate(entries, start=1)
+        }
+
+    async def publish(self, message, channel):
+        await self._message_queue().put((channel, message))
+        return 1
+
+    async def get_pubsub_message(self):
+        channel, message = await self._message_queue().get()
+        return PubSubMsg(message=message, channel=channel, pattern=None)
+
+    def _message_queue(self):
+        # Created lazily so it belongs to the app's event loop.
+        if self.messages is None:
+            self.messages = asyncio.Queue()
+        return self.messages
+
     async def close(self):
         pass
 
@@ -102,6 +163,107 @@ def test_job_result_websocket(client, fake_valkey_client):
         assert data["job_result"] == job_result
 
 
+def test_job_result_websocket_pushed_result(client, fake_valkey_client):
+    """
+    A result published after the websocket started waiting is pushed to
+    the client without being read from the cache.
+    """
+    job_id = "pushedjob"
+    job_result = {
+        "status": "completed",
+        "output": {"passed": True, "is_submit": False, "job_id": job_id},
+    }
+
+    with client.websocket_connect(f"/ws/job-status/{job_id}") as websocket:
+        # Wait until the endpoint has registered for the job's result.
+        deadline = time.time() + 5
+        while not app_module.job_notifier.waiting(job_id):
+            assert time.time() < deadline, "websocket never subscribed"
+            time.sleep(0.01)
+
+        message = json.dumps({"job_id": job_id, "result": job_result})
+        client.portal.call(fake_valkey_client.publish, message, "job-results")
+        data = websocket.receive_json()
+        assert data["status"] == "done"
+        assert data["job_result"] == job_result
+
+    assert f"job:{job_id}" not in fake_valkey_client.store
+    assert app_module.job_notifier.waiting(job_id) == 0
+
+
+def test_job_progress_relayed_before_result(client, fake_valkey_client):
+    """
+    Progress stored before the websocket connected is replayed, published
+    progress is relayed live (each case once), then the result is sent.
+    """
+    job_id = "progressjob"
+    first = {"case": 0, "total": 3, "passed": True, "wall_ms": 0.1}
+    second = {"case": 1, "total": 3, "passed": False, "wall_ms": 2.5}
+    fake_valkey_client.streams[f"job_progress:{job_id}"] = [
+        [("event", json.dumps(first))]
+    ]
+    job_result = {"status": "completed", "output": {"passed": False}}
+
+    with client.websocket_connect(f"/ws/job-status/{job_id}") as websocket:
+        assert websocket.receive_json() == {
+            "status": "progress",
+            "progress": first,
+        }
+        for event in (first, second):
+            message = json.dumps({"job_id": job_id, "progress": event})
+            client.portal.call(
+                fake_valkey_client.publish, message, "job-progress"
+            )
+        assert websocket.receive_json() == {
+            "status": "progress",
+            "progress": second,
+        }
+
+        message = json.dumps({"job_id": job_id, "result": job_result})
+        client.portal.call(fake_valkey_client.publish, message, "job-results")
+        data = websocket.receive_json()
+        assert data == {"status": "done", "job_result": job_result}
+
+    assert app_module.job_notifier.waiting(job_id) == 0
+
+
+def test_compressed_compact_result_is_expanded(client, fake_valkey_client):
+    """
+    A compressed, compact result is decoded and sent with the per-case
+    fields the frontend reads.
+    """
+    job_id = "compactjob"
+    output = {
+        "format": "compact-v1",
+        "passed": False,
+        "case_count": 10,
+        "failed_count": 1,
+        # Cases 0-8 pass, case 9 fails
+        "pass_bitmap": base64.b64encode(bytes([0xFF, 0x01])).decode(),
+        "cases": {
+            "0": {"input": [1], "expected": 1, "actual": 1},
+            "9": {"input": [9], "expected": 9, "actual": 8},
+        },
+        "error": None,
+        "console": None,
+    }
+    stored = "zlib:" + base64.b64encode(
+        zlib.compress(
+            json.dumps({"status": "completed", "output": output}).encode()
+        )
+    ).decode("ascii")
+    asyncio.run(fake_valkey_client.set(f"job:{job_id}", stored))
+
+    with client.websocket_connect(f"/ws/job-status/{job_id}") as websocket:
+        data = websocket.receive_json()
+
+    result = data["job_result"]["output"]
+    assert data["status"] == "done"
+    assert result["passed_per_case"] == [True] * 9 + [False]
+    assert result["actual_outputs"] == [1] + [None] * 8 + [8]
+    assert result["cases"] == output["cases"]
+
+
 # --- Test for Timeout Scenario ---
 def test_job_result_websocket_timeout(client, fake_valkey_client, monkeypatch):
     """
@@ -148,3 +310,200 @@ def test_job_result_websocket_timeout(client, fake_valkey_client, monkeypatch):
         assert data["status"] == "timeout"
         # Check that the error message indicates a timeout.
         assert "timed out after" in data["error"]
+
+
+def test_leaderboard_reads_sorted_sets(client, fake_valkey_client):
+    """
+    The leaderboard is read from the per-difficulty sorted sets, with
+    display names from the names hash.
+    """
+    fake_valkey_client.sorted_sets = {
+        "leaderboard:{introductory}": {"u1": 3, "u2": 7, "u3": 1},
+        "leaderboard:{interview}": {"u1": 2},
+    }
+    fake_valkey_client.hashes = {
+        "leaderboard:names": {"u1": "Alice", "u2": "Bob"}
+    }
+
+    response = client.get("/api/leaderboard")
+    assert response.status_code == 200
+    assert response.json() == {
+        "easy": [
+            {"rank": 1, "name": "Bob", "score": 7},
+            {"rank": 2, "name": "Alice", "score": 3},
+            {"rank": 3, "name": "Unknown", "score": 1},
+        ],
+        "hard": [{"rank": 1, "name": "Alice", "score": 2}],
+    }
+
+
+def test_leaderboard_reads_the_top_of_each_set(client, fake_valkey_client):
+    """Only the highest LEADERBOARD_SIZE scores are read from a set."""
+    fake_valkey_client.sorted_sets = {
+        "leaderboard:{introductory}": {
+            f"u{score}": score for score in [4, 9, 1, 7, 3, 8, 2]
+        },
+    }
+    fake_valkey_client.hashes = {
+        "leaderboard:names": {
+            f"u{score}": f"User {score}" for score in range(10)
+        }
+    }
+
+    response = client.get("/api/leaderboard")
+    assert response.status_code == 200
+    assert [entry["score"] for entry in response.json()["easy"]] == [
+        9,
+        8,
+        7,
+        4,
+        3,
+    ]
+
+
+def test_leaderboard_falls_back_to_blob(client, fake_valkey_client):
+    """Before the sorted sets are built, the cached blob is served."""
+    fake_valkey_client.store["active_leaderboard"] = json.dumps(
+        {"easy": [{"name": "Carol", "score": 4}], "hard": []}
+    )
+
+    response = client.get("/api/leaderboard")
+    assert response.status_code == 200
+    assert response.json() == {
+        "easy": [{"rank": 1, "name": "Carol", "score": 4}],
+        "hard": [],
+    }
+
+
+def test_submissions_share_pooled_http_client(client, monkeypatch):
+    """
+    Leaderboard calls go through the one client created at startup, and
+    its usage shows up in the pool statistics.
+    """
+    monkeypatch.setattr(app_module, "LEADERBOARD_QUEUE_URL", None)
+    monkeypatch.setattr(
+        app_module, "LEADERBOARD_API_URL", "https://leaderboard.test"
+    )
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"message": "ok"})
+
+    pooled = app_module.http_client
+    pooled.transport.transport = httpx.MockTransport(handler)
+    job_result = {
+        "output": {
+            "user_id": "user-1",
+            "problem_id": 7,
+            "difficulty": "introductory",
+        }
+    }
+    for _ in range(2):
+        result = client.portal.call(app_module.handle_is_submit, job_result)
+        assert result == {"message": "ok"}
+
+    assert len(requests) == 2
+    assert app_module.get_http_client() is pooled.client
+    stats = client.get("/api/http-client-stats").json()
+    assert stats["requests_sent"] == 2
+    assert stats["responses_received"] == 2
+    assert stats["max_connections"] == pooled.limits.max_connections
+
+
+def test_result_cache_stats(client, fake_valkey_client):
+    """The evaluator's result cache counters are reported with a hit rate."""
+    fake_valkey_client.hashes["result_cache:stats"] = {"hits": 3, "misses": 1}
+
+    response = client.get("/api/result-cache-stats")
+    assert response.status_code == 200
+    assert response.json() == {"hits": 3, "misses": 1, "hit_rate": 0.75}
+
+
+def test_metrics_endpoint(client, fake_valkey_client):
+    """Route latencies, job_result lookups and WebSocket outcomes are exported."""
+    from metrics import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    done = sample("job_status_outcomes_total", outcome="done")
+    hits = sample("cache_lookups_total", cache="job_result", outcome="hit")
+    requests = sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/api/result-cache-stats",
+        status="200",
+    )
+
+    fake_valkey_client.hashes["result_cache:stats"] = {"hits": 1}
+    client.get("/api/result-cache-stats")
+    fake_valkey_client.store["job:metricsjob"] = json.dumps(
+        {"status": "completed", "output": {"passed": True}}
+    )
+    with client.websocket_connect("/ws/job-status/metricsjob") as websocket:
+        assert websocket.receive_json()["status"] == "done"
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "open_websockets" in response.text
+    assert sample("job_status_outcomes_total", outcome="done") == done + 1
+    assert (
+        sample("cache_lookups_total", cache="job_result", outcome="hit")
+        == hits + 1
+    )
+    assert (
+        sample(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route="/api/result-cache-stats",
+            status="200",
+        )
+        == requests + 1
+    )
+    assert sample("open_websockets", route="/ws/job-status/{job_id}") == 0
+
+
+def test_job_trace_stage_breakdown(client, fake_valkey_client):
+    """The evaluator's trace comes back with delivered_at and stages_ms."""
+    from metrics import REGISTRY
+
+    enqueued_at = time.time() - 2
+    trace = {
+        "trace_id": "abc",
+        "enqueued_at": enqueued_at,
+        "dequeued_at": enqueued_at + 0.5,
+        "grading_started_at": enqueued_at + 0.5,
+        "validated_at": enqueued_at + 0.51,
+        "sandbox_started_at": enqueued_at + 0.6,
+        "cases_finished_at": enqueued_at + 1.6,
+        "graded_at": enqueued_at + 1.6,
+        "stored_at": enqueued_at + 1.7,
+    }
+    fake_valkey_client.store["job:tracedjob"] = json.dumps(
+        {"status": "completed", "output": {"passed": True, "trace": trace}}
+    )
+    before = (
+        REGISTRY.get_sample_value(
+            "job_stage_duration_seconds_count", {"stage": "cases"}
+        )
+        or 0
+    )
+
+    with client.websocket_connect("/ws/job-status/tracedjob") as websocket:
+        data = websocket.receive_json()
+
+    delivered = data["job_result"]["output"]["trace"]
+    assert delivered["delivered_at"] >= trace["stored_at"]
+    stages = delivered["stages_ms"]
+    assert stages["queue"] == pytest.approx(500, abs=1)
+    assert stages["cases"] == pytest.approx(1000, abs=1)
+    assert stages["total"] >= 2000
+    assert "stored_at" in delivered and "deliver" in stages
+    assert (
+        REGISTRY.get_sample_value(
+            "job_stage_duration_seconds_count", {"stage": "cases"}
+        )
+        == before + 1
+    )
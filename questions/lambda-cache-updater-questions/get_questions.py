@@ -1,9 +1,29 @@
+import asyncio
 import httpx
 import datetime
+import json
 import os
+import time
 
 BASE_URL = os.getenv("QUESTIONS_API_URL")
 
+# Cache key -> difficulty sent to the questions API
+DIFFICULTY_TIERS = {"easy": "introductory", "hard": "interview"}
+REQUEST_TIMEOUT_SECONDS = 72.0
+# Cap on one tier's attempts and backoff together, so retries cannot run
+# past the Lambda timeout; the single request used to get 72 s as well
+FETCH_DEADLINE_SECONDS = float(
+    os.getenv("QUESTIONS_FETCH_DEADLINE_SECONDS", "72")
+)
+# Attempts per tier; waits RETRY_BACKOFF_SECONDS, then twice that, ...
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.5
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+# Test cases included in the public view of a question
+PUBLIC_TEST_CASES = 3
+
 
 class WeeklyQuestionsError(Exception):
     """Custom exception for errors fetching weekly questions."""
@@ -11,52 +31,101 @@ class WeeklyQuestionsError(Exception):
     pass
 
 
-async def get_questions(
-    count=5,
-    difficulty_easy="introductory",
-    difficulty_hard="interview",
-):
-    print("Entering get_questions()...")
+async def get_with_retries(client, level, url):
     """
-    Fetches two sets of questions (easy & hard) from the external API.
-    Raises a WeeklyQuestionsError for network, status, or JSON errors.
-    Returns a dict with keys 'easy' and 'hard' containing lists of questions.
+    GETs url, retrying network errors and transient statuses with
+    exponential backoff. Returns the last response.
     """
-    query_string = f"/random-questions?count={count}&difficulty="
-    url_easy = f"{BASE_URL}{query_string}{difficulty_easy}"
-    url_hard = f"{BASE_URL}{query_string}{difficulty_hard}"
-    print("Constructed URLs for easy and hard calls")
+    for attempt in range(RETRY_ATTEMPTS):
+        last_attempt = attempt == RETRY_ATTEMPTS - 1
+        try:
+            response = await client.get(url)
+        except httpx.RequestError as exc:
+            if last_attempt:
+                raise WeeklyQuestionsError(
+                    f"Failed to contact external API: {str(exc)}"
+                ) from exc
+            print(f"Request for {level} questions failed: {exc}")
+        else:
+            if (
+                response.status_code not in RETRYABLE_STATUS_CODES
+                or last_attempt
+            ):
+                return response
+            print(
+                f"Retrying {level} questions after status "
+                f"{response.status_code}"
+            )
+        await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+async def fetch_tier(client, level, url, latencies):
+    """
+    Fetches one difficulty tier, with retries, within FETCH_DEADLINE_SECONDS.
+    Records the time spent, retries included, in latencies[level]
+    (milliseconds).
+    """
+    start = time.perf_counter()
     try:
-        print("Enterying try block to make call...")
-        async with httpx.AsyncClient(timeout=72.0) as client:
-            print("Making calls")
-            easy_response = await client.get(url_easy)
-            print("First call made")
-            hard_response = await client.get(url_hard)
-            print("Second call made")
-    except httpx.RequestError as exc:
+        response = await asyncio.wait_for(
+            get_with_retries(client, level, url), FETCH_DEADLINE_SECONDS
+        )
+    except asyncio.TimeoutError as exc:
         raise WeeklyQuestionsError(
-            f"Failed to contact external API: {str(exc)}"
+            f"Timed out fetching {level} questions after "
+            f"{FETCH_DEADLINE_SECONDS:g} seconds"
         ) from exc
+    finally:
+        latencies[level] = round((time.perf_counter() - start) * 1000, 1)
 
-    if easy_response.status_code != 200:
-        raise WeeklyQuestionsError(
-            f"Error fetching easy questions. Status code: {easy_response.status_code}"
-        )
-    if hard_response.status_code != 200:
+    if response.status_code != 200:
         raise WeeklyQuestionsError(
-            f"Error fetching hard questions. Status code: {hard_response.status_code}"
+            f"Error fetching {level} questions. Status code: {response.status_code}"
         )
-
     try:
-        easy_questions = easy_response.json()
-        hard_questions = hard_response.json()
+        return response.json()
     except ValueError as exc:
         raise WeeklyQuestionsError(
             f"Invalid JSON response from external API: {str(exc)}"
         ) from exc
 
-    return {"easy": easy_questions, "hard": hard_questions}
+
+async def get_questions(count=5, tiers=None, latencies=None):
+    print("Entering get_questions()...")
+    """
+    Fetches a set of questions for every difficulty tier (by default easy &
+    hard) from the external API. All tiers are requested at the same time.
+    Raises a WeeklyQuestionsError for network, status, or JSON errors.
+    Returns a dict keyed by tier, e.g. 'easy' and 'hard', containing lists of
+    questions. Per-tier latencies are written to the latencies dict if given.
+    """
+    if tiers is None:
+        tiers = DIFFICULTY_TIERS
+    if latencies is None:
+        latencies = {}
+
+    query_string = f"/random-questions?count={count}&difficulty="
+    urls = {
+        level: f"{BASE_URL}{query_string}{difficulty}"
+        for level, difficulty in tiers.items()
+    }
+    print(f"Constructed URLs for {', '.join(urls)} calls")
+
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT_SECONDS) as client:
+        results = await asyncio.gather(
+            *(
+                fetch_tier(client, level, url, latencies)
+                for level, url in urls.items()
+            ),
+            return_exceptions=True,
+        )
+    print(f"Fetched questions in {latencies} ms")
+
+    # Report the first failing tier in order, not whichever failed first.
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return dict(zip(urls, results))
 
 
 def get_day_start(reference=None):
@@ -102,3 +171,79 @@ def format_questions_data(questions_data):
     }
 
     return cache_payload
+
+
+def section_questions(section):
+    """Questions of one difficulty, whether wrapped in {"questions": [...]}."""
+    if isinstance(section, dict):
+        return section.get("questions", [])
+    return section or []
+
+
+def format_questions_meta(cache_payload):
+    """
+    Builds the small 'active_questions_meta' record stored next to the
+    cached questions. Readers compare its version to decide whether the
+    full 'active_questions' payload needs to be fetched again.
+    """
+    questions = cache_payload["questions"]
+    return {
+        "version": datetime.datetime.utcnow().isoformat(),
+        "timestamp": cache_payload["timestamp"],
+        "days": min(
+            len(section_questions(questions.get("easy"))),
+            len(section_questions(questions.get("hard"))),
+        ),
+    }
+
+
+def daily_question_key(date, level, view):
+    """
+    Key of one per-day projection. The date is a hash tag so one day's keys
+    can be read with a single MGET.
+    """
+    return f"daily_question:{{{date}}}:{level}:{view}"
+
+
+def grading_view(question):
+    """
+    The question without its solutions and with 'inputs'/'outputs' parsed
+    from their stringified form into lists.
+    """
+    view = {k: v for k, v in question.items() if k != "solutions"}
+    for key in ["inputs", "outputs"]:
+        if isinstance(view.get(key), str):
+            try:
+                view[key] = json.loads(view[key])
+            except json.JSONDecodeError:
+                pass  # Leave it unchanged if it fails
+    return view
+
+
+def format_daily_question_views(cache_payload):
+    """
+    Splits the cached questions into compact per-day, per-difficulty
+    projections so readers fetch only the day they serve:
+
+      daily_question:{<date>}:<easy|hard>:public  first test cases, for the UI
+      daily_question:{<date>}:<easy|hard>:full    every test case, for grading
+
+    Returns a dict of key -> value (not yet JSON-encoded).
+    """
+    day_start = datetime.datetime.fromisoformat(cache_payload["timestamp"])
+    views = {}
+    for level in ("easy", "hard"):
+        questions = section_questions(cache_payload["questions"].get(level))
+        for day_index, question in enumerate(questions):
+            date = (day_start + datetime.timedelta(days=day_index)).date()
+            full = grading_view(question)
+            public = dict(full)
+            if isinstance(full.get("inputs"), list):
+                public["inputs"] = full["inputs"][:PUBLIC_TEST_CASES]
+            if isinstance(full.get("outputs"), list):
+                public["outputs"] = full["outputs"][:PUBLIC_TEST_CASES]
+
+            date_str = date.isoformat()
+            views[daily_question_key(date_str, level, "full")] = full
+            views[daily_question_key(date_str, level, "public")] = public
+    return views
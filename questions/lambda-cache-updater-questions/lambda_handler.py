@@ -3,6 +3,8 @@ import json
 import asyncio
 from dotenv import load_dotenv
 from glide import (
+    ExpirySet,
+    ExpiryType,
     GlideClient,
     GlideClientConfiguration,
     NodeAddress,
@@ -11,7 +13,9 @@ from glide import (
 )
 from get_questions import (
     get_questions,
+    format_daily_question_views,
     format_questions_data,
+    format_questions_meta,
 )  # Note: ensure function names match
 
 # Load environment variables from .env file if needed
@@ -60,9 +64,10 @@ async def async_handler(event, context):
         }
 
     # Try to get a new set of (5) questions.
+    latencies = {}
     try:
         # Note: ensure you're calling the correct function; here we use get_questions.
-        questions = await get_questions(count=5)
+        questions = await get_questions(count=5, latencies=latencies)
     except Exception as e:
         print(f"Error getting weekly questions: {e}")
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
@@ -70,17 +75,36 @@ async def async_handler(event, context):
     # Format the data (e.g., add a timestamp, etc.)
     cache_payload = format_questions_data(questions)
 
-    # Update the cache with the new data.
+    # Update the cache with the new data. The meta key is written last so
+    # readers that see a new version also see the new questions.
     key = "active_questions"
+    meta_key = "active_questions_meta"
+    meta = format_questions_meta(cache_payload)
+    # Per-day keys expire a day after the last day they cover.
+    views_expiry = ExpirySet(ExpiryType.SEC, (meta["days"] + 1) * 86400)
     try:
+        await asyncio.gather(
+            *(
+                valkey_client.set(
+                    view_key, json.dumps(view), expiry=views_expiry
+                )
+                for view_key, view in format_daily_question_views(
+                    cache_payload
+                ).items()
+            )
+        )
         await valkey_client.set(key, json.dumps(cache_payload))
+        await valkey_client.set(meta_key, json.dumps(meta))
     except Exception as e:
         return {
             "statusCode": 500,
             "body": json.dumps({"error": f"Cache update failed: {str(e)}"}),
         }
 
-    return {"statusCode": 200, "body": json.dumps(cache_payload)}
+    return {
+        "statusCode": 200,
+        "body": json.dumps(dict(cache_payload, fetch_latency_ms=latencies)),
+    }
 
 
 def lambda_handler(event, context):
@@ -18,7 +18,7 @@ class FakeValkeyClient:
             return value.encode("utf-8") if isinstance(value, str) else value
         return None
 
-    async def set(self, key, value):
+    async def set(self, key, value, expiry=None):
         if isinstance(value, bytes):
             value = value.decode("utf-8")
         self.store[key] = value
@@ -76,6 +76,7 @@ async def test_async_handler_success(mocker, fake_valkey_client):
     result = await async_handler({}, {})
     assert result["statusCode"] == 200
     body = json.loads(result["body"])
+    assert body.pop("fetch_latency_ms") == {}
     assert body == fake_payload
 
     # Verify that the fake client's set method stored the payload.
@@ -83,6 +84,17 @@ async def test_async_handler_success(mocker, fake_valkey_client):
     # stored is bytes; decode before comparing.
     assert stored.decode("utf-8") == json.dumps(fake_payload)
 
+    # The meta record lets readers detect the new version cheaply.
+    meta = json.loads(await fake_valkey_client.get("active_questions_meta"))
+    assert meta["timestamp"] == fake_payload["timestamp"]
+    assert meta["version"]
+
+    # Each day's question is also stored on its own.
+    stored_view = await fake_valkey_client.get(
+        "daily_question:{2025-03-02}:easy:public"
+    )
+    assert json.loads(stored_view) == {"id": 1, "question": "Easy Q1"}
+
 
 @pytest.mark.asyncio
 async def test_async_handler_get_questions_failure(mocker, fake_valkey_client):
@@ -1,12 +1,17 @@
+import asyncio
+import json
 import pytest
 import datetime
+import time
 import httpx
 from unittest.mock import patch, MagicMock, AsyncMock
 
 from get_questions import (
     get_questions,
     get_day_start,
+    format_daily_question_views,
     format_questions_data,
+    format_questions_meta,
     WeeklyQuestionsError,
 )
 
@@ -162,6 +167,95 @@ async def test_get_questions_invalid_json(mocker):
     )
 
 
+@pytest.mark.asyncio
+async def test_get_questions_fetches_tiers_concurrently(mocker):
+    """
+    Test that get_questions() requests every tier at once, so it takes about
+    as long as the slowest call, and reports per-tier latency.
+    """
+    delay = 0.2
+
+    async def slow_get(url):
+        await asyncio.sleep(delay)
+        response = MagicMock(status_code=200)
+        response.json.return_value = [{"url": url}]
+        return response
+
+    mock_async_client = AsyncMock()
+    mock_async_client.__aenter__.return_value = mock_async_client
+    mock_async_client.get.side_effect = slow_get
+    mocker.patch("httpx.AsyncClient", return_value=mock_async_client)
+
+    latencies = {}
+    tiers = {
+        "easy": "introductory",
+        "medium": "interview",
+        "hard": "competition",
+    }
+    start = time.perf_counter()
+    result = await get_questions(tiers=tiers, latencies=latencies)
+    elapsed = time.perf_counter() - start
+
+    assert list(result) == ["easy", "medium", "hard"]
+    assert result["hard"][0]["url"].endswith("difficulty=competition")
+    assert elapsed < delay * 2
+    assert set(latencies) == set(tiers)
+    assert all(ms >= delay * 1000 * 0.9 for ms in latencies.values())
+
+
+@pytest.mark.asyncio
+async def test_get_questions_retries_transient_errors(mocker):
+    """
+    Test that get_questions() retries a tier after a network error or a 503
+    and succeeds once the API recovers.
+    """
+    mocker.patch("get_questions.RETRY_BACKOFF_SECONDS", 0)
+
+    unavailable = MagicMock(status_code=503)
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = [{"id": 1}]
+
+    mock_async_client = AsyncMock()
+    mock_async_client.__aenter__.return_value = mock_async_client
+    mock_async_client.get.side_effect = [
+        httpx.RequestError("Connection reset"),
+        unavailable,
+        ok,
+    ]
+    mocker.patch("httpx.AsyncClient", return_value=mock_async_client)
+
+    result = await get_questions(tiers={"easy": "introductory"})
+
+    assert result == {"easy": [{"id": 1}]}
+    assert mock_async_client.get.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_get_questions_stops_retrying_at_the_deadline(mocker):
+    """
+    Test that get_questions() gives up on a tier once FETCH_DEADLINE_SECONDS
+    have passed, however many attempts are left.
+    """
+    mocker.patch("get_questions.RETRY_BACKOFF_SECONDS", 0)
+    mocker.patch("get_questions.FETCH_DEADLINE_SECONDS", 0.05)
+
+    async def slow_get(url):
+        await asyncio.sleep(1)
+
+    mock_async_client = AsyncMock()
+    mock_async_client.__aenter__.return_value = mock_async_client
+    mock_async_client.get.side_effect = slow_get
+    mocker.patch("httpx.AsyncClient", return_value=mock_async_client)
+
+    latencies = {}
+    with pytest.raises(WeeklyQuestionsError, match="Timed out"):
+        await get_questions(
+            tiers={"easy": "introductory"}, latencies=latencies
+        )
+    assert latencies["easy"] < 500
+    assert mock_async_client.get.call_count == 1
+
+
 def test_get_day_start_no_reference():
     """
     Test that get_day_start() returns today's 00:00 UTC if no reference is provided.
@@ -207,3 +301,60 @@ def test_format_questions_data():
         assert "questions" in result
         assert result["questions"]["easy"] == questions_data["easy"]
         assert result["questions"]["hard"] == questions_data["hard"]
+
+
+def test_format_questions_meta():
+    """
+    Test that format_questions_meta() records the payload timestamp, the
+    number of days covered and a fresh version string.
+    """
+    cache_payload = {
+        "timestamp": "2025-03-02T00:00:00",
+        "questions": {
+            "easy": {"questions": [{"id": 1}, {"id": 2}]},
+            "hard": {"questions": [{"id": 3}, {"id": 4}]},
+        },
+    }
+
+    meta = format_questions_meta(cache_payload)
+    assert meta["timestamp"] == "2025-03-02T00:00:00"
+    assert meta["days"] == 2
+    assert meta["version"]
+
+
+def test_format_daily_question_views():
+    """
+    Test that format_daily_question_views() writes a public and a full view
+    per day and difficulty, without solutions and with parsed test cases.
+    """
+    question = {
+        "id": 1,
+        "solutions": "secret",
+        "inputs": json.dumps([[1], [2], [3], [4]]),
+        "outputs": json.dumps([1, 2, 3, 4]),
+    }
+    cache_payload = {
+        "timestamp": "2025-03-02T00:00:00",
+        "questions": {
+            "easy": {"questions": [question, dict(question, id=2)]},
+            "hard": {"questions": [dict(question, id=3)]},
+        },
+    }
+
+    views = format_daily_question_views(cache_payload)
+
+    assert sorted(views) == [
+        "daily_question:{2025-03-02}:easy:full",
+        "daily_question:{2025-03-02}:easy:public",
+        "daily_question:{2025-03-02}:hard:full",
+        "daily_question:{2025-03-02}:hard:public",
+        "daily_question:{2025-03-03}:easy:full",
+        "daily_question:{2025-03-03}:easy:public",
+    ]
+    public = views["daily_question:{2025-03-02}:easy:public"]
+    full = views["daily_question:{2025-03-02}:easy:full"]
+    assert public["inputs"] == [[1], [2], [3]]
+    assert public["outputs"] == [1, 2, 3]
+    assert full["inputs"] == [[1], [2], [3], [4]]
+    assert "solutions" not in public and "solutions" not in full
+    assert views["daily_question:{2025-03-03}:easy:full"]["id"] == 2
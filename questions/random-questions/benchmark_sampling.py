@@ -0,0 +1,153 @@
+"""
+Compares the old and new ways of picking random questions against an
+in-memory fake of a large questions_generated table:
+
+  full rows: select("*") every unseen row, random.sample in Python (old)
+  ids only:  select("id") the unseen rows, fetch full rows for the sample
+
+Run with: python benchmark_sampling.py [rows] [count]
+"""
+
+import json
+import random
+import sys
+import time
+import types
+
+
+class FakeResponse:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def dict(self):
+        return {"data": self.rows}
+
+
+class FakeQuery:
+    """Just enough of the postgrest query builder for randomq."""
+
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = columns
+        self.filters = []
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def execute(self):
+        rows = [
+            row
+            for row in self.table.rows
+            if all(check(row) for check in self.filters)
+        ]
+        if self.columns != "*":
+            names = self.columns.split(",")
+            rows = [{name: row[name] for name in names} for row in rows]
+        else:
+            rows = [dict(row) for row in rows]
+        # What would have crossed the network as JSON
+        self.table.bytes_sent += len(json.dumps(rows))
+        self.table.queries += 1
+        return FakeResponse(rows)
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+        self.bytes_sent = 0
+        self.queries = 0
+
+    def select(self, columns):
+        return FakeQuery(self, columns)
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.questions = FakeTable(rows)
+
+    def table(self, name):
+        return self.questions
+
+
+def make_rows(n, test_cases=50):
+    """Rows shaped like questions_generated, with bulky generated cases."""
+    rows = []
+    for i in range(n):
+        inputs = [[random.randint(0, 10**6) for _ in range(20)]] * test_cases
+        rows.append(
+            {
+                "id": i + 1,
+                "difficulty": "introductory" if i % 2 else "interview",
+                "seen": i % 5 == 0,
+                "question": f"Question {i} " + "lorem ipsum " * 40,
+                "starter_code": "class Solution:\n    def f(self, x):\n",
+                "solutions": json.dumps(["def f(x):\n    return x\n"] * 5),
+                "inputs": json.dumps(inputs[:3]),
+                "outputs": json.dumps([0] * 3),
+                "generated_inputs": json.dumps(inputs),
+                "generated_outputs": json.dumps([0] * test_cases),
+            }
+        )
+    return rows
+
+
+def sample_full_rows(supabase, count, difficulty):
+    """The pre-change strategy, kept here only for comparison."""
+    response = (
+        supabase.table("questions_generated")
+        .select("*")
+        .eq("difficulty", difficulty)
+        .eq("seen", False)
+        .execute()
+    )
+    return random.sample(response.dict()["data"], count)
+
+
+def benchmark(rows=20000, count=7, repeats=5):
+    fake = FakeSupabase(make_rows(rows))
+    # randomq imports the real client at import time; hand it the fake.
+    client_module = types.ModuleType("db_client.db_client")
+    client_module.supabase = fake
+    sys.modules.setdefault("db_client", types.ModuleType("db_client"))
+    sys.modules["db_client.db_client"] = client_module
+    from randomq import generate_random_questions
+
+    strategies = {
+        "full rows": lambda: sample_full_rows(fake, count, "introductory"),
+        "ids only": lambda: generate_random_questions(
+            count=count, difficulty="introductory"
+        ),
+    }
+    results = {}
+    for name, run in strategies.items():
+        fake.questions.bytes_sent = 0
+        fake.questions.queries = 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            assert len(run()) == count
+        elapsed = (time.perf_counter() - start) / repeats
+        results[name] = {
+            "ms": elapsed * 1000,
+            "bytes": fake.questions.bytes_sent / repeats,
+            "queries": fake.questions.queries / repeats,
+        }
+
+    print(f"{rows} rows, sampling {count} questions:")
+    for name, stats in results.items():
+        print(
+            f"  {name}: {stats['ms']:.1f} ms, "
+            f"{stats['bytes'] / 1024:.0f} KiB transferred "
+            f"in {stats['queries']:.0f} queries"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    benchmark(*args)
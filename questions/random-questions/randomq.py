@@ -2,18 +2,12 @@ import random
 from db_client.db_client import supabase
 
 
-def generate_random_questions(
-    count=7, difficulty="introductory", source="leetcode"
-):
-    print(
-        (
-            f"DEBUG: generate_random_questions called with count={count}, "
-            f"difficulty={difficulty}"
-        )
-    )
-
-    # Build the query for questions that haven't been seen
-    query = supabase.table("questions_generated").select("*")
+def fetch_unseen_ids(difficulty):
+    """
+    Returns the ids of the unseen questions for a difficulty. Only the id
+    column is transferred, whatever the size of the rows.
+    """
+    query = supabase.table("questions_generated").select("id")
     if difficulty:
         query = query.eq("difficulty", difficulty)
     # if source:
@@ -21,67 +15,72 @@ def generate_random_questions(
     query = query.eq("seen", False)
 
     response = query.execute()
-    print("DEBUG: supabase response =", response)
     data = response.dict()
     if data.get("error"):
         error_msg = data["error"].get("message", "Unknown error")
         raise RuntimeError(f"Error fetching questions: {error_msg}")
+    return [row["id"] for row in data.get("data", [])]
+
+
+def fetch_questions_by_id(ids):
+    """Fetches the full rows for the given ids, in the order of ids."""
+    response = (
+        supabase.table("questions_generated").select("*").in_("id", ids)
+    ).execute()
+    data = response.dict()
+    if data.get("error"):
+        error_msg = data["error"].get("message", "Unknown error")
+        raise RuntimeError(f"Error fetching chosen questions: {error_msg}")
+    rows = {row["id"]: row for row in data.get("data", [])}
+    return [rows[question_id] for question_id in ids if question_id in rows]
+
 
-    questions = data.get("data", [])
+def generate_random_questions(
+    count=7, difficulty="introductory", source="leetcode"
+):
+    print(
+        (
+            f"DEBUG: generate_random_questions called with count={count}, "
+            f"difficulty={difficulty}"
+        )
+    )
+
+    # Sample among the ids of questions that haven't been seen, then
+    # download full rows (solutions, generated test cases) only for those.
+    candidate_ids = fetch_unseen_ids(difficulty)
 
     # If there are not enough unseen questions, reset the seen flag and update id for all rows
-    if len(questions) < count:
+    if len(candidate_ids) < count:
         print(
             (
                 "DEBUG: Not enough unseen questions; "
                 "resetting seen status and incrementing id for all rows."
             )
         )
-        # Get all questions (ignoring seen flag)
-        all_response = (
-            supabase.table("questions_generated").select("*").execute()
+        # One bulk update in the database (sql/reset_seen_questions.sql)
+        reset_response = supabase.rpc("reset_seen_questions").execute()
+        reset_data = reset_response.dict()
+        if reset_data.get("error"):
+            error_msg = reset_data["error"].get("message", "Unknown error")
+            raise RuntimeError(f"Error resetting seen questions: {error_msg}")
+        print(
+            f"DEBUG: Reset {reset_data.get('data')} questions, "
+            "shifted their ids by 1000 and set seen to False."
         )
-        all_data = all_response.dict()
-        if all_data.get("error"):
-            error_msg = all_data["error"].get("message", "Unknown error")
-            raise RuntimeError(f"Error fetching all questions: {error_msg}")
-        all_questions = all_data.get("data", [])
-
-        # For each question, update: set seen=False and add 1000 to its id
-        for q in all_questions:
-            new_id = q["id"] + 1000
-            _ = (
-                supabase.table("questions_generated")
-                .update({"seen": False, "id": new_id})
-                .eq("id", q["id"])
-                .execute()
-            )
-            print(
-                f"DEBUG: Updated question id {q['id']} to new id {new_id}, set seen to False."
-            )
 
         # Re-run the query to get unseen questions (with filters)
-        query = supabase.table("questions_generated").select("*")
-        if difficulty:
-            query = query.eq("difficulty", difficulty)
-        # if source:
-        #     query = query.eq("source", source)
-        query = query.eq("seen", False)
-        response = query.execute()
-        data = response.dict()
-        if data.get("error"):
-            error_msg = data["error"].get("message", "Unknown error")
-            raise RuntimeError(
-                f"Error fetching questions after update: {error_msg}"
-            )
-        questions = data.get("data", [])
-        if len(questions) < count:
+        candidate_ids = fetch_unseen_ids(difficulty)
+        if len(candidate_ids) < count:
             raise ValueError(
                 "Still not enough questions available even after resetting seen status."
             )
 
     # Randomly sample the desired count of questions
-    result = random.sample(questions, count)
+    result = fetch_questions_by_id(random.sample(candidate_ids, count))
+    if len(result) < count:
+        raise RuntimeError(
+            "Some sampled questions disappeared before they were fetched."
+        )
 
     # Drop the columns "inpputs" and "outputs" (if present)
     # and rename "generated_inputs" to "inputs" and "generated_outputs" to "outputs"
@@ -0,0 +1,19 @@
+-- Marks every question unseen and shifts its id by 1000, as one bulk
+-- operation instead of one request per row. randomq.py calls it with
+-- supabase.rpc("reset_seen_questions") when unseen questions run out.
+-- Returns the number of questions reset.
+create or replace function reset_seen_questions()
+returns integer
+language plpgsql
+as $$
+declare
+    reset_count integer;
+begin
+    -- Negate the ids first, so no shifted id can collide with one that has
+    -- not been shifted yet (id 5 -> 1005 while 1005 still exists).
+    update questions_generated set id = -id where id > 0;
+    update questions_generated set seen = false, id = 1000 - id where id < 0;
+    get diagnostics reset_count = row_count;
+    return reset_count;
+end;
+$$;
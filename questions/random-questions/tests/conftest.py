@@ -0,0 +1,110 @@
+import os
+import re
+import sqlite3
+import sys
+import types
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_DIR = os.path.join(APP_DIR, "sql")
+sys.path.insert(0, APP_DIR)
+
+
+def load_function_statements(name):
+    """The UPDATE statements in the body of sql/<name>.sql."""
+    with open(os.path.join(SQL_DIR, f"{name}.sql")) as f:
+        sql = f.read()
+    body = sql.split("begin", 1)[1]
+    return re.findall(r"^\s*(update\b.*?;)", body, re.M | re.S | re.I)
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def dict(self):
+        return {"data": self.data}
+
+
+class SqliteQuery:
+    """Just enough of the postgrest query builder, run against sqlite."""
+
+    def __init__(self, db, table, columns):
+        self.db = db
+        self.table = table
+        self.columns = columns
+        self.where = []
+        self.params = []
+
+    def eq(self, column, value):
+        self.where.append(f"{column} = ?")
+        self.params.append(value)
+        return self
+
+    def in_(self, column, values):
+        self.where.append(f"{column} IN ({', '.join('?' * len(values))})")
+        self.params.extend(values)
+        return self
+
+    def execute(self):
+        sql = f"SELECT {self.columns} FROM {self.table}"
+        if self.where:
+            sql += " WHERE " + " AND ".join(self.where)
+        rows = self.db.execute(sql, self.params).fetchall()
+        return FakeResponse([dict(row) for row in rows])
+
+
+class SqliteRpc:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def execute(self):
+        reset_count = 0
+        with self.db:
+            for statement in load_function_statements(self.name):
+                reset_count = self.db.execute(statement).rowcount
+        return FakeResponse(reset_count)
+
+
+class SqliteSupabase:
+    """Local stand-in for the Supabase client used by randomq."""
+
+    def __init__(self, db):
+        self.db = db
+        self.rpc_calls = []
+
+    def table(self, name):
+        return types.SimpleNamespace(
+            select=lambda columns: SqliteQuery(self.db, name, columns)
+        )
+
+    def rpc(self, name):
+        self.rpc_calls.append(name)
+        return SqliteRpc(self.db, name)
+
+
+@pytest.fixture
+def questions_db():
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.execute(
+        "CREATE TABLE questions_generated ("
+        "id INTEGER PRIMARY KEY, difficulty TEXT, seen BOOLEAN, "
+        "question TEXT, solutions TEXT, "
+        "generated_inputs TEXT, generated_outputs TEXT)"
+    )
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def fake_supabase(questions_db, monkeypatch):
+    """Points db_client.db_client.supabase at the sqlite stand-in."""
+    client = SqliteSupabase(questions_db)
+    client_module = types.ModuleType("db_client.db_client")
+    client_module.supabase = client
+    monkeypatch.setitem(sys.modules, "db_client.db_client", client_module)
+    monkeypatch.delitem(sys.modules, "randomq", raising=False)
+    return client
@@ -0,0 +1,62 @@
+from conftest import load_function_statements
+
+
+def insert_questions(db, ids, seen=True):
+    db.executemany(
+        "INSERT INTO questions_generated "
+        "(id, difficulty, seen, question, solutions, "
+        "generated_inputs, generated_outputs) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                question_id,
+                "introductory" if question_id % 2 else "interview",
+                seen,
+                f"Question {question_id}",
+                "secret",
+                "[[1]]",
+                "[1]",
+            )
+            for question_id in ids
+        ],
+    )
+    db.commit()
+
+
+def test_reset_sql_shifts_ids_without_collisions(questions_db):
+    """
+    Test that reset_seen_questions marks every row unseen and shifts every
+    id by 1000 in bulk, even when shifted ids overlap existing ones.
+    """
+    ids = list(range(1, 2501))
+    insert_questions(questions_db, ids)
+    questions_db.execute(
+        "UPDATE questions_generated SET seen = 0 WHERE id % 7 = 0"
+    )
+
+    for statement in load_function_statements("reset_seen_questions"):
+        questions_db.execute(statement)
+
+    rows = questions_db.execute(
+        "SELECT id, seen, question FROM questions_generated ORDER BY id"
+    ).fetchall()
+    assert [row["id"] for row in rows] == [i + 1000 for i in ids]
+    assert not any(row["seen"] for row in rows)
+    assert rows[0]["question"] == "Question 1"
+
+
+def test_generate_random_questions_resets_with_one_call(fake_supabase):
+    """
+    Test that running out of unseen questions triggers one bulk reset
+    instead of one update per row, and that sampling then succeeds.
+    """
+    insert_questions(fake_supabase.db, range(1, 41))
+
+    from randomq import generate_random_questions
+
+    questions = generate_random_questions(count=5, difficulty="introductory")
+
+    assert fake_supabase.rpc_calls == ["reset_seen_questions"]
+    assert len(questions) == 5
+    assert all(q["id"] > 1000 for q in questions)
+    assert all(q["difficulty"] == "introductory" for q in questions)
+    assert "inputs" in questions[0] and "generated_inputs" not in questions[0]